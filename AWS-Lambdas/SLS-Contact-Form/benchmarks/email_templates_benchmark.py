@@ -0,0 +1,237 @@
+"""
+Email Template Benchmark
+Compares rendering the notification and confirmation emails with the compiled templates against the previous f-strings
+
+Usage:
+    python benchmarks/email_templates_benchmark.py [--iterations 20000] [--message-length 1000]
+
+The f-string versions are the bodies send_notification_email and
+send_confirmation_email built before email_templates.py (without HTML
+escaping, so they do slightly less work than the templates).
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email_service import build_confirmation_context, build_notification_context  # noqa: E402
+from email_templates import render_email  # noqa: E402
+
+WEBSITE_NAME = 'Street Lawyer Services'
+WEBSITE_URL = 'https://streetlawyerservices.com'
+
+
+def fstring_notification(form_data, form_id, website_name, website_url):
+    # HTML email body
+    html_body = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .header {{ background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px; }}
+            .field {{ margin-bottom: 15px; }}
+            .label {{ font-weight: bold; color: #555; }}
+            .value {{ margin-left: 10px; }}
+            .message-box {{ background: #f8f9fa; padding: 15px; border-left: 3px solid #007bff; margin: 20px 0; }}
+            .footer {{ margin-top: 30px; padding-top: 20px; border-top: 1px solid #dee2e6; font-size: 12px; color: #6c757d; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h2>New Contact Form Submission</h2>
+                <p>Form ID: <strong>{form_id}</strong></p>
+            </div>
+            
+            <div class="field">
+                <span class="label">Name:</span>
+                <span class="value">{form_data.get('name', 'N/A')}</span>
+            </div>
+            
+            <div class="field">
+                <span class="label">Email:</span>
+                <span class="value"><a href="mailto:{form_data.get('email', '')}">{form_data.get('email', 'N/A')}</a></span>
+            </div>
+            
+            <div class="field">
+                <span class="label">Phone:</span>
+                <span class="value">{form_data.get('phone', 'Not provided')}</span>
+            </div>
+            
+            <div class="field">
+                <span class="label">Company:</span>
+                <span class="value">{form_data.get('company', 'Not provided')}</span>
+            </div>
+            
+            <div class="field">
+                <span class="label">Subject:</span>
+                <span class="value">{form_data.get('subject', 'N/A')}</span>
+            </div>
+            
+            <div class="field">
+                <span class="label">Message:</span>
+            </div>
+            <div class="message-box">
+                {form_data.get('message', 'No message provided').replace(chr(10), '<br>')}
+            </div>
+            
+            <div class="footer">
+                <p>Submitted at: {form_data.get('metadata', {}).get('submittedAt', 'Unknown')}</p>
+                <p>IP Address: {form_data.get('metadata', {}).get('ipAddress', 'Unknown')}</p>
+                <p>&copy; {website_name} | <a href="{website_url}">{website_url}</a></p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    # Plain text version
+    text_body = f"""
+New Contact Form Submission
+
+Form ID: {form_id}
+
+Name: {form_data.get('name', 'N/A')}
+Email: {form_data.get('email', 'N/A')}
+Phone: {form_data.get('phone', 'Not provided')}
+Company: {form_data.get('company', 'Not provided')}
+Subject: {form_data.get('subject', 'N/A')}
+
+Message:
+{form_data.get('message', 'No message provided')}
+
+---
+Submitted at: {form_data.get('metadata', {}).get('submittedAt', 'Unknown')}
+IP Address: {form_data.get('metadata', {}).get('ipAddress', 'Unknown')}
+
+{website_name} | {website_url}
+    """
+    return html_body, text_body
+
+
+def fstring_confirmation(form_data, website_name, website_url):
+    user_name = form_data.get('name', 'there')
+    
+    # HTML email body
+    html_body = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .header {{ background: #007bff; color: white; padding: 30px; text-align: center; border-radius: 5px 5px 0 0; }}
+            .content {{ background: #fff; padding: 30px; border: 1px solid #dee2e6; border-radius: 0 0 5px 5px; }}
+            .footer {{ margin-top: 30px; text-align: center; font-size: 12px; color: #6c757d; }}
+            a {{ color: #007bff; text-decoration: none; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>Thank You for Contacting Us!</h1>
+            </div>
+            
+            <div class="content">
+                <p>Hi {user_name},</p>
+                
+                <p>We've received your message and appreciate you taking the time to contact us.</p>
+                
+                <p>Our team will review your inquiry and get back to you as soon as possible, typically within 1-2 business days.</p>
+                
+                <p><strong>Your submission details:</strong></p>
+                <ul>
+                    <li>Subject: {form_data.get('subject', 'N/A')}</li>
+                    <li>Message: {form_data.get('message', 'N/A')[:100]}{'...' if len(form_data.get('message', '')) > 100 else ''}</li>
+                </ul>
+                
+                <p>If you have any urgent questions, please don't hesitate to contact us directly.</p>
+                
+                <p>Best regards,<br>
+                The {website_name} Team</p>
+            </div>
+            
+            <div class="footer">
+                <p>&copy; {website_name} | <a href="{website_url}">{website_url}</a></p>
+                <p>This is an automated message, please do not reply directly to this email.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    # Plain text version
+    text_body = f"""
+Hi {user_name},
+
+Thank you for contacting {website_name}!
+
+We've received your message and appreciate you taking the time to contact us.
+
+Our team will review your inquiry and get back to you as soon as possible, typically within 1-2 business days.
+
+Your submission details:
+- Subject: {form_data.get('subject', 'N/A')}
+- Message: {form_data.get('message', 'N/A')[:100]}{'...' if len(form_data.get('message', '')) > 100 else ''}
+
+If you have any urgent questions, please don't hesitate to contact us directly.
+
+Best regards,
+The {website_name} Team
+
+---
+{website_name} | {website_url}
+This is an automated message, please do not reply directly to this email.
+    """
+    return html_body, text_body
+
+
+def template_notification(form_data, form_id, website_name, website_url):
+    context = build_notification_context(form_data, form_id, website_name, website_url)
+    return render_email('notification', context, website_url)
+
+
+def template_confirmation(form_data, website_name, website_url):
+    context = build_confirmation_context(form_data, website_name, website_url)
+    return render_email('confirmation', context, website_url)
+
+
+def make_form(message_length):
+    return {
+        'name': 'Jane <b>Doe</b>',
+        'email': 'jane@example.com',
+        'phone': '555-0100',
+        'company': 'Doe & Partners',
+        'subject': 'Question about an appointment',
+        'message': ('I would like to ask about representation.\n' * (message_length // 42 + 1))[:message_length],
+        'metadata': {'submittedAt': '2026-10-18T10:00:00', 'ipAddress': '203.0.113.7'}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--message-length', type=int, default=1000)
+    args = parser.parse_args()
+
+    form_data = make_form(args.message_length)
+    cases = [
+        ('notification', 'f-string', lambda: fstring_notification(form_data, 'F1', WEBSITE_NAME, WEBSITE_URL)),
+        ('notification', 'template', lambda: template_notification(form_data, 'F1', WEBSITE_NAME, WEBSITE_URL)),
+        ('confirmation', 'f-string', lambda: fstring_confirmation(form_data, WEBSITE_NAME, WEBSITE_URL)),
+        ('confirmation', 'template', lambda: template_confirmation(form_data, WEBSITE_NAME, WEBSITE_URL)),
+    ]
+
+    print(f"{'email':<14} {'method':<10} {'us/render':>10}")
+    for email, method, render in cases:
+        seconds = min(timeit.repeat(render, number=args.iterations, repeat=3))
+        print(f"{email:<14} {method:<10} {seconds / args.iterations * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
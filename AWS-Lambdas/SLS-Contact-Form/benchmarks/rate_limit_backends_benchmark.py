@@ -0,0 +1,88 @@
+"""
+Rate Limit Backend Benchmark
+Compares decision latency and throughput of the rate limit backends at increasing concurrency
+
+Usage:
+    python benchmarks/rate_limit_backends_benchmark.py [--backends memory,redis,dynamodb]
+        [--algorithm fixed_window] [--requests 2000] [--concurrency 1,4,16,64]
+        [--redis-url redis://host:port/0] [--table contact-form-rate-limits]
+        [--layout daily|compact|dual]
+
+The redis backend runs against the local stand-in server unless --redis-url is
+given. The dynamodb backend needs credentials and an existing table; point it
+at DynamoDB Local with AWS_ENDPOINT_URL_DYNAMODB=http://localhost:8000.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit_algorithms import get_limiter  # noqa: E402
+from rate_limit_backends import get_backend  # noqa: E402
+from resp_server import RespServer  # noqa: E402
+
+
+def build_backend(name, args):
+    if name == 'redis':
+        url = args.redis_url or RespServer().start().url
+        return get_backend('redis', redis_url=url)
+    if name == 'dynamodb':
+        import boto3
+        return get_backend('dynamodb', table=boto3.resource('dynamodb').Table(args.table), layout=args.layout)
+    return get_backend(name)
+
+
+def run(limiter, requests, concurrency):
+    """
+    Issue rate limit decisions for distinct IPs from a thread pool
+
+    Returns:
+        Tuple (latencies_ms, elapsed_seconds)
+    """
+    run_id = time.time_ns()
+
+    def decide(index):
+        started = time.perf_counter()
+        limiter.check(f"bench-{run_id}-{index % 997}", datetime.now())
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(decide, range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='memory,redis')
+    parser.add_argument('--algorithm', default='fixed_window')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', default='1,4,16,64')
+    parser.add_argument('--redis-url')
+    parser.add_argument('--table', default=os.environ.get('RATE_LIMIT_TABLE', 'contact-form-rate-limits'))
+    parser.add_argument('--layout', default='daily')
+    args = parser.parse_args()
+
+    print(f"{'backend':<10} {'threads':>7} {'ops/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for name in args.backends.split(','):
+        backend = build_backend(name, args)
+        # Limits high enough that every decision performs a write
+        limiter = get_limiter(args.algorithm, backend, 10 ** 9, 10 ** 9)
+
+        for concurrency in (int(value) for value in args.concurrency.split(',')):
+            latencies, elapsed = run(limiter, args.requests, concurrency)
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"{name:<10} {concurrency:>7} {args.requests / elapsed:>10.0f} "
+                f"{quantiles[49]:>8.3f} {quantiles[98]:>8.3f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Local Redis-Protocol Stand-in Server
+Implements the subset of Redis commands used by RedisBackend, for tests and benchmarks
+
+Usage:
+    python benchmarks/resp_server.py [port]
+"""
+
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """
+    In-memory key/value server speaking RESP2
+
+    Supports strings and hashes with TTLs, MULTI/EXEC and optimistic WATCH.
+    A single lock serializes commands, like Redis' single-threaded core.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        super().__init__(address, RespHandler)
+        self.data = {}
+        self.expiry = {}
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        """Serve in a background thread and return self"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def live_value(self, key):
+        """Return the value for key, expiring it first if needed (lock held)"""
+        expires_at = self.expiry.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+        return self.data.get(key)
+
+    def touch(self, key):
+        """Bump the version of key so WATCHers see the write (lock held)"""
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def delete(self, key):
+        """Remove key (lock held)"""
+        self.data.pop(key, None)
+        self.expiry.pop(key, None)
+        self.touch(key)
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """One client connection"""
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        self.queued = None
+        self.watched = {}
+
+        while True:
+            command = self.read_command()
+            if command is None:
+                return
+            self.wfile.write(self.dispatch(command))
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def dispatch(self, args):
+        name = args[0].decode().upper()
+
+        if name == 'MULTI':
+            self.queued = []
+            return b'+OK\r\n'
+
+        if name == 'EXEC':
+            queued, self.queued = self.queued or [], None
+            with self.server.lock:
+                changed = any(
+                    self.server.versions.get(key, 0) != version
+                    for key, version in self.watched.items()
+                )
+                self.watched = {}
+                if changed:
+                    return b'*-1\r\n'
+                replies = [self.execute(command) for command in queued]
+            return b'*%d\r\n' % len(replies) + b''.join(replies)
+
+        if name == 'DISCARD':
+            self.queued = None
+            self.watched = {}
+            return b'+OK\r\n'
+
+        if name == 'WATCH':
+            with self.server.lock:
+                for key in args[1:]:
+                    self.server.live_value(key)
+                    self.watched[key] = self.server.versions.get(key, 0)
+            return b'+OK\r\n'
+
+        if name == 'UNWATCH':
+            self.watched = {}
+            return b'+OK\r\n'
+
+        if self.queued is not None:
+            self.queued.append(args)
+            return b'+QUEUED\r\n'
+
+        with self.server.lock:
+            return self.execute(args)
+
+    def execute(self, args):
+        """Run one data command (server lock held)"""
+        server = self.server
+        name = args[0].decode().upper()
+        key = args[1] if len(args) > 1 else None
+
+        try:
+            if name in ('PING', 'SELECT'):
+                return b'+PONG\r\n' if name == 'PING' else b'+OK\r\n'
+
+            if name == 'FLUSHDB':
+                server.data.clear()
+                server.expiry.clear()
+                for existing in list(server.versions):
+                    server.touch(existing)
+                return b'+OK\r\n'
+
+            if name == 'GET':
+                return bulk(server.live_value(key))
+
+            if name == 'SET':
+                server.data[key] = args[2]
+                server.expiry.pop(key, None)
+                if len(args) >= 5 and args[3].upper() == b'EX':
+                    server.expiry[key] = time.time() + int(args[4])
+                server.touch(key)
+                return b'+OK\r\n'
+
+            if name == 'DEL':
+                removed = 0
+                for existing in args[1:]:
+                    if server.live_value(existing) is not None:
+                        removed += 1
+                    server.delete(existing)
+                return integer(removed)
+
+            if name in ('INCR', 'INCRBY', 'DECR'):
+                amount = {'INCR': 1, 'DECR': -1}.get(name) or int(args[2])
+                value = int(server.live_value(key) or 0) + amount
+                server.data[key] = str(value).encode()
+                server.touch(key)
+                return integer(value)
+
+            if name in ('EXPIRE', 'EXPIREAT'):
+                if server.live_value(key) is None:
+                    return integer(0)
+                offset = time.time() if name == 'EXPIRE' else 0
+                server.expiry[key] = offset + int(args[2])
+                return integer(1)
+
+            if name == 'TTL':
+                if server.live_value(key) is None:
+                    return integer(-2)
+                expires_at = server.expiry.get(key)
+                return integer(-1 if expires_at is None else int(expires_at - time.time()))
+
+            if name == 'HINCRBY':
+                fields = server.live_value(key) or {}
+                value = int(fields.get(args[2], 0)) + int(args[3])
+                fields[args[2]] = str(value).encode()
+                server.data[key] = fields
+                server.touch(key)
+                return integer(value)
+
+            if name == 'HSET':
+                fields = server.live_value(key) or {}
+                added = 0
+                for index in range(2, len(args), 2):
+                    added += args[index] not in fields
+                    fields[args[index]] = args[index + 1]
+                server.data[key] = fields
+                server.touch(key)
+                return integer(added)
+
+            if name == 'HGET':
+                return bulk((server.live_value(key) or {}).get(args[2]))
+
+            if name == 'HMGET':
+                fields = server.live_value(key) or {}
+                parts = [bulk(fields.get(field)) for field in args[2:]]
+                return b'*%d\r\n' % len(parts) + b''.join(parts)
+
+            if name == 'HDEL':
+                fields = server.live_value(key) or {}
+                removed = sum(fields.pop(field, None) is not None for field in args[2:])
+                if removed:
+                    server.touch(key)
+                return integer(removed)
+
+            if name == 'HKEYS':
+                fields = server.live_value(key) or {}
+                return b'*%d\r\n' % len(fields) + b''.join(bulk(field) for field in fields)
+
+            if name == 'HGETALL':
+                fields = server.live_value(key) or {}
+                parts = [bulk(part) for pair in fields.items() for part in pair]
+                return b'*%d\r\n' % len(parts) + b''.join(parts)
+
+            return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+        except (ValueError, AttributeError, IndexError):
+            return b'-ERR wrong number of arguments or wrong type\r\n'
+
+
+def bulk(value):
+    if value is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def integer(value):
+    return b':%d\r\n' % value
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6379
+    server = RespServer(('127.0.0.1', port))
+    print(f"Serving Redis protocol on {server.url}")
+    server.serve_forever()
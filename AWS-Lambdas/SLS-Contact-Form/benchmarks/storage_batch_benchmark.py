@@ -0,0 +1,127 @@
+"""
+Storage Batch Write Benchmark
+Compares per-item save_to_dynamodb with save_many for bulk ingestion
+
+Usage:
+    python benchmarks/storage_batch_benchmark.py [--forms 20000] [--workers 8]
+        [--latency-ms 15] [--unprocessed-rate 0.05] [--table contact-form-submissions]
+        [--backend dynamodb|memory|sqlite] [--sqlite-path /tmp/bench.sqlite3]
+
+Without --table the benchmark runs against an in-process stand-in that
+sleeps --latency-ms per request and leaves --unprocessed-rate of each batch
+unprocessed, like a throttled table. With --table it writes to a real
+DynamoDB table (or DynamoDB Local via AWS_ENDPOINT_URL_DYNAMODB). The
+memory and sqlite backends measure the offline stores instead.
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+from storage_backends import DynamoDBStorage, get_storage_backend  # noqa: E402
+
+
+class SimulatedClient:
+    """Accepts BatchWriteItem, PutItem and UpdateItem (counter) calls with fixed latency"""
+
+    def __init__(self, latency_ms, unprocessed_rate):
+        self.latency = latency_ms / 1000
+        self.unprocessed_rate = unprocessed_rate
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def batch_write_item(self, RequestItems):
+        time.sleep(self.latency)
+        unprocessed = {}
+        for table_name, requests in RequestItems.items():
+            for request in requests:
+                if random.random() < self.unprocessed_rate:
+                    unprocessed.setdefault(table_name, []).append(request)
+                    continue
+                item = request['PutRequest']['Item']
+                with self.lock:
+                    self.items[item['formId']] = item
+        return {'UnprocessedItems': unprocessed}
+
+    def put_item(self, Item, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.items[Item['formId']] = Item
+        return {}
+
+    def update_item(self, **kwargs):
+        time.sleep(self.latency)
+        return {}
+
+
+class SimulatedResource:
+    """Just enough of the boto3 DynamoDB resource for DynamoDBStorage"""
+
+    def __init__(self, client):
+        self.meta = type('Meta', (), {'client': client})()
+
+    def Table(self, name):
+        return self.meta.client
+
+
+def make_forms(count):
+    return [
+        {
+            'name': f"Bench User {index}",
+            'email': f"bench{index}@example.com",
+            'phone': '',
+            'company': 'Benchmark',
+            'subject': 'Historical inquiry',
+            'message': 'Imported inquiry record used to benchmark batch writes.'
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--forms', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=15)
+    parser.add_argument('--unprocessed-rate', type=float, default=0.05)
+    parser.add_argument('--sequential-sample', type=int, default=500,
+                        help='forms written one by one to estimate the per-item rate')
+    parser.add_argument('--table')
+    parser.add_argument('--backend', choices=['dynamodb', 'memory', 'sqlite'], default='dynamodb')
+    parser.add_argument('--sqlite-path', default='/tmp/storage-batch-benchmark.sqlite3')
+    args = parser.parse_args()
+
+    table_name = args.table or 'benchmark-submissions'
+    if args.backend != 'dynamodb':
+        storage.storage_backend = get_storage_backend(args.backend, sqlite_path=args.sqlite_path)
+    elif not args.table:
+        storage.storage_backend = DynamoDBStorage(
+            SimulatedResource(SimulatedClient(args.latency_ms, args.unprocessed_rate))
+        )
+
+    forms = make_forms(args.forms)
+
+    sample = forms[:args.sequential_sample]
+    started = time.perf_counter()
+    for form_data in sample:
+        storage.save_to_dynamodb(form_data, table_name)
+    sequential_rate = len(sample) / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    outcomes = storage.save_many(forms, table_name, max_workers=args.workers)
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for outcome in outcomes if not outcome['success'])
+
+    print(f"{'method':<22} {'forms/min':>12} {'failed':>7}")
+    print(f"{'save_to_dynamodb':<22} {sequential_rate * 60:>12.0f} {'-':>7}")
+    print(f"{f'save_many ({args.workers} workers)':<22} {len(forms) / elapsed * 60:>12.0f} {failed:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Circuit Breaker Module for Contact Form Lambda
+Stops calling a slow or failing dependency for a cool-down period within a warm container
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from metrics import put_metric
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    """
+    Latency and error-rate circuit breaker
+
+    The last window_size calls are tracked; calls slower than
+    latency_threshold_ms count as failures. Once at least min_calls were
+    seen and the failure rate reaches failure_rate_threshold, the breaker
+    opens and callers skip the dependency for cool_down_seconds. Then a
+    single probe call is let through: success closes the breaker, failure
+    re-opens it. A probe that never reports back (its invocation timed out
+    or raised first) is replaced by a new one after another
+    cool_down_seconds. Every state change is published as a metric.
+    """
+
+    def __init__(self, name, latency_threshold_ms=300, failure_rate_threshold=0.5,
+                 min_calls=5, window_size=20, cool_down_seconds=30):
+        self.name = name
+        self.latency_threshold_ms = latency_threshold_ms
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.cool_down_seconds = cool_down_seconds
+        self.state = CLOSED
+        self.opened_at = 0
+        self.probe_started_at = 0
+        self.outcomes = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """
+        Return True if the protected call should be attempted
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.cool_down_seconds:
+                self.transition(HALF_OPEN)
+                self.probe_started_at = now
+                return True
+
+            if self.state == HALF_OPEN and now - self.probe_started_at >= self.cool_down_seconds:
+                logger.warning(f"Circuit breaker {self.name}: probe did not report back, sending another")
+                self.probe_started_at = now
+                return True
+
+            # Open, or half-open with the probe still in flight
+            return False
+
+    def record_success(self, latency_ms):
+        """
+        Record a completed call and its latency
+
+        Args:
+            latency_ms: Call duration in milliseconds
+        """
+        self.record(latency_ms <= self.latency_threshold_ms)
+
+    def record_failure(self):
+        """Record a failed call"""
+        self.record(False)
+
+    def record(self, succeeded):
+        """Update the window and change state if needed"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.outcomes.clear()
+                self.transition(CLOSED if succeeded else OPEN)
+                return
+
+            self.outcomes.append(succeeded)
+            if self.state != CLOSED or len(self.outcomes) < self.min_calls:
+                return
+
+            failure_rate = self.outcomes.count(False) / len(self.outcomes)
+            if failure_rate >= self.failure_rate_threshold:
+                self.outcomes.clear()
+                self.transition(OPEN)
+
+    def transition(self, state):
+        """Move to state and publish the change (lock held)"""
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+
+        logger.warning(f"Circuit breaker {self.name}: {previous} -> {state}")
+        put_metric(
+            'CircuitBreakerTransition', 1,
+            dimensions={'Breaker': self.name, 'State': state},
+            properties={'PreviousState': previous}
+        )
@@ -0,0 +1,40 @@
+"""
+AWS Lambda Function for Contact Form Notification Digests
+Sends the pending admin digest once it is due (run on a schedule, e.g. every DIGEST_INTERVAL_MINUTES)
+
+Digests are also sent by the submission handler when a submission makes one
+due; the schedule covers the tail of a busy period, when no further
+submission arrives to trigger it.
+"""
+
+import os
+import logging
+from email_service import send_digest_email
+from notification_digest import claim_digest
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Environment variables
+WEBSITE_URL = os.environ.get('WEBSITE_URL', 'https://yourwebsite.com')
+
+def lambda_handler(event, context):
+    """
+    Send the site's digest if it is due
+
+    The event may name the site as websiteUrl (defaults to WEBSITE_URL).
+
+    Returns:
+        Dict with the number of submissions summarized
+    """
+    website_url = (event or {}).get('websiteUrl') or WEBSITE_URL
+    digest = claim_digest(website_url)
+    if digest is None:
+        return {'sent': 0}
+
+    if not send_digest_email(digest):
+        return {'sent': 0}
+
+    logger.info(f"Sent notification digest of {len(digest['entries'])} submissions")
+    return {'sent': len(digest['entries'])}
@@ -0,0 +1,182 @@
+"""
+Email Queue Module for Contact Form Lambda
+Hands email jobs to an SQS-compatible queue so submissions return without waiting for SES
+"""
+
+import os
+import json
+import uuid
+import boto3
+import logging
+import threading
+from collections import deque
+from botocore.exceptions import BotoCoreError, ClientError
+from email_service import send_notification_email, send_confirmation_email
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+EMAIL_QUEUE_ENABLED = os.environ.get('EMAIL_QUEUE_ENABLED', 'false').lower() == 'true'
+EMAIL_QUEUE_URL = os.environ.get('EMAIL_QUEUE_URL', '')
+EMAIL_QUEUE_BACKEND = os.environ.get('EMAIL_QUEUE_BACKEND', 'sqs')  # sqs or local
+
+# One job per email, so a failed confirmation is retried without resending the notification
+EMAIL_KINDS = ('notification', 'confirmation')
+
+class LocalQueue:
+    """
+    In-process stand-in for an SQS queue, for tests and local runs
+
+    Accepts send_message_batch like the SQS client and hands messages out
+    as SQS event batches. Settling a batch with the worker's response puts
+    the reported failures back on the queue, or into dead_letters once a
+    message has been received max_receives times, like a redrive policy.
+    """
+
+    def __init__(self, max_receives=3):
+        self.max_receives = max_receives
+        self.messages = deque()
+        self.dead_letters = []
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def send_message_batch(self, QueueUrl, Entries):
+        """Queue up to 10 messages (see SQS SendMessageBatch)"""
+        successful = []
+        with self._lock:
+            for entry in Entries:
+                message = {'messageId': str(uuid.uuid4()), 'body': entry['MessageBody'], 'receiveCount': 0}
+                self.messages.append(message)
+                successful.append({'Id': entry['Id'], 'MessageId': message['messageId']})
+        return {'Successful': successful, 'Failed': []}
+
+    def receive_event(self, max_messages=10):
+        """Take up to max_messages messages as an SQS event for the worker handler"""
+        records = []
+        with self._lock:
+            while self.messages and len(records) < max_messages:
+                message = self.messages.popleft()
+                message['receiveCount'] += 1
+                self._in_flight[message['messageId']] = message
+                records.append({
+                    'messageId': message['messageId'],
+                    'receiptHandle': message['messageId'],
+                    'body': message['body'],
+                    'attributes': {'ApproximateReceiveCount': str(message['receiveCount'])},
+                    'eventSource': 'aws:sqs'
+                })
+        return {'Records': records}
+
+    def settle(self, event, response):
+        """Delete the processed messages of a batch and return the failed ones to the queue"""
+        failed = {failure['itemIdentifier'] for failure in (response or {}).get('batchItemFailures', [])}
+        with self._lock:
+            for record in event['Records']:
+                message = self._in_flight.pop(record['messageId'])
+                if record['messageId'] not in failed:
+                    continue
+                if message['receiveCount'] >= self.max_receives:
+                    self.dead_letters.append(message)
+                else:
+                    self.messages.append(message)
+
+    def drain(self, handler, max_messages=10):
+        """
+        Feed batches to handler until the queue is empty
+
+        Returns:
+            Number of batches processed
+        """
+        batches = 0
+        while True:
+            event = self.receive_event(max_messages)
+            if not event['Records']:
+                return batches
+            self.settle(event, handler(event, None))
+            batches += 1
+
+# Initialize the queue client
+queue_client = LocalQueue() if EMAIL_QUEUE_BACKEND == 'local' else boto3.client('sqs')
+
+def build_email_jobs(form_data, form_id, website_name, website_url, notification_email):
+    """
+    Build the jobs for a submission's emails
+
+    Args:
+        form_data: Form submission data
+        form_id: Unique form identifier
+        website_name: Name of the website
+        website_url: Website URL
+        notification_email: Admin email for notifications
+
+    Returns:
+        List of job dicts, one per email kind
+    """
+    return [
+        {
+            'kind': kind,
+            'formId': form_id,
+            'formData': form_data,
+            'websiteName': website_name,
+            'websiteUrl': website_url,
+            'notificationEmail': notification_email
+        }
+        for kind in EMAIL_KINDS
+    ]
+
+def enqueue_emails(form_data, form_id, website_name, website_url, notification_email):
+    """
+    Queue a submission's emails for the worker in one SendMessageBatch call
+
+    Args:
+        form_data: Form submission data
+        form_id: Unique form identifier
+        website_name: Name of the website
+        website_url: Website URL
+        notification_email: Admin email for notifications
+
+    Returns:
+        List of the jobs that could not be queued (empty on success)
+    """
+    jobs = build_email_jobs(form_data, form_id, website_name, website_url, notification_email)
+    entries = [
+        {'Id': job['kind'], 'MessageBody': json.dumps(job, default=str)}
+        for job in jobs
+    ]
+
+    try:
+        response = queue_client.send_message_batch(QueueUrl=EMAIL_QUEUE_URL, Entries=entries)
+    except (ClientError, BotoCoreError) as e:
+        logger.error(f"Error queueing emails for form {form_id}: {str(e)}")
+        return jobs
+
+    failed_ids = {failure['Id'] for failure in response.get('Failed', [])}
+    if failed_ids:
+        logger.error(f"Could not queue {', '.join(sorted(failed_ids))} email for form {form_id}")
+    else:
+        logger.info(f"Queued emails for form {form_id}")
+    return [job for job in jobs if job['kind'] in failed_ids]
+
+def send_email_job(job):
+    """
+    Send the email described by a job
+
+    Raises:
+        ValueError for a malformed job, Exception if sending fails
+    """
+    try:
+        kind = job['kind']
+        form_data = job['formData']
+        form_id = job['formId']
+        website_name = job['websiteName']
+        website_url = job['websiteUrl']
+        notification_email = job['notificationEmail']
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed email job: {str(e)}")
+
+    if kind == 'notification':
+        send_notification_email(form_data, form_id, website_name, website_url, notification_email)
+    elif kind == 'confirmation':
+        send_confirmation_email(form_data, website_name, website_url)
+    else:
+        raise ValueError(f"Unknown email kind: {kind}")
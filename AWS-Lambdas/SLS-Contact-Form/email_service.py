@@ -4,9 +4,17 @@ Handles sending notification and confirmation emails via AWS SES
 """
 
 import os
+import re
+import json
 import boto3
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from botocore.exceptions import ClientError
+from email_templates import build_template_data, get_site_key, render_email
+from notification_digest import (
+    NOTIFICATION_DIGEST_ENABLED, add_to_digest, build_digest_entry, complete_digest, is_urgent, release_digest
+)
+from storage_backends import StorageError
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +25,23 @@ ses = boto3.client('ses')
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'noreply@yourwebsite.com')
 SENDER_NAME = os.environ.get('SENDER_NAME', 'Your Website')
 
+# Both emails are sent concurrently; the pool lives as long as the warm container
+EMAIL_SEND_TIMEOUT_SECONDS = float(os.environ.get('EMAIL_SEND_TIMEOUT_SECONDS', '5'))
+email_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('EMAIL_MAX_WORKERS', '4')))
+
+# Send JSON template data against SES stored templates (synced by ses_templates.py at deploy time)
+SES_TEMPLATES_ENABLED = os.environ.get('SES_TEMPLATES_ENABLED', 'false').lower() == 'true'
+SES_TEMPLATE_PREFIX = os.environ.get('SES_TEMPLATE_PREFIX', 'ContactForm')
+BULK_DESTINATIONS_MAX = 50  # SendBulkTemplatedEmail maximum
+
 def send_emails(form_data, form_id, website_name, website_url, notification_email):
     """
     Send both notification and confirmation emails
     
+    The two SES calls run concurrently, so the request waits for the slower
+    one rather than both. An email not sent within EMAIL_SEND_TIMEOUT_SECONDS
+    counts as not sent (it may still go out while the container is warm).
+    
     Args:
         form_data: Form submission data
         form_id: Unique form identifier
@@ -31,25 +52,37 @@ def send_emails(form_data, form_id, website_name, website_url, notification_emai
     Returns:
         Tuple (notification_sent, confirmation_sent)
     """
-    notification_sent = False
-    confirmation_sent = False
+    # Send notification email to admin and confirmation email to user
+    notification = email_pool.submit(
+        send_notification_email, form_data, form_id, website_name, website_url, notification_email
+    )
+    confirmation = email_pool.submit(send_confirmation_email, form_data, website_name, website_url)
     
-    # Send notification email to admin
-    try:
-        send_notification_email(form_data, form_id, website_name, website_url, notification_email)
-        notification_sent = True
-    except Exception as e:
-        logger.error(f"Failed to send notification email: {str(e)}")
+    wait([notification, confirmation], timeout=EMAIL_SEND_TIMEOUT_SECONDS)
     
-    # Send confirmation email to user
-    try:
-        send_confirmation_email(form_data, website_name, website_url)
-        confirmation_sent = True
-    except Exception as e:
-        logger.error(f"Failed to send confirmation email: {str(e)}")
+    notification_sent = get_send_result(notification, 'notification')
+    confirmation_sent = get_send_result(confirmation, 'confirmation')
     
     return notification_sent, confirmation_sent
 
+def get_send_result(future, email_kind):
+    """
+    Return True if a send finished without error, logging why otherwise
+    
+    Args:
+        future: Future of a send_*_email call
+        email_kind: 'notification' or 'confirmation', for the log
+    """
+    if not future.done():
+        logger.error(f"Timed out sending {email_kind} email after {EMAIL_SEND_TIMEOUT_SECONDS}s")
+        return False
+    
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Failed to send {email_kind} email: {str(error)}")
+        return False
+    return True
+
 def send_notification_email(form_data, form_id, website_name, website_url, to_email):
     """
     Send notification email to admin about new submission
@@ -61,94 +94,31 @@ def send_notification_email(form_data, form_id, website_name, website_url, to_em
         website_url: Website URL
         to_email: Admin email address
     """
+    # In digest mode the notification waits for the next summary, unless urgent
+    if NOTIFICATION_DIGEST_ENABLED and not is_urgent(form_data):
+        try:
+            digest = add_to_digest(build_digest_entry(form_data, form_id), website_name, website_url, to_email)
+        except (ClientError, StorageError) as e:
+            logger.error(f"Error adding form {form_id} to the digest, notifying now: {str(e)}")
+        else:
+            if digest:
+                send_digest_email(digest)
+            return
+    
     subject = f"New Contact Form Submission - {website_name}"
     
-    # HTML email body
-    html_body = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 20px; }}
-            .field {{ margin-bottom: 15px; }}
-            .label {{ font-weight: bold; color: #555; }}
-            .value {{ margin-left: 10px; }}
-            .message-box {{ background: #f8f9fa; padding: 15px; border-left: 3px solid #007bff; margin: 20px 0; }}
-            .footer {{ margin-top: 30px; padding-top: 20px; border-top: 1px solid #dee2e6; font-size: 12px; color: #6c757d; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h2>New Contact Form Submission</h2>
-                <p>Form ID: <strong>{form_id}</strong></p>
-            </div>
-            
-            <div class="field">
-                <span class="label">Name:</span>
-                <span class="value">{form_data.get('name', 'N/A')}</span>
-            </div>
-            
-            <div class="field">
-                <span class="label">Email:</span>
-                <span class="value"><a href="mailto:{form_data.get('email', '')}">{form_data.get('email', 'N/A')}</a></span>
-            </div>
-            
-            <div class="field">
-                <span class="label">Phone:</span>
-                <span class="value">{form_data.get('phone', 'Not provided')}</span>
-            </div>
-            
-            <div class="field">
-                <span class="label">Company:</span>
-                <span class="value">{form_data.get('company', 'Not provided')}</span>
-            </div>
-            
-            <div class="field">
-                <span class="label">Subject:</span>
-                <span class="value">{form_data.get('subject', 'N/A')}</span>
-            </div>
-            
-            <div class="field">
-                <span class="label">Message:</span>
-            </div>
-            <div class="message-box">
-                {form_data.get('message', 'No message provided').replace(chr(10), '<br>')}
-            </div>
-            
-            <div class="footer">
-                <p>Submitted at: {form_data.get('metadata', {}).get('submittedAt', 'Unknown')}</p>
-                <p>IP Address: {form_data.get('metadata', {}).get('ipAddress', 'Unknown')}</p>
-                <p>&copy; {website_name} | <a href="{website_url}">{website_url}</a></p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    context = build_notification_context(form_data, form_id, website_name, website_url)
     
-    # Plain text version
-    text_body = f"""
-New Contact Form Submission
-
-Form ID: {form_id}
-
-Name: {form_data.get('name', 'N/A')}
-Email: {form_data.get('email', 'N/A')}
-Phone: {form_data.get('phone', 'Not provided')}
-Company: {form_data.get('company', 'Not provided')}
-Subject: {form_data.get('subject', 'N/A')}
-
-Message:
-{form_data.get('message', 'No message provided')}
-
----
-Submitted at: {form_data.get('metadata', {}).get('submittedAt', 'Unknown')}
-IP Address: {form_data.get('metadata', {}).get('ipAddress', 'Unknown')}
-
-{website_name} | {website_url}
-    """
+    if SES_TEMPLATES_ENABLED:
+        send_templated_email(
+            to_addresses=[to_email],
+            template_name=get_ses_template_name('notification', website_url),
+            template_data=build_template_data('notification', context, subject, website_url),
+            reply_to=form_data.get('email')
+        )
+        return
+    
+    html_body, text_body = render_email('notification', context, website_url)
     
     # Send email
     send_email(
@@ -174,79 +144,18 @@ def send_confirmation_email(form_data, website_name, website_url):
         return
     
     subject = f"Thank you for contacting {website_name}"
-    user_name = form_data.get('name', 'there')
-    
-    # HTML email body
-    html_body = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-            .header {{ background: #007bff; color: white; padding: 30px; text-align: center; border-radius: 5px 5px 0 0; }}
-            .content {{ background: #fff; padding: 30px; border: 1px solid #dee2e6; border-radius: 0 0 5px 5px; }}
-            .footer {{ margin-top: 30px; text-align: center; font-size: 12px; color: #6c757d; }}
-            a {{ color: #007bff; text-decoration: none; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>Thank You for Contacting Us!</h1>
-            </div>
-            
-            <div class="content">
-                <p>Hi {user_name},</p>
-                
-                <p>We've received your message and appreciate you taking the time to contact us.</p>
-                
-                <p>Our team will review your inquiry and get back to you as soon as possible, typically within 1-2 business days.</p>
-                
-                <p><strong>Your submission details:</strong></p>
-                <ul>
-                    <li>Subject: {form_data.get('subject', 'N/A')}</li>
-                    <li>Message: {form_data.get('message', 'N/A')[:100]}{'...' if len(form_data.get('message', '')) > 100 else ''}</li>
-                </ul>
-                
-                <p>If you have any urgent questions, please don't hesitate to contact us directly.</p>
-                
-                <p>Best regards,<br>
-                The {website_name} Team</p>
-            </div>
-            
-            <div class="footer">
-                <p>&copy; {website_name} | <a href="{website_url}">{website_url}</a></p>
-                <p>This is an automated message, please do not reply directly to this email.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
     
-    # Plain text version
-    text_body = f"""
-Hi {user_name},
-
-Thank you for contacting {website_name}!
-
-We've received your message and appreciate you taking the time to contact us.
-
-Our team will review your inquiry and get back to you as soon as possible, typically within 1-2 business days.
-
-Your submission details:
-- Subject: {form_data.get('subject', 'N/A')}
-- Message: {form_data.get('message', 'N/A')[:100]}{'...' if len(form_data.get('message', '')) > 100 else ''}
-
-If you have any urgent questions, please don't hesitate to contact us directly.
-
-Best regards,
-The {website_name} Team
-
----
-{website_name} | {website_url}
-This is an automated message, please do not reply directly to this email.
-    """
+    context = build_confirmation_context(form_data, website_name, website_url)
+    
+    if SES_TEMPLATES_ENABLED:
+        send_templated_email(
+            to_addresses=[user_email],
+            template_name=get_ses_template_name('confirmation', website_url),
+            template_data=build_template_data('confirmation', context, subject, website_url)
+        )
+        return
+    
+    html_body, text_body = render_email('confirmation', context, website_url)
     
     # Send email
     send_email(
@@ -256,6 +165,150 @@ This is an automated message, please do not reply directly to this email.
         text_body=text_body
     )
 
+def send_digest_email(digest):
+    """
+    Send a claimed notification digest to the admin
+    
+    The entries are removed once sent; if sending fails they stay pending
+    for the next digest.
+    
+    Args:
+        digest: Digest from notification_digest.claim_digest
+        
+    Returns:
+        Boolean indicating success
+    """
+    website_name = digest['websiteName']
+    website_url = digest['websiteUrl']
+    entries = [
+        render_email('digest_entry', {
+            'form_id': entry.get('formId'),
+            'submitted_at': entry.get('submittedAt'),
+            'name': entry.get('name'),
+            'email': entry.get('email'),
+            'phone': entry.get('phone'),
+            'subject': entry.get('subject'),
+            'message_preview': entry.get('messagePreview')
+        }, website_url)
+        for entry in digest['entries']
+    ]
+    title = f"{len(entries)} New Contact Form Submission{'' if len(entries) == 1 else 's'}"
+    context = {
+        'title': title,
+        'website_name': website_name,
+        'website_url': website_url
+    }
+    html_body, _ = render_email('digest', dict(context, entries=''.join(html for html, _ in entries)), website_url)
+    _, text_body = render_email('digest', dict(context, entries=''.join(text for _, text in entries)), website_url)
+    
+    try:
+        send_email(
+            to_addresses=[digest['notificationEmail']],
+            subject=f"{title} - {website_name}",
+            html_body=html_body,
+            text_body=text_body
+        )
+    except Exception as e:
+        logger.error(f"Failed to send notification digest: {str(e)}")
+        release_digest(digest)
+        return False
+    
+    complete_digest(digest)
+    return True
+
+def send_confirmation_emails(forms, website_name, website_url):
+    """
+    Send confirmation emails for several submissions of one site
+    
+    With SES_TEMPLATES_ENABLED, up to 50 confirmations go out per
+    SendBulkTemplatedEmail call; otherwise they are sent one by one.
+    
+    Args:
+        forms: List of form submission data
+        website_name: Name of the website
+        website_url: Website URL
+        
+    Returns:
+        List of error messages in input order (None for each email sent)
+    """
+    if not SES_TEMPLATES_ENABLED:
+        errors = []
+        for form_data in forms:
+            try:
+                send_confirmation_email(form_data, website_name, website_url)
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+        return errors
+    
+    subject = f"Thank you for contacting {website_name}"
+    errors = [None] * len(forms)
+    destinations = []
+    for index, form_data in enumerate(forms):
+        if not form_data.get('email'):
+            logger.warning("No email address provided for confirmation email")
+            continue
+        context = build_confirmation_context(form_data, website_name, website_url)
+        destinations.append((index, form_data['email'], build_template_data('confirmation', context, subject, website_url)))
+    
+    template_name = get_ses_template_name('confirmation', website_url)
+    for start in range(0, len(destinations), BULK_DESTINATIONS_MAX):
+        chunk = destinations[start:start + BULK_DESTINATIONS_MAX]
+        results = send_bulk_templated_email(template_name, [(address, data) for _, address, data in chunk])
+        for (index, _, _), error in zip(chunk, results):
+            errors[index] = error
+    return errors
+
+def build_notification_context(form_data, form_id, website_name, website_url):
+    """
+    Build the template fields of the admin notification
+    
+    Returns:
+        Dict of field values for the notification templates
+    """
+    metadata = form_data.get('metadata') or {}
+    return {
+        'form_id': form_id,
+        'name': form_data.get('name', 'N/A'),
+        'email': form_data.get('email', 'N/A'),
+        'email_address': form_data.get('email', ''),
+        'phone': form_data.get('phone', 'Not provided'),
+        'company': form_data.get('company', 'Not provided'),
+        'subject': form_data.get('subject', 'N/A'),
+        'message': form_data.get('message', 'No message provided'),
+        'submitted_at': metadata.get('submittedAt', 'Unknown'),
+        'ip_address': metadata.get('ipAddress', 'Unknown'),
+        'website_name': website_name,
+        'website_url': website_url
+    }
+
+def build_confirmation_context(form_data, website_name, website_url):
+    """
+    Build the template fields of the submitter's confirmation
+    
+    Returns:
+        Dict of field values for the confirmation templates
+    """
+    message = form_data.get('message', 'N/A')
+    return {
+        'user_name': form_data.get('name', 'there'),
+        'subject': form_data.get('subject', 'N/A'),
+        'message_preview': message[:100] + ('...' if len(message) > 100 else ''),
+        'website_name': website_name,
+        'website_url': website_url
+    }
+
+def get_ses_template_name(name, website_url):
+    """
+    Return the SES stored template name of a site's template
+    
+    Args:
+        name: Template name ('notification' or 'confirmation')
+        website_url: Website URL (each site has its own templates)
+    """
+    site = re.sub(r'[^A-Za-z0-9_-]+', '-', get_site_key(website_url)).strip('-')
+    return '-'.join(part for part in (SES_TEMPLATE_PREFIX, site, name) if part)[:64]
+
 def send_email(to_addresses, subject, html_body, text_body, reply_to=None):
     """
     Send email via AWS SES
@@ -305,16 +358,98 @@ def send_email(to_addresses, subject, html_body, text_body, reply_to=None):
         logger.info(f"Email sent successfully to {', '.join(to_addresses)}. Message ID: {response['MessageId']}")
         
     except ClientError as e:
-        error_code = e.response['Error']['Code']
-        error_message = e.response['Error']['Message']
+        error_code = log_ses_error(e)
+        raise Exception(f"Failed to send email: {error_code}")
+
+def send_templated_email(to_addresses, template_name, template_data, reply_to=None):
+    """
+    Send email via an SES stored template
+    
+    Args:
+        to_addresses: List of recipient email addresses
+        template_name: SES template name (see get_ses_template_name)
+        template_data: Dict of template data (see email_templates.build_template_data)
+        reply_to: Reply-to email address (optional)
         
-        if error_code == 'MessageRejected':
-            logger.error(f"SES rejected message: {error_message}")
-        elif error_code == 'MailFromDomainNotVerified':
-            logger.error(f"Sender email domain not verified in SES: {SENDER_EMAIL}")
-        elif error_code == 'ConfigurationSetDoesNotExist':
-            logger.error("SES configuration set does not exist")
-        else:
-            logger.error(f"SES error: {error_code} - {error_message}")
+    Raises:
+        Exception if email sending fails
+    """
+    try:
+        email_params = {
+            'Source': f"{SENDER_NAME} <{SENDER_EMAIL}>",
+            'Destination': {
+                'ToAddresses': to_addresses
+            },
+            'Template': template_name,
+            'TemplateData': json.dumps(template_data)
+        }
+        
+        # Add reply-to if provided
+        if reply_to:
+            email_params['ReplyToAddresses'] = [reply_to]
         
-        raise Exception(f"Failed to send email: {error_code}")
\ No newline at end of file
+        response = ses.send_templated_email(**email_params)
+        
+        logger.info(f"Templated email sent to {', '.join(to_addresses)}. Message ID: {response['MessageId']}")
+        
+    except ClientError as e:
+        error_code = log_ses_error(e)
+        raise Exception(f"Failed to send email: {error_code}")
+
+def send_bulk_templated_email(template_name, destinations):
+    """
+    Send one SES stored template to up to 50 recipients in one call
+    
+    Args:
+        template_name: SES template name (see get_ses_template_name)
+        destinations: List of (email_address, template_data) tuples
+        
+    Returns:
+        List of error messages in input order (None for each email sent)
+    """
+    try:
+        response = ses.send_bulk_templated_email(
+            Source=f"{SENDER_NAME} <{SENDER_EMAIL}>",
+            Template=template_name,
+            DefaultTemplateData='{}',
+            Destinations=[
+                {
+                    'Destination': {'ToAddresses': [address]},
+                    'ReplacementTemplateData': json.dumps(template_data)
+                }
+                for address, template_data in destinations
+            ]
+        )
+    except ClientError as e:
+        error_code = log_ses_error(e)
+        return [f"Failed to send email: {error_code}"] * len(destinations)
+    
+    errors = [
+        None if status.get('Status') == 'Success' else f"Failed to send email: {status.get('Status')}"
+        for status in response.get('Status', [])
+    ]
+    logger.info(f"Bulk templated email sent {errors.count(None)}/{len(destinations)} with {template_name}")
+    return errors
+
+def log_ses_error(e):
+    """
+    Log an SES ClientError with a hint for the common causes
+    
+    Returns:
+        SES error code
+    """
+    error_code = e.response['Error']['Code']
+    error_message = e.response['Error']['Message']
+    
+    if error_code == 'MessageRejected':
+        logger.error(f"SES rejected message: {error_message}")
+    elif error_code == 'MailFromDomainNotVerified':
+        logger.error(f"Sender email domain not verified in SES: {SENDER_EMAIL}")
+    elif error_code == 'ConfigurationSetDoesNotExist':
+        logger.error("SES configuration set does not exist")
+    elif error_code == 'TemplateDoesNotExist':
+        logger.error(f"SES template does not exist; run ses_templates.py: {error_message}")
+    else:
+        logger.error(f"SES error: {error_code} - {error_message}")
+    
+    return error_code
@@ -0,0 +1,207 @@
+"""
+Email Templates Module for Contact Form Lambda
+Compiles the notification and confirmation templates once per container and renders them with HTML escaping
+
+Templates are plain files with {{ field }} placeholders, optionally with a
+filter ({{ message|nl2br }}). In .html templates every value is HTML-escaped
+before filters apply, except with the safe filter (for already rendered
+HTML). The bundled templates live in templates/; a site can override any of
+them by placing a file of the same name in EMAIL_TEMPLATE_DIR/<site>/ (site
+being the website's host name) or, for all sites, in EMAIL_TEMPLATE_DIR/.
+"""
+
+import os
+import re
+import html
+import logging
+import threading
+from functools import lru_cache
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+EMAIL_TEMPLATE_DIR = os.environ.get('EMAIL_TEMPLATE_DIR', '')  # per-site overrides, optional
+BUNDLED_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+TEMPLATE_NAMES = ('notification', 'confirmation', 'digest', 'digest_entry')
+STORED_TEMPLATE_NAMES = ('notification', 'confirmation')  # synced to SES
+PLACEHOLDER = re.compile(r'\{\{\s*(\w+)(?:\|(\w+))?\s*\}\}')
+
+FILTERS = {
+    'nl2br': lambda value: value.replace('\n', '<br>'),
+    'safe': None
+}
+
+class EmailTemplate:
+    """
+    A template split into static segments and placeholders at load time
+
+    Each distinct placeholder is converted (and escaped) once per render,
+    however often it appears; rendering then only fills the placeholder
+    slots of a copy of the segment list and joins it.
+    """
+
+    def __init__(self, source, autoescape):
+        parts = PLACEHOLDER.split(source)
+        self.parts = [parts[0]]
+        self.slots = []
+        placeholders = []
+
+        for index in range(1, len(parts), 3):
+            field, name, segment = parts[index], parts[index + 1], parts[index + 2]
+            if name and name not in FILTERS:
+                raise ValueError(f"Unknown template filter '{name}' on {field}")
+            if (field, name) not in placeholders:
+                placeholders.append((field, name))
+            self.slots.append((len(self.parts), placeholders.index((field, name))))
+            self.parts.extend([None, segment])
+
+        self.converters = [
+            (field, FILTERS.get(name), autoescape and name != 'safe')
+            for field, name in placeholders
+        ]
+
+    def render(self, context):
+        """
+        Render the template
+
+        Args:
+            context: Dict of field values (missing fields render empty)
+
+        Returns:
+            Rendered string
+        """
+        values = self.convert(context)
+        output = self.parts[:]
+        for position, index in self.slots:
+            output[position] = values[index]
+        return ''.join(output)
+
+    def convert(self, context):
+        """Return the escaped and filtered value of each distinct placeholder"""
+        values = []
+        for field, apply_filter, escape in self.converters:
+            value = context.get(field)
+            value = '' if value is None else str(value)
+            if escape:
+                value = html.escape(value)
+            values.append(apply_filter(value) if apply_filter else value)
+        return values
+
+    def to_handlebars(self, prefix):
+        """
+        Return the template in SES (Handlebars) syntax
+
+        Placeholders become unescaped {{{<prefix><index>}}} references to the
+        values from convert, so SES output matches render exactly.
+        """
+        output = self.parts[:]
+        for position, index in self.slots:
+            output[position] = '{{{' + f"{prefix}{index}" + '}}}'
+        return ''.join(output)
+
+def load_template(path):
+    """Read and compile a template file (HTML-escaped if it is a .html file)"""
+    with open(path, encoding='utf-8') as template_file:
+        return EmailTemplate(template_file.read(), autoescape=path.endswith('.html'))
+
+def load_templates(directory):
+    """Compile the html and text templates found in a directory, keyed by file name"""
+    templates = {}
+    for name in TEMPLATE_NAMES:
+        for extension in ('html', 'txt'):
+            path = os.path.join(directory, f"{name}.{extension}")
+            if os.path.isfile(path):
+                templates[f"{name}.{extension}"] = load_template(path)
+    return templates
+
+# Compiled at cold start; overrides are compiled on first use per site
+bundled_templates = load_templates(BUNDLED_TEMPLATE_DIR)
+site_templates = {}
+_lock = threading.Lock()
+
+@lru_cache(maxsize=64)
+def get_site_key(website_url):
+    """Return the site name used for override lookup (the website's host name)"""
+    return urlparse(website_url or '').hostname or ''
+
+def get_templates(site):
+    """
+    Return the compiled templates of a site, overrides taking precedence
+
+    Args:
+        site: Site name from get_site_key
+
+    Returns:
+        Dict of file name to EmailTemplate
+    """
+    templates = site_templates.get(site)
+    if templates is not None:
+        return templates
+
+    with _lock:
+        if site not in site_templates:
+            templates = dict(bundled_templates)
+            if EMAIL_TEMPLATE_DIR:
+                templates.update(load_templates(EMAIL_TEMPLATE_DIR))
+                if site:
+                    templates.update(load_templates(os.path.join(EMAIL_TEMPLATE_DIR, site)))
+            site_templates[site] = templates
+            logger.info(f"Loaded email templates for site '{site or 'default'}'")
+        return site_templates[site]
+
+def render_email(name, context, website_url=None):
+    """
+    Render the HTML and text bodies of an email
+
+    Args:
+        name: Template name (one of TEMPLATE_NAMES)
+        context: Dict of field values
+        website_url: Website URL, selecting the site's overrides
+
+    Returns:
+        Tuple (html_body, text_body)
+    """
+    templates = get_templates(get_site_key(website_url))
+    return templates[f"{name}.html"].render(context), templates[f"{name}.txt"].render(context)
+
+def get_stored_template(name, website_url=None):
+    """
+    Build an SES stored template from a site's templates
+
+    The subject is passed in the template data, as it is set in code.
+
+    Args:
+        name: Template name ('notification' or 'confirmation')
+        website_url: Website URL, selecting the site's overrides
+
+    Returns:
+        Dict with SubjectPart, HtmlPart and TextPart
+    """
+    templates = get_templates(get_site_key(website_url))
+    return {
+        'SubjectPart': '{{{subject_line}}}',
+        'HtmlPart': templates[f"{name}.html"].to_handlebars('h'),
+        'TextPart': templates[f"{name}.txt"].to_handlebars('t')
+    }
+
+def build_template_data(name, context, subject, website_url=None):
+    """
+    Build the SES template data matching get_stored_template
+
+    Args:
+        name: Template name ('notification' or 'confirmation')
+        context: Dict of field values
+        subject: Subject line
+        website_url: Website URL, selecting the site's overrides
+
+    Returns:
+        Dict of template data
+    """
+    templates = get_templates(get_site_key(website_url))
+    data = {'subject_line': subject}
+    for prefix, extension in (('h', 'html'), ('t', 'txt')):
+        values = templates[f"{name}.{extension}"].convert(context)
+        data.update((f"{prefix}{index}", value) for index, value in enumerate(values))
+    return data
@@ -0,0 +1,94 @@
+"""
+AWS Lambda Function for Contact Form Email Delivery
+Sends the email jobs queued by the submission handler (SQS event source, up to 10 per batch)
+
+The event source mapping must enable ReportBatchItemFailures, so only the
+jobs reported in batchItemFailures are retried (and eventually moved to the
+queue's dead-letter queue).
+"""
+
+import json
+import logging
+from email_queue import send_email_job
+from email_service import SES_TEMPLATES_ENABLED, email_pool, send_confirmation_emails
+from metrics import put_metric
+
+# Configure logging
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def lambda_handler(event, context):
+    """
+    Send a batch of queued email jobs concurrently
+
+    With SES stored templates, the batch's confirmations share one
+    SendBulkTemplatedEmail call per site.
+
+    Returns:
+        Partial batch response listing the messages to retry
+    """
+    records = event.get('Records', [])
+    failures = []
+
+    individual = records
+    if SES_TEMPLATES_ENABLED:
+        individual, failed_ids = send_bulk_confirmations(records)
+        failures.extend({'itemIdentifier': message_id} for message_id in failed_ids)
+
+    futures = [(record['messageId'], email_pool.submit(process_record, record)) for record in individual]
+    for message_id, future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            logger.error(f"Email job {message_id} failed: {str(e)}")
+            failures.append({'itemIdentifier': message_id})
+
+    logger.info(f"Sent {len(records) - len(failures)}/{len(records)} queued emails")
+    put_metric('EmailJobsSent', len(records) - len(failures))
+    put_metric('EmailJobsFailed', len(failures))
+    return {'batchItemFailures': failures}
+
+def process_record(record):
+    """
+    Send the email of one SQS record
+
+    Malformed jobs are logged and dropped, as retrying cannot fix them.
+
+    Raises:
+        Exception if sending fails (the message is retried)
+    """
+    try:
+        job = json.loads(record['body'])
+        send_email_job(job)
+    except ValueError as e:
+        logger.error(f"Dropping malformed email job {record.get('messageId')}: {str(e)}")
+
+def send_bulk_confirmations(records):
+    """
+    Send the confirmation jobs of a batch in bulk, grouped by site
+
+    Returns:
+        Tuple (records_left_to_send_individually, failed_message_ids)
+    """
+    individual = []
+    groups = {}
+    for record in records:
+        try:
+            job = json.loads(record['body'])
+        except ValueError:
+            individual.append(record)  # dropped as malformed by process_record
+            continue
+        if not isinstance(job, dict) or job.get('kind') != 'confirmation' or 'formData' not in job:
+            individual.append(record)
+            continue
+        site = (job.get('websiteName'), job.get('websiteUrl'))
+        groups.setdefault(site, []).append((record['messageId'], job['formData']))
+
+    failed_ids = []
+    for (website_name, website_url), jobs in groups.items():
+        errors = send_confirmation_emails([form_data for _, form_data in jobs], website_name, website_url)
+        for (message_id, _), error in zip(jobs, errors):
+            if error:
+                logger.error(f"Email job {message_id} failed: {error}")
+                failed_ids.append(message_id)
+    return individual, failed_ids
@@ -0,0 +1,217 @@
+"""
+Export Module for Contact Form Lambda
+Streams submissions out of DynamoDB with a parallel scan into rotating gzip NDJSON or CSV files
+
+Usage:
+    python export.py --table contact-form-submissions --output-dir ./export
+        [--format ndjson|csv] [--segments 8] [--rotate-rows 100000] [--page-size 1000]
+
+Each scan segment gets its own worker and its own files
+(submissions-seg03-part0002.ndjson.gz, ...). Memory per worker is one scan
+page plus the gzip buffer, whatever the table size. A checkpoint per
+segment is written each time a file is completed; running the same command
+again resumes every unfinished segment after its last completed file.
+"""
+
+import os
+import csv
+import json
+import gzip
+import argparse
+import logging
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from boto3.dynamodb.conditions import Attr
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = [
+    'formId', 'timestamp', 'status', 'formType', 'name', 'email', 'phone',
+    'company', 'subject', 'message', 'lastUpdated', 'metadata'
+]
+
+def export_submissions(table_name, output_dir, fmt='ndjson', segments=8, rotate_rows=100000, page_size=1000):
+    """
+    Export all submissions with one parallel scan worker per segment
+
+    Args:
+        table_name: DynamoDB table name
+        output_dir: Directory for export files and checkpoints
+        fmt: 'ndjson' or 'csv'
+        segments: Parallel scan segments (and workers)
+        rotate_rows: Rows per file before starting the next one
+        page_size: Items per Scan request
+
+    Returns:
+        Dict with 'rows' (exported by this run) and 'files' (all completed files)
+    """
+    if fmt not in ('ndjson', 'csv'):
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    os.makedirs(os.path.join(output_dir, 'checkpoints'), exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        results = list(pool.map(
+            lambda segment: SegmentExporter(
+                table_name, output_dir, fmt, segment, segments, rotate_rows, page_size
+            ).run(),
+            range(segments)
+        ))
+
+    summary = {
+        'rows': sum(rows for rows, _ in results),
+        'files': sorted(path for _, files in results for path in files)
+    }
+    logger.info(f"Exported {summary['rows']} rows from {table_name} into {len(summary['files'])} files")
+    return summary
+
+class SegmentExporter:
+    """
+    Scans one segment and streams its rows into rotating gzip files
+
+    The checkpoint records the scan position after the last completed file,
+    so a resumed export rewrites at most one partially written file.
+    """
+
+    def __init__(self, table_name, output_dir, fmt, segment, total_segments, rotate_rows, page_size):
+        self.table_name = table_name
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.segment = segment
+        self.total_segments = total_segments
+        self.rotate_rows = rotate_rows
+        self.page_size = page_size
+        self.checkpoint_path = os.path.join(output_dir, 'checkpoints', f"segment-{segment:02d}.json")
+
+    def run(self):
+        """
+        Export the segment, resuming from its checkpoint
+
+        Returns:
+            Tuple (rows_exported_by_this_run, completed_file_paths)
+        """
+        checkpoint = self.load_checkpoint()
+        files = checkpoint['files']
+        if checkpoint['done']:
+            logger.info(f"Segment {self.segment} already exported")
+            return 0, files
+
+        # boto3 resources are not thread-safe, so each worker builds its own
+        table = boto3.session.Session().resource('dynamodb').Table(self.table_name)
+        start_key = checkpoint['start_key']
+        part = checkpoint['part']
+        exported = 0
+        writer = None
+
+        while True:
+            scan = {
+                'Segment': self.segment,
+                'TotalSegments': self.total_segments,
+                'Limit': self.page_size,
+                # Skip idempotency records and other non-submission items
+                'FilterExpression': Attr('formType').exists()
+            }
+            if start_key:
+                scan['ExclusiveStartKey'] = start_key
+
+            response = table.scan(**scan)
+            items = response.get('Items', [])
+
+            if items and writer is None:
+                writer = PartWriter(self.part_path(part), self.fmt)
+            for item in items:
+                writer.write(item)
+            exported += len(items)
+
+            start_key = response.get('LastEvaluatedKey')
+            finished = start_key is None
+
+            if writer is not None and (writer.rows >= self.rotate_rows or finished):
+                writer.close()
+                files.append(writer.path)
+                writer = None
+                part += 1
+
+            if finished or writer is None:
+                self.save_checkpoint(start_key, part, files, finished)
+            if finished:
+                logger.info(f"Segment {self.segment} exported {exported} rows")
+                return exported, files
+
+    def part_path(self, part):
+        """Return the path of one of the segment's files"""
+        name = f"submissions-seg{self.segment:02d}-part{part:04d}.{self.fmt}.gz"
+        return os.path.join(self.output_dir, name)
+
+    def load_checkpoint(self):
+        """Read the segment's checkpoint, or a fresh one"""
+        try:
+            with open(self.checkpoint_path) as checkpoint_file:
+                return json.load(checkpoint_file)
+        except FileNotFoundError:
+            return {'start_key': None, 'part': 0, 'files': [], 'done': False}
+
+    def save_checkpoint(self, start_key, part, files, done):
+        """Atomically replace the segment's checkpoint"""
+        temporary_path = f"{self.checkpoint_path}.tmp"
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(
+                {'start_key': start_key, 'part': part, 'files': files, 'done': done},
+                checkpoint_file, default=to_json_value
+            )
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self.checkpoint_path)
+
+class PartWriter:
+    """One gzip-compressed NDJSON or CSV export file"""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self.file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+        if fmt == 'csv':
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+            self.csv_writer.writeheader()
+
+    def write(self, item):
+        """Append one submission"""
+        if self.fmt == 'csv':
+            row = dict(item)
+            if 'metadata' in row:
+                row['metadata'] = json.dumps(row['metadata'], default=to_json_value)
+            self.csv_writer.writerow(row)
+        else:
+            self.file.write(json.dumps(item, default=to_json_value) + '\n')
+        self.rows += 1
+
+    def close(self):
+        """Flush and close the file"""
+        self.file.close()
+
+def to_json_value(value):
+    """JSON fallback for DynamoDB numbers and sets"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value, key=str)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--table', default=os.environ.get('TABLE_NAME', 'contact-form-submissions'))
+    parser.add_argument('--output-dir', required=True)
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--rotate-rows', type=int, default=100000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    summary = export_submissions(
+        args.table, args.output_dir, args.format, args.segments, args.rotate_rows, args.page_size
+    )
+    print(f"Exported {summary['rows']} rows into {len(summary['files'])} files under {args.output_dir}")
@@ -0,0 +1,129 @@
+"""
+Form ID Module for Contact Form Lambda
+Time-sortable submission IDs (ULID format) with timestamp decoding and range bounds
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+# Crockford base32: no I, L, O or U, so IDs survive being read aloud or retyped
+ENCODING = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+DECODING = {char: index for index, char in enumerate(ENCODING)}
+
+ID_LENGTH = 26  # 10 characters of milliseconds, 16 of randomness
+TIME_LENGTH = 10
+RANDOM_BITS = 80
+MAX_RANDOM = (1 << RANDOM_BITS) - 1
+
+LEGACY_PREFIX = 'CONTACT_'
+
+class FormIdGenerator:
+    """
+    ULID generator: 48-bit millisecond timestamp plus 80 random bits
+
+    IDs sort lexicographically by creation time. Within one millisecond (or
+    if the clock steps back) the random part is incremented instead of
+    redrawn, so IDs from one container are strictly increasing.
+    """
+
+    def __init__(self):
+        self.last_ms = 0
+        self.last_random = 0
+        self._lock = threading.Lock()
+
+    def generate(self, now_ms=None):
+        """
+        Return a new ID
+
+        Args:
+            now_ms: Epoch milliseconds (defaults to the current time)
+
+        Returns:
+            26-character ID string
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+
+        with self._lock:
+            if now_ms > self.last_ms:
+                self.last_ms = now_ms
+                self.last_random = int.from_bytes(os.urandom(10), 'big')
+            elif self.last_random < MAX_RANDOM:
+                self.last_random += 1
+            else:
+                # Random part exhausted within this millisecond: borrow the next one
+                self.last_ms += 1
+                self.last_random = 0
+
+            return encode(self.last_ms, self.last_random)
+
+# One generator per container keeps IDs monotonic across warm invocations
+generator = FormIdGenerator()
+
+def generate_form_id():
+    """Return a new time-sortable form ID"""
+    return generator.generate()
+
+def encode(timestamp_ms, randomness):
+    """Encode a millisecond timestamp and 80 random bits as a 26-character ID"""
+    value = (timestamp_ms << RANDOM_BITS) | randomness
+    chars = []
+    for _ in range(ID_LENGTH):
+        chars.append(ENCODING[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+def get_form_id_timestamp_ms(form_id):
+    """
+    Return the creation time of a ULID form ID in epoch milliseconds
+
+    Raises:
+        ValueError if form_id is not a valid ULID
+    """
+    if len(form_id) != ID_LENGTH:
+        raise ValueError(f"Invalid form ID: {form_id}")
+
+    timestamp_ms = 0
+    for char in form_id[:TIME_LENGTH].upper():
+        if char not in DECODING:
+            raise ValueError(f"Invalid form ID: {form_id}")
+        timestamp_ms = timestamp_ms * 32 + DECODING[char]
+    return timestamp_ms
+
+def get_form_id_time(form_id):
+    """
+    Return the creation datetime of a form ID
+
+    Also understands the older CONTACT_YYYYMMDD_HHMMSS_xxxxxxxx IDs (second precision).
+
+    Args:
+        form_id: Form ID
+
+    Returns:
+        Naive local datetime, like the stored timestamps
+
+    Raises:
+        ValueError if form_id is in neither format
+    """
+    if form_id.startswith(LEGACY_PREFIX):
+        return datetime.strptime(form_id[len(LEGACY_PREFIX):len(LEGACY_PREFIX) + 15], '%Y%m%d_%H%M%S')
+    return datetime.fromtimestamp(get_form_id_timestamp_ms(form_id) / 1000)
+
+def get_form_id_bounds(start_time=None, end_time=None):
+    """
+    Return the lowest and highest possible IDs for a time range
+
+    Use them with BETWEEN on a key that sorts by form ID to select
+    submissions made between start_time and end_time (both inclusive).
+
+    Args:
+        start_time: Range start as a datetime (defaults to the epoch)
+        end_time: Range end as a datetime (defaults to the largest ULID time)
+
+    Returns:
+        Tuple (lower_id, upper_id)
+    """
+    start_ms = int(start_time.timestamp() * 1000) if start_time else 0
+    end_ms = int(end_time.timestamp() * 1000) if end_time else (1 << 48) - 1
+    return encode(start_ms, 0), encode(end_ms, MAX_RANDOM)
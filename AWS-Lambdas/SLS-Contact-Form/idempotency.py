@@ -0,0 +1,103 @@
+"""
+Idempotency Module for Contact Form Lambda
+Detects repeated submissions (double-clicks, client retries) with a conditional write
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from botocore.exceptions import ClientError
+from storage import storage_backend
+from storage_backends import StorageError
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+IDEMPOTENCY_ENABLED = os.environ.get('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '3600'))
+IDEMPOTENCY_HEADER = 'idempotency-key'
+KEY_PREFIX = 'IDEMPOTENCY#'
+
+# Fields that make two submissions the same when the client sends no key
+CONTENT_FIELDS = ('name', 'email', 'phone', 'company', 'subject', 'message')
+
+def get_idempotency_key(headers, form_data):
+    """
+    Derive the idempotency key of a submission
+
+    A client-supplied Idempotency-Key header is used when present (scoped to
+    the submitter's email so one client cannot replay another's key);
+    otherwise the key is a hash of the submitted content.
+
+    Args:
+        headers: Request headers (any case)
+        form_data: Sanitized form data
+
+    Returns:
+        Hex digest string
+    """
+    header_key = next(
+        (value for name, value in (headers or {}).items() if name.lower() == IDEMPOTENCY_HEADER and value),
+        None
+    )
+
+    if header_key:
+        material = ['header', header_key.strip()[:255], form_data.get('email', '')]
+    else:
+        material = ['content'] + [form_data.get(field, '') for field in CONTENT_FIELDS]
+
+    return hashlib.sha256(json.dumps(material).encode()).hexdigest()
+
+def claim_submission(idempotency_key, form_id, table_name):
+    """
+    Record that idempotency_key is handled by form_id, unless it already is
+
+    The record lives in the submissions table under its own formId and
+    expires via the expiresAt TTL attribute. It has no status or email, so
+    it stays out of the secondary indexes.
+
+    Args:
+        idempotency_key: Key from get_idempotency_key
+        form_id: ID the new submission will be saved under
+        table_name: DynamoDB table name
+
+    Returns:
+        None if the key was claimed for form_id, or the form ID of the
+        original submission if the key was seen before
+    """
+    now = int(time.time())
+
+    try:
+        # Expired records can linger until TTL deletion runs, so they may be replaced
+        existing = storage_backend.put_if_absent(table_name, {
+            'formId': f"{KEY_PREFIX}{idempotency_key}",
+            'resultFormId': form_id,
+            'expiresAt': now + IDEMPOTENCY_TTL_SECONDS
+        }, now)
+
+    except (ClientError, StorageError) as e:
+        logger.error(f"Error claiming idempotency key: {str(e)}")
+        # Better a rare duplicate than a lost submission
+        return None
+
+    if existing is None:
+        return None
+
+    original_form_id = existing.get('resultFormId')
+    logger.info(f"Duplicate submission of {original_form_id}")
+    return original_form_id
+
+def release_submission(idempotency_key, table_name):
+    """
+    Delete an idempotency record so a failed submission can be retried
+
+    Args:
+        idempotency_key: Key from get_idempotency_key
+        table_name: DynamoDB table name
+    """
+    try:
+        storage_backend.delete(table_name, f"{KEY_PREFIX}{idempotency_key}")
+    except (ClientError, StorageError) as e:
+        logger.error(f"Error releasing idempotency key: {str(e)}")
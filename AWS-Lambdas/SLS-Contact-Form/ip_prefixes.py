@@ -0,0 +1,102 @@
+"""
+IP Prefix Module for Contact Form Lambda
+Maps client IPs to the network prefix their submissions are aggregated under
+"""
+
+import ipaddress
+
+DEFAULT_PREFIX_RULES = '0.0.0.0/0=24,::/0=64'
+
+class PrefixTrie:
+    """
+    Binary trie over address bits mapping networks to values
+
+    Each node is a compact [zero_child, one_child, value] list. A lookup
+    walks at most 32 (IPv4) or 128 (IPv6) bits, so its cost does not grow
+    with the number of stored networks.
+    """
+
+    def __init__(self):
+        self.roots = {4: [None, None, None], 6: [None, None, None]}
+
+    def insert(self, network, value):
+        """
+        Store value for network
+
+        Args:
+            network: ipaddress.IPv4Network or IPv6Network
+            value: Value returned for addresses inside network
+        """
+        node = self.roots[network.version]
+        bits = int(network.network_address)
+        width = network.max_prefixlen
+
+        for position in range(network.prefixlen):
+            bit = (bits >> (width - 1 - position)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        node[2] = value
+
+    def lookup(self, address):
+        """
+        Return the value of the longest stored network containing address
+
+        Args:
+            address: ipaddress.IPv4Address or IPv6Address
+
+        Returns:
+            Stored value, or None if no network matches
+        """
+        node = self.roots[address.version]
+        bits = int(address)
+        width = address.max_prefixlen
+        match = node[2]
+
+        for position in range(width):
+            node = node[(bits >> (width - 1 - position)) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                match = node[2]
+        return match
+
+class PrefixAggregator:
+    """
+    Computes the aggregate network key for an IP from configurable rules
+
+    Rules are 'network=prefix_length' pairs, for example
+    '0.0.0.0/0=24,::/0=64,100.64.0.0/10=20' aggregates IPv4 per /24, IPv6
+    per /64 and carrier-grade NAT space per /20. The most specific network
+    matching an IP decides its prefix length; a length of 0 disables
+    aggregation for that network.
+    """
+
+    def __init__(self, rules=DEFAULT_PREFIX_RULES):
+        self.trie = PrefixTrie()
+        for rule in filter(None, (part.strip() for part in rules.split(','))):
+            network, length = rule.split('=')
+            self.trie.insert(ipaddress.ip_network(network.strip()), int(length))
+
+    def aggregate_key(self, ip_address):
+        """
+        Return the aggregate prefix (e.g. '203.0.113.0/24') for ip_address
+
+        Args:
+            ip_address: Client IP address
+
+        Returns:
+            Prefix string, or None if the IP is invalid or not aggregated
+        """
+        try:
+            address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return None
+
+        length = self.trie.lookup(address)
+        if not length:
+            return None
+
+        width = address.max_prefixlen
+        mask = ((1 << length) - 1) << (width - length)
+        return f"{type(address)(int(address) & mask)}/{length}"
@@ -4,6 +4,7 @@ Handles form submissions with rate limiting, validation, and email notifications
 """
 
 import json
+import math
 import os
 import logging
 from datetime import datetime
@@ -11,8 +12,12 @@ from datetime import datetime
 # Import modules
 from validation import validate_contact_form, check_honeypot
 from rate_limiting import check_rate_limit
-from storage import save_to_dynamodb
+from storage import save_to_dynamodb, build_form_item
 from email_service import send_emails
+from email_queue import EMAIL_QUEUE_ENABLED, enqueue_emails, send_email_job
+from form_ids import generate_form_id
+from idempotency import IDEMPOTENCY_ENABLED, get_idempotency_key, claim_submission, release_submission
+from spool import spool_item, start_replay
 
 # Configure logging
 logger = logging.getLogger()
@@ -38,24 +43,15 @@ def lambda_handler(event, context):
                 'body': ''
             }
         
+        # Write back submissions spooled while DynamoDB was failing
+        start_replay(TABLE_NAME)
+        
         # Parse request body
         body = parse_request_body(event)
         
         # Extract IP address for rate limiting
         ip_address = extract_ip_address(event)
         
-        # Check rate limiting
-        is_allowed, rate_limit_message, retry_after = check_rate_limit(ip_address)
-        if not is_allowed:
-            logger.warning(f"Rate limit exceeded for IP: {ip_address}")
-            return create_response(
-                status_code=429,
-                success=False,
-                message=rate_limit_message,
-                error_code='RATE_LIMIT',
-                retry_after=retry_after
-            )
-        
         # Check honeypot (bot protection)
         if not check_honeypot(body):
             logger.warning(f"Bot detected via honeypot from IP: {ip_address}")
@@ -94,28 +90,74 @@ def lambda_handler(event, context):
             }
         }
         
+        # Urgent submissions bypass the admin notification digest
+        if body.get('urgent') is True:
+            form_data['urgent'] = True
+        
+        form_id = generate_form_id()
+        
+        # Repeated submissions (double-clicks, retries) get the original reply without saving or emailing again.
+        # They are caught before the rate limiter, so they cost one conditional write and no quota.
+        idempotency_key = None
+        if IDEMPOTENCY_ENABLED:
+            idempotency_key = get_idempotency_key(event.get('headers'), form_data)
+            original_form_id = claim_submission(idempotency_key, form_id, TABLE_NAME)
+            if original_form_id:
+                logger.info(f"Duplicate submission from IP {ip_address}, returning {original_form_id}")
+                return create_response(
+                    status_code=200,
+                    success=True,
+                    message="Your message has been sent successfully. We'll get back to you soon.",
+                    form_id=original_form_id
+                )
+        
+        # Check rate limiting
+        is_allowed, rate_limit_message, retry_after, rate_limit = check_rate_limit(ip_address)
+        if not is_allowed:
+            logger.warning(f"Rate limit exceeded for IP: {ip_address}")
+            # Let the submission through once the client may retry
+            if idempotency_key:
+                release_submission(idempotency_key, TABLE_NAME)
+            return create_response(
+                status_code=429,
+                success=False,
+                message=rate_limit_message,
+                error_code='RATE_LIMIT',
+                retry_after=retry_after,
+                rate_limit=rate_limit
+            )
+        
         # Save to DynamoDB
         try:
-            form_id = save_to_dynamodb(form_data, TABLE_NAME)
+            form_id = save_to_dynamodb(form_data, TABLE_NAME, form_id=form_id)
             logger.info(f"Form saved with ID: {form_id}")
         except Exception as e:
             logger.error(f"Database error: {str(e)}")
-            return create_response(
-                status_code=500,
-                success=False,
-                message="Failed to process your submission. Please try again.",
-                error_code='SERVER_ERROR'
-            )
+            # Keep the lead in the local spool; it is written to DynamoDB on a later invocation
+            if not spool_item(build_form_item(form_data, form_id)):
+                if idempotency_key:
+                    release_submission(idempotency_key, TABLE_NAME)
+                return create_response(
+                    status_code=500,
+                    success=False,
+                    message="Failed to process your submission. Please try again.",
+                    error_code='SERVER_ERROR'
+                )
         
         # Send emails (non-blocking - don't fail if email fails)
         try:
-            send_emails(
-                form_data=form_data,
-                form_id=form_id,
-                website_name=WEBSITE_NAME,
-                website_url=WEBSITE_URL,
-                notification_email=NOTIFICATION_EMAIL
-            )
+            if EMAIL_QUEUE_ENABLED:
+                # The email worker sends them; only jobs that could not be queued are sent here
+                for job in enqueue_emails(form_data, form_id, WEBSITE_NAME, WEBSITE_URL, NOTIFICATION_EMAIL):
+                    send_email_job(job)
+            else:
+                send_emails(
+                    form_data=form_data,
+                    form_id=form_id,
+                    website_name=WEBSITE_NAME,
+                    website_url=WEBSITE_URL,
+                    notification_email=NOTIFICATION_EMAIL
+                )
         except Exception as e:
             logger.error(f"Email sending failed: {str(e)}")
             # Continue - don't fail the submission
@@ -125,7 +167,8 @@ def lambda_handler(event, context):
             status_code=200,
             success=True,
             message="Your message has been sent successfully. We'll get back to you soon.",
-            form_id=form_id
+            form_id=form_id,
+            rate_limit=rate_limit
         )
         
     except Exception as e:
@@ -165,12 +208,41 @@ def get_cors_headers():
     """Return CORS headers for responses"""
     return {
         'Access-Control-Allow-Origin': '*',  # Update to your domain in production
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,Idempotency-Key',
         'Access-Control-Allow-Methods': 'POST,OPTIONS',
+        'Access-Control-Expose-Headers': 'RateLimit-Limit,RateLimit-Remaining,RateLimit-Reset,Retry-After',
         'Access-Control-Max-Age': '86400'
     }
 
-def create_response(status_code, success, message, error_code=None, retry_after=None, errors=None, form_id=None):
+def get_rate_limit_headers(rate_limit, include_retry_after=False):
+    """
+    Build RateLimit-* headers (IETF draft) from a RateLimitResult
+    
+    Args:
+        rate_limit: RateLimitResult of the window closest to its limit
+        include_retry_after: Also add Retry-After (for rejected requests)
+        
+    Returns:
+        Dict of headers with reset delays in seconds
+    """
+    reset_seconds = max(0, math.ceil((rate_limit.reset_time - datetime.now()).total_seconds()))
+    headers = {
+        'RateLimit-Limit': str(rate_limit.limit),
+        'RateLimit-Reset': str(reset_seconds)
+    }
+    
+    # Counts are unknown when a DynamoDB transaction accepted the submission
+    if rate_limit.count is not None:
+        remaining = 0 if not rate_limit.allowed else rate_limit.limit - rate_limit.count
+        headers['RateLimit-Remaining'] = str(max(0, remaining))
+    
+    if include_retry_after:
+        headers['Retry-After'] = str(max(1, reset_seconds))
+    
+    return headers
+
+def create_response(status_code, success, message, error_code=None, retry_after=None, errors=None, form_id=None,
+                    rate_limit=None):
     """
     Create standardized Lambda response matching frontend expectations
     
@@ -182,6 +254,7 @@ def create_response(status_code, success, message, error_code=None, retry_after=
         retry_after: Minutes until retry allowed (for rate limiting)
         errors: Validation errors object
         form_id: Unique form submission ID
+        rate_limit: RateLimitResult to report in RateLimit-* headers
     """
     body = {
         'success': success,
@@ -200,8 +273,12 @@ def create_response(status_code, success, message, error_code=None, retry_after=
     if form_id:
         body['formId'] = form_id
     
+    headers = get_cors_headers()
+    if rate_limit is not None:
+        headers.update(get_rate_limit_headers(rate_limit, include_retry_after=status_code == 429))
+    
     return {
         'statusCode': status_code,
-        'headers': get_cors_headers(),
+        'headers': headers,
         'body': json.dumps(body)
     }
\ No newline at end of file
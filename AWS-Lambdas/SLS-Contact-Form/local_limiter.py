@@ -0,0 +1,91 @@
+"""
+Local Rate Limiter for Contact Form Lambda
+In-process token buckets per IP and per network prefix, checked before the distributed limiter
+"""
+
+import math
+import threading
+from datetime import datetime, timedelta
+from ttl_cache import TTLCache
+from ip_prefixes import PrefixAggregator
+from rate_limit_algorithms import RateLimitResult
+
+class LocalRateLimiter:
+    """
+    Token buckets per client IP and per network prefix
+
+    Buckets live in the warm container only, so they catch floods hitting
+    one container without any network call. A submission needs a token from
+    both its IP bucket and its prefix bucket. Prefixes come from
+    prefix_aggregator (IPv4 /24 and IPv6 /64 by default). A capacity of 0
+    or less disables that bucket. Idle buckets are dropped once they would
+    have refilled completely.
+    """
+
+    def __init__(self, capacity, refill_per_second, prefix_capacity, prefix_refill_per_second,
+                 max_entries=4096, prefix_aggregator=None):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.prefix_capacity = prefix_capacity
+        self.prefix_refill_per_second = prefix_refill_per_second
+        self.prefix_aggregator = prefix_aggregator or PrefixAggregator()
+        self.buckets = TTLCache(max_entries)
+        self._lock = threading.Lock()
+
+    def check(self, ip_address, now=None):
+        """
+        Take a token for ip_address if its IP and prefix buckets both have one
+
+        Args:
+            ip_address: Client IP address
+            now: Current datetime (defaults to now)
+
+        Returns:
+            RateLimitResult for the bucket that had no token when rejected,
+            otherwise for the bucket with fewer tokens left; None if both
+            buckets are disabled
+        """
+        now = now or datetime.now()
+        timestamp = now.timestamp()
+
+        buckets = []
+        if self.capacity > 0:
+            buckets.append((f"ip#{ip_address}", self.capacity, self.refill_per_second))
+        prefix = self.prefix_aggregator.aggregate_key(ip_address)
+        if prefix and self.prefix_capacity > 0:
+            buckets.append((f"prefix#{prefix}", self.prefix_capacity, self.prefix_refill_per_second))
+        if not buckets:
+            return None
+
+        with self._lock:
+            levels = [
+                (key, capacity, refill, self.get_tokens(key, capacity, refill, timestamp))
+                for key, capacity, refill in buckets
+            ]
+            allowed = all(tokens >= 1 for _, _, _, tokens in levels)
+
+            for key, capacity, refill, tokens in levels:
+                if allowed:
+                    tokens -= 1
+                full_in = (capacity - tokens) / refill if refill > 0 else 86400
+                self.buckets.set(key, (tokens, timestamp), max(full_in, 1))
+
+        if allowed:
+            # Report the tightest bucket
+            key, capacity, refill, tokens = min(levels, key=lambda level: level[3] / level[1])
+            tokens -= 1
+        else:
+            key, capacity, refill, tokens = next(level for level in levels if level[3] < 1)
+        wait_seconds = max(0, 1 - tokens) / refill if refill > 0 else 86400
+        return RateLimitResult(
+            allowed, 'burst', capacity - math.floor(tokens), capacity,
+            now + timedelta(seconds=wait_seconds)
+        )
+
+    def get_tokens(self, key, capacity, refill_per_second, timestamp):
+        """Return the refilled token count for a bucket (lock held)"""
+        state = self.buckets.get(key)
+        if state is None:
+            return capacity
+        tokens, updated_at = state
+        return min(capacity, tokens + (timestamp - updated_at) * refill_per_second)
@@ -0,0 +1,42 @@
+"""
+Metrics Module for Contact Form Lambda
+Publishes CloudWatch metrics through the Embedded Metric Format (EMF) in function logs
+"""
+
+import json
+import os
+import time
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ContactForm')
+
+def put_metric(name, value, unit='Count', dimensions=None, properties=None):
+    """
+    Emit a single metric as an EMF log line
+
+    CloudWatch extracts the metric from the Lambda log stream, so this costs
+    no API call on the request path.
+
+    Args:
+        name: Metric name
+        value: Metric value
+        unit: CloudWatch unit (Count, Milliseconds, ...)
+        dimensions: Dict of dimension name to value
+        properties: Extra searchable fields logged alongside the metric
+    """
+    dimensions = dimensions or {}
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': unit}]
+            }]
+        },
+        name: value
+    }
+    record.update(dimensions)
+    record.update(properties or {})
+
+    # EMF lines must be bare JSON, so bypass the logging formatter
+    print(json.dumps(record, default=str), flush=True)
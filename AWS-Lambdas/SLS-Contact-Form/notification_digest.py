@@ -0,0 +1,189 @@
+"""
+Notification Digest Module for Contact Form Lambda
+Collects admin notifications during busy periods and hands them out as one summary
+
+Each site has a digest item (DIGEST#<host>) in the submissions table holding
+one entry:<formId> attribute per pending notification. A digest is due once it
+holds DIGEST_MAX_SUBMISSIONS entries or DIGEST_INTERVAL_MINUTES have passed
+since the last one, so the first submission after a quiet period is still
+reported right away. The sender claims a due digest with a short lease
+(a conditional write), so concurrent invocations never send it twice, and
+removes exactly the entries it sent. While sending keeps failing, a digest
+takes at most DIGEST_MAX_PENDING entries (plus any added concurrently with
+the last one), keeping the item far below DynamoDB's 400 KB limit; further
+notifications are sent on their own.
+"""
+
+import os
+import time
+import logging
+from botocore.exceptions import ClientError
+from email_templates import get_site_key
+from storage import storage_backend
+from storage_backends import ConditionFailedError, StorageError
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+NOTIFICATION_DIGEST_ENABLED = os.environ.get('NOTIFICATION_DIGEST_ENABLED', 'false').lower() == 'true'
+DIGEST_INTERVAL_MINUTES = int(os.environ.get('DIGEST_INTERVAL_MINUTES', '15'))
+DIGEST_MAX_SUBMISSIONS = int(os.environ.get('DIGEST_MAX_SUBMISSIONS', '25'))
+DIGEST_URGENT_KEYWORDS = [
+    keyword.strip().lower()
+    for keyword in os.environ.get('DIGEST_URGENT_KEYWORDS', 'urgent,emergency').split(',')
+    if keyword.strip()
+]
+DIGEST_MAX_PENDING = int(os.environ.get('DIGEST_MAX_PENDING', '100'))
+DIGEST_LEASE_SECONDS = 60
+DIGEST_TABLE = os.environ.get('TABLE_NAME', 'contact-form-submissions')
+
+DIGEST_KEY_PREFIX = 'DIGEST#'
+ENTRY_PREFIX = 'entry:'
+MESSAGE_PREVIEW_LENGTH = 200
+
+class DigestFullError(StorageError):
+    """The site's digest already holds DIGEST_MAX_PENDING entries"""
+
+def is_urgent(form_data):
+    """
+    Return True if a submission must be notified immediately
+
+    A submission is urgent if it is flagged as such or its subject or
+    message contains one of DIGEST_URGENT_KEYWORDS.
+    """
+    if form_data.get('urgent'):
+        return True
+
+    text = f"{form_data.get('subject', '')} {form_data.get('message', '')}".lower()
+    return any(keyword in text for keyword in DIGEST_URGENT_KEYWORDS)
+
+def build_digest_entry(form_data, form_id):
+    """
+    Build the digest entry of a submission (its key fields only)
+
+    Returns:
+        Entry dict
+    """
+    message = form_data.get('message', '')
+    return {
+        'formId': form_id,
+        'submittedAt': (form_data.get('metadata') or {}).get('submittedAt', ''),
+        'name': form_data.get('name', ''),
+        'email': form_data.get('email', ''),
+        'phone': form_data.get('phone', ''),
+        'subject': form_data.get('subject', ''),
+        'messagePreview': message[:MESSAGE_PREVIEW_LENGTH] + ('...' if len(message) > MESSAGE_PREVIEW_LENGTH else '')
+    }
+
+def get_digest_key(website_url):
+    """Return the formId of a site's digest item"""
+    return f"{DIGEST_KEY_PREFIX}{get_site_key(website_url)}"
+
+def add_to_digest(entry, website_name, website_url, notification_email, now=None):
+    """
+    Add a notification to the site's digest and claim the digest if it is due
+
+    Args:
+        entry: Entry from build_digest_entry
+        website_name: Name of the website
+        website_url: Website URL
+        notification_email: Admin email the digest goes to
+        now: Epoch seconds (defaults to the current time)
+
+    Returns:
+        Claimed digest to send (see claim_digest), or None
+
+    Raises:
+        DigestFullError if the digest is full, ClientError or StorageError
+        if the entry could not be stored
+    """
+    key = get_digest_key(website_url)
+    item = storage_backend.get(DIGEST_TABLE, key) or {}
+
+    pending = sum(1 for name in item if name.startswith(ENTRY_PREFIX))
+    if pending >= DIGEST_MAX_PENDING:
+        raise DigestFullError(f"Notification digest {key} already holds {pending} entries")
+
+    storage_backend.update(DIGEST_TABLE, key, {
+        f"{ENTRY_PREFIX}{entry['formId']}": entry,
+        'websiteName': website_name,
+        'websiteUrl': website_url,
+        'notificationEmail': notification_email
+    })
+    logger.info(f"Added form {entry['formId']} to the notification digest")
+    return claim_digest(website_url, now)
+
+def claim_digest(website_url, now=None):
+    """
+    Claim the site's digest for sending if it is due and not claimed already
+
+    Args:
+        website_url: Website URL
+        now: Epoch seconds (defaults to the current time)
+
+    Returns:
+        Dict with 'key', 'lease', 'entries' (oldest first), 'websiteName',
+        'websiteUrl' and 'notificationEmail', or None if nothing is due
+    """
+    now = int(now if now is not None else time.time())
+    key = get_digest_key(website_url)
+
+    try:
+        item = storage_backend.get(DIGEST_TABLE, key)
+        if item is None:
+            return None
+
+        entries = [value for name, value in item.items() if name.startswith(ENTRY_PREFIX)]
+        last_sent_at = int(item.get('lastSentAt', 0))
+        if not entries:
+            return None
+        if len(entries) < DIGEST_MAX_SUBMISSIONS and now - last_sent_at < DIGEST_INTERVAL_MINUTES * 60:
+            return None
+
+        current_lease = item.get('leaseUntil')
+        if current_lease is not None and int(current_lease) > now:
+            return None
+
+        lease = now + DIGEST_LEASE_SECONDS
+        storage_backend.update(DIGEST_TABLE, key, {'leaseUntil': lease}, expected={'leaseUntil': current_lease})
+
+    except ConditionFailedError:
+        # Another invocation claimed it first
+        return None
+    except (ClientError, StorageError) as e:
+        logger.error(f"Error claiming notification digest {key}: {str(e)}")
+        return None
+
+    return {
+        'key': key,
+        'lease': lease,
+        'entries': sorted(entries, key=lambda entry: (entry.get('submittedAt', ''), entry.get('formId', ''))),
+        'websiteName': item.get('websiteName'),
+        'websiteUrl': item.get('websiteUrl'),
+        'notificationEmail': item.get('notificationEmail')
+    }
+
+def complete_digest(digest, now=None):
+    """Remove the entries of a sent digest and release its lease"""
+    now = int(now if now is not None else time.time())
+    try:
+        storage_backend.update(
+            DIGEST_TABLE, digest['key'], {'lastSentAt': now},
+            expected={'leaseUntil': digest['lease']},
+            remove=[f"{ENTRY_PREFIX}{entry['formId']}" for entry in digest['entries']] + ['leaseUntil']
+        )
+    except ConditionFailedError:
+        logger.warning(f"Lease on {digest['key']} expired while sending; entries may be sent again")
+    except (ClientError, StorageError) as e:
+        logger.error(f"Error completing notification digest {digest['key']}: {str(e)}")
+
+def release_digest(digest):
+    """Release the lease of a digest that could not be sent, keeping its entries"""
+    try:
+        storage_backend.update(
+            DIGEST_TABLE, digest['key'], {},
+            expected={'leaseUntil': digest['lease']},
+            remove=['leaseUntil']
+        )
+    except (ClientError, StorageError) as e:
+        logger.error(f"Error releasing notification digest {digest['key']}: {str(e)}")
@@ -0,0 +1,366 @@
+"""
+Rate Limiting Algorithms for Contact Form Lambda
+Fixed window, sliding window counter and GCRA limiters over a pluggable backend
+"""
+
+import math
+import logging
+from collections import namedtuple
+from datetime import timedelta
+from ttl_cache import TTLCache
+from rate_limit_backends import get_day_bucket, get_hour_bucket
+
+logger = logging.getLogger(__name__)
+
+# Outcome of a rate limit check for the window closest to its limit
+# window is 'hour', 'day', 'network_hour', 'network_day' or 'burst'; reset_time is when the client may retry
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'window', 'count', 'limit', 'reset_time'])
+
+DAY_ITEM_TTL_SECONDS = 172800  # 2 days
+
+def get_limiter(algorithm, backend, hourly_limit, daily_limit, prefix_hourly_limit=0, prefix_daily_limit=0):
+    """
+    Build the rate limiter for the configured algorithm
+
+    Args:
+        algorithm: 'fixed_window', 'sliding_window' or 'gcra'
+        backend: Rate limit backend (see rate_limit_backends)
+        hourly_limit: Maximum submissions per hour
+        daily_limit: Maximum submissions per day
+        prefix_hourly_limit: Maximum submissions per hour per network prefix (0 disables)
+        prefix_daily_limit: Maximum submissions per day per network prefix
+
+    Returns:
+        Rate limiter instance
+    """
+    limiters = {
+        'fixed_window': FixedWindowLimiter,
+        'sliding_window': SlidingWindowLimiter,
+        'gcra': GCRALimiter
+    }
+
+    if algorithm not in limiters:
+        raise ValueError(f"Unknown rate limiting algorithm: {algorithm}")
+
+    return limiters[algorithm](backend, hourly_limit, daily_limit, prefix_hourly_limit, prefix_daily_limit)
+
+class FixedWindowLimiter:
+    """
+    Calendar hour and day buckets
+
+    An IP's hour and day buckets are stored together by the backend, so both
+    windows are checked and incremented in one conditional increment. A
+    client can send up to twice the limit across a boundary.
+    Network prefix counters, when enabled, join the same backend call.
+    """
+
+    def __init__(self, backend, hourly_limit, daily_limit, prefix_hourly_limit=0, prefix_daily_limit=0):
+        self.backend = backend
+        self.hourly_limit = hourly_limit
+        self.daily_limit = daily_limit
+        self.prefix_hourly_limit = prefix_hourly_limit
+        self.prefix_daily_limit = prefix_daily_limit
+
+    def check(self, ip_address, now, prefix=None):
+        """
+        Check and record a submission
+
+        Args:
+            ip_address: Client IP address
+            now: Current datetime
+            prefix: Network prefix the IP is aggregated under, if any
+
+        Returns:
+            RateLimitResult
+        """
+        hour_bucket = get_hour_bucket(now)
+        day_bucket = get_day_bucket(now)
+        subjects = get_subjects(self, ip_address, prefix)
+
+        is_allowed, counts_list = self.backend.increment_many(
+            [
+                (subject, {hour_bucket: hourly_limit, day_bucket: daily_limit})
+                for subject, _, hourly_limit, daily_limit in subjects
+            ],
+            DAY_ITEM_TTL_SECONDS
+        )
+
+        outcomes = []
+        for (_, scope, hourly_limit, daily_limit), counts in zip(subjects, counts_list):
+            if counts is None:
+                continue
+            hourly_count = counts[hour_bucket]
+            daily_count = counts[day_bucket]
+            outcomes.append((
+                RateLimitResult(is_allowed, f"{scope}hour", hourly_count, hourly_limit, next_hour(now)),
+                hourly_count >= hourly_limit
+            ))
+            outcomes.append((
+                RateLimitResult(is_allowed, f"{scope}day", daily_count, daily_limit, next_day(now)),
+                daily_count >= daily_limit
+            ))
+
+        return pick_result(
+            is_allowed, outcomes,
+            RateLimitResult(is_allowed, 'hour', None, self.hourly_limit, next_hour(now))
+        )
+
+class SlidingWindowLimiter:
+    """
+    Sliding window counter over the fixed window buckets
+
+    The previous window's count is weighted by how much of it still overlaps
+    the sliding window, which removes the 2x burst at bucket boundaries.
+    Previous windows are closed, so their counts are read once per container
+    and cached until the current window ends.
+    """
+
+    def __init__(self, backend, hourly_limit, daily_limit, prefix_hourly_limit=0, prefix_daily_limit=0):
+        self.backend = backend
+        self.hourly_limit = hourly_limit
+        self.daily_limit = daily_limit
+        self.prefix_hourly_limit = prefix_hourly_limit
+        self.prefix_daily_limit = prefix_daily_limit
+        self.previous_counts = TTLCache(1024)
+
+    def check(self, ip_address, now, prefix=None):
+        """
+        Check and record a submission
+
+        Args:
+            ip_address: Client IP address
+            now: Current datetime
+            prefix: Network prefix the IP is aggregated under, if any
+
+        Returns:
+            RateLimitResult
+        """
+        hour_start = now.replace(minute=0, second=0, microsecond=0)
+        day_start = hour_start.replace(hour=0)
+        hour_weight = 1 - (now - hour_start).total_seconds() / 3600
+        day_weight = 1 - (now - day_start).total_seconds() / 86400
+
+        subjects = get_subjects(self, ip_address, prefix)
+        previous = self.get_previous_counts([subject for subject, _, _, _ in subjects], now)
+        hour_bucket = get_hour_bucket(now)
+        day_bucket = get_day_bucket(now)
+
+        # Allow the submission only if the weighted estimates stay within the limits
+        caps = []
+        for subject, _, hourly_limit, daily_limit in subjects:
+            previous_hour, previous_day = previous[subject]
+            caps.append((
+                math.floor(hourly_limit - previous_hour * hour_weight),
+                math.floor(daily_limit - previous_day * day_weight)
+            ))
+
+        is_allowed, counts_list = self.backend.increment_many(
+            [
+                (subject, {hour_bucket: hour_cap, day_bucket: day_cap})
+                for (subject, _, _, _), (hour_cap, day_cap) in zip(subjects, caps)
+            ],
+            DAY_ITEM_TTL_SECONDS
+        )
+
+        outcomes = []
+        for (subject, scope, hourly_limit, daily_limit), (hour_cap, day_cap), counts in zip(subjects, caps, counts_list):
+            if counts is None:
+                continue
+            previous_hour, previous_day = previous[subject]
+            hourly_count = counts[hour_bucket]
+            daily_count = counts[day_bucket]
+
+            outcomes.append((
+                RateLimitResult(
+                    is_allowed, f"{scope}hour", math.ceil(previous_hour * hour_weight + hourly_count), hourly_limit,
+                    sliding_reset_time(now, hour_start, timedelta(hours=1), previous_hour, hourly_count, hourly_limit)
+                ),
+                hourly_count >= hour_cap
+            ))
+            outcomes.append((
+                RateLimitResult(
+                    is_allowed, f"{scope}day", math.ceil(previous_day * day_weight + daily_count), daily_limit,
+                    sliding_reset_time(now, day_start, timedelta(days=1), previous_day, daily_count, daily_limit)
+                ),
+                daily_count >= day_cap
+            ))
+
+        return pick_result(
+            is_allowed, outcomes,
+            RateLimitResult(is_allowed, 'hour', None, self.hourly_limit, next_hour(now))
+        )
+
+    def get_previous_counts(self, subjects, now):
+        """
+        Get the previous hour and previous day counts for IPs or prefixes
+
+        Args:
+            subjects: IP addresses or network prefixes
+            now: Current datetime
+
+        Returns:
+            Dict mapping subject to (previous_hour_count, previous_day_count)
+        """
+        previous = {}
+        missing = []
+        for subject in subjects:
+            cached = self.previous_counts.get(f"{subject}#{now.strftime('%Y%m%d%H')}")
+            if cached is None:
+                missing.append(subject)
+            else:
+                previous[subject] = cached
+
+        if not missing:
+            return previous
+
+        previous_hour_bucket = get_hour_bucket(now - timedelta(hours=1))
+        previous_day_bucket = get_day_bucket(now - timedelta(days=1))
+        counts = self.backend.get_counts({
+            subject: [previous_hour_bucket, previous_day_bucket] for subject in missing
+        })
+
+        for subject in missing:
+            previous[subject] = (counts[subject][previous_hour_bucket], counts[subject][previous_day_bucket])
+            self.previous_counts.set(
+                f"{subject}#{now.strftime('%Y%m%d%H')}", previous[subject], (next_hour(now) - now).total_seconds()
+            )
+
+        return previous
+
+class GCRALimiter:
+    """
+    Generic cell rate algorithm (a token bucket stored as one timestamp)
+
+    Each IP has a single item holding its theoretical arrival time (TAT).
+    DAILY_LIMIT sets the sustained rate and HOURLY_LIMIT the burst size, so
+    submissions are spread out smoothly instead of reset on calendar
+    boundaries. Network prefix limits are not applied by this algorithm.
+    """
+
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, backend, hourly_limit, daily_limit, prefix_hourly_limit=0, prefix_daily_limit=0):
+        self.backend = backend
+        self.burst = hourly_limit
+        self.emission_interval_ms = max(1, int(86400000 / daily_limit))
+        self.tolerance_ms = self.emission_interval_ms * (hourly_limit - 1)
+        self.known_tats = TTLCache(1024)
+
+    def check(self, ip_address, now, prefix=None):
+        """
+        Check and record a submission
+
+        Args:
+            ip_address: Client IP address
+            now: Current datetime
+            prefix: Ignored (GCRA keeps a single timestamp per IP)
+
+        Returns:
+            RateLimitResult
+        """
+        rate_key = f"{ip_address}#gcra"
+        now_ms = int(now.timestamp() * 1000)
+
+        # Start from the last TAT seen in this container to usually need one write
+        stored_tat = self.known_tats.get(rate_key)
+
+        for _ in range(self.MAX_ATTEMPTS):
+            tat = max(stored_tat or now_ms, now_ms)
+
+            if tat - now_ms > self.tolerance_ms:
+                self.known_tats.set(rate_key, stored_tat, (tat - now_ms) / 1000)
+                return self.result(False, tat, now, now_ms)
+
+            new_tat = tat + self.emission_interval_ms
+            swapped, current = self.backend.compare_and_set(
+                rate_key, 'tat', stored_tat, new_tat,
+                math.ceil(new_tat / 1000) + 60
+            )
+
+            if swapped:
+                self.known_tats.set(rate_key, new_tat, (new_tat - now_ms) / 1000)
+                return self.result(True, new_tat, now, now_ms)
+
+            stored_tat = int(current) if current is not None else None
+
+        # Still losing the race after several attempts: the IP is flooding, so reject
+        logger.warning(f"GCRA update for {rate_key} kept conflicting, rejecting")
+        return self.result(False, max(stored_tat or now_ms, now_ms), now, now_ms)
+
+    def result(self, allowed, tat, now, now_ms):
+        """
+        Build a RateLimitResult from a theoretical arrival time
+        """
+        used = min(self.burst, math.ceil((tat - now_ms) / self.emission_interval_ms))
+        if allowed:
+            reset_ms = tat - now_ms
+        else:
+            reset_ms = tat - self.tolerance_ms - now_ms
+        return RateLimitResult(allowed, 'burst', used, self.burst, now + timedelta(milliseconds=reset_ms))
+
+def get_subjects(limiter, ip_address, prefix):
+    """
+    List what a submission counts against: the IP and, if enabled, its network prefix
+
+    Returns:
+        List of (subject, window_scope, hourly_limit, daily_limit) tuples
+    """
+    subjects = [(ip_address, '', limiter.hourly_limit, limiter.daily_limit)]
+    if prefix and limiter.prefix_hourly_limit > 0:
+        subjects.append((prefix, 'network_', limiter.prefix_hourly_limit, limiter.prefix_daily_limit))
+    return subjects
+
+def pick_result(is_allowed, outcomes, default):
+    """
+    Choose the result to report from (RateLimitResult, exceeded) pairs
+
+    A rejection reports the first exceeded window; an accepted submission
+    reports the window with the least room left.
+    """
+    if not outcomes:
+        return default
+    if not is_allowed:
+        return next((result for result, exceeded in outcomes if exceeded), outcomes[0][0])
+    return min((result for result, _ in outcomes), key=lambda result: result.limit - result.count)
+
+def next_hour(moment):
+    """Return the start of the hour after moment"""
+    return moment.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+def next_day(moment):
+    """Return midnight after moment"""
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+def sliding_reset_time(now, window_start, window_length, previous_count, current_count, limit):
+    """
+    Return when a sliding window estimate next leaves room for a submission
+
+    If there is room already, return when the oldest counted submission
+    leaves the window instead. The previous window's submissions count as
+    evenly spread, so one slides out every window_length / previous_count.
+
+    Args:
+        now: Current datetime
+        window_start: Start of the current fixed window
+        window_length: Window length as a timedelta
+        previous_count: Count of the previous fixed window
+        current_count: Count of the current fixed window
+        limit: Window limit
+    """
+    if current_count + 1 <= limit:
+        # Wait until enough of the previous window has slid out
+        fraction = max(0, 1 - (limit - current_count - 1) / previous_count) if previous_count else 0
+    else:
+        # The current window becomes the previous one and must slide out instead
+        fraction = 1 + max(0, 1 - (limit - 1) / current_count)
+
+    reset_time = window_start + window_length * fraction
+    if reset_time > now:
+        return reset_time
+
+    if previous_count:
+        step = window_length / previous_count
+        return window_start + step * ((now - window_start) // step + 1)
+    # Only the current window counts; its first submission starts sliding
+    # out once it is the previous one
+    return window_start + window_length + window_length / max(1, current_count)
@@ -0,0 +1,924 @@
+"""
+Rate Limit Storage Backends for Contact Form Lambda
+DynamoDB, in-memory and Redis-protocol counter stores used by the rate limiters
+"""
+
+import math
+import random
+import socket
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import BotoCoreError, ClientError
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+deserializer = TypeDeserializer()
+
+# Counters are addressed by subject (an IP or network prefix) and bucket name,
+# 'hYYYYMMDDHH' for an hour or 'dYYYYMMDD' for a day. Every backend offers:
+#   increment(subject, limits, ttl_seconds) -> (is_allowed, counts)
+#   increment_many([(subject, limits), ...], ttl_seconds) -> (is_allowed, [counts, ...])
+#   get_counts({subject: [bucket, ...]}) -> {subject: {bucket: count}}
+#   compare_and_set(rate_key, attribute, expected, new_value, expires_at) -> (swapped, current_value)
+# where limits maps bucket name to limit and counts maps bucket name to count.
+
+# DynamoDB item layouts:
+#   daily   - one item per subject per day ('<subject>#YYYYMMDD') holding
+#             submission_count and hour_HH counters
+#   compact - one item per subject holding its bucket counters, stale buckets
+#             pruned on write
+#   dual    - writes compact items and also counts the daily items, so
+#             containers can switch from daily to compact live; move on to
+#             compact once the daily items have expired (2 days)
+DYNAMODB_LAYOUTS = ('daily', 'compact', 'dual')
+
+def get_backend(name, table=None, redis_url=None, shard_count=1, hot_key_threshold=20, layout='daily'):
+    """
+    Build the rate limit backend for the configured name
+
+    Args:
+        name: 'dynamodb', 'memory' or 'redis'
+        table: DynamoDB table (dynamodb backend)
+        redis_url: redis://host:port/db URL (redis backend)
+        shard_count: Shards per hot key (dynamodb backend, 1 disables sharding)
+        hot_key_threshold: Increments per minute before a key is sharded
+        layout: DynamoDB item layout, one of DYNAMODB_LAYOUTS
+
+    Returns:
+        Backend instance
+    """
+    if name == 'dynamodb':
+        return DynamoDBBackend(table, shard_count, hot_key_threshold, layout)
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'redis':
+        return RedisBackend(redis_url)
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+class DynamoDBBackend:
+    """
+    Counters stored as number attributes on DynamoDB items keyed by rate_key
+
+    Which item and attribute hold a bucket depends on the layout (see
+    DYNAMODB_LAYOUTS). The compact layout keeps each bucket in its own
+    top-level attribute rather than a nested map: ADD and conditions work on
+    top-level attributes directly, and nested paths would fail on the first
+    write before the map exists. Every write also REMOVEs the bucket names
+    the item may still hold from earlier writes but no limiter reads any
+    more (see get_stale_buckets), so the item stays small without a read.
+
+    With shard_count > 1, keys that get hot (more than hot_key_threshold
+    increments a minute in this container, or throttled by DynamoDB) spread
+    their writes over shard_count extra items. A 'sharded' marker on the
+    base item tells other containers to switch too. Sharded reads sum all
+    shards in one BatchGetItem; the read and the write are separate calls,
+    so concurrent requests on a hot key can overshoot a limit slightly.
+    """
+
+    THROTTLING_ERROR_CODES = (
+        'ProvisionedThroughputExceededException',
+        'ThrottlingException',
+        'RequestLimitExceeded'
+    )
+
+    def __init__(self, table, shard_count=1, hot_key_threshold=20, layout='daily'):
+        if layout not in DYNAMODB_LAYOUTS:
+            raise ValueError(f"Unknown rate limit layout: {layout}")
+
+        self.table = table
+        self.shard_count = shard_count
+        self.hot_key_threshold = hot_key_threshold
+        self.layout = layout
+        self.hot_keys = TTLCache(1024)
+        self.recent_increments = TTLCache(4096)
+
+    def increment(self, subject, limits, ttl_seconds):
+        """
+        Atomically increment a subject's bucket counters if all are below their limits
+
+        Args:
+            subject: IP address or network prefix
+            limits: Dict mapping bucket name to its limit
+            ttl_seconds: TTL in seconds
+
+        Returns:
+            Tuple (is_allowed, counts) with the new counts when allowed, or the
+            counts that caused the rejection otherwise
+        """
+        is_allowed, counts_list = self.increment_many([(subject, limits)], ttl_seconds)
+        return is_allowed, counts_list[0]
+
+    def increment_many(self, entries, ttl_seconds):
+        """
+        Atomically increment bucket counters of several subjects if all are below their limits
+
+        Entries stored on more than one item are sent as a single
+        TransactWriteItems call. A successful transaction does not return the
+        new values, so they are read back in one (strongly consistent)
+        BatchGetItem; if that read fails, counts are None. When rejected, the
+        entries whose condition failed carry their current counts.
+
+        Args:
+            entries: List of (subject, limits) tuples
+            ttl_seconds: TTL in seconds
+
+        Returns:
+            Tuple (is_allowed, counts_list) with one counts dict (or None) per entry
+        """
+        legacy_counts = self.get_legacy_counts(entries) if self.layout == 'dual' else {}
+        if legacy_counts:
+            # Leave room only for what the daily items have not used up yet
+            entries = [
+                (subject, {
+                    bucket: limit - legacy_counts[subject][bucket]
+                    for bucket, limit in limits.items()
+                })
+                for subject, limits in entries
+            ]
+
+        item_entries, locations = self.locate_entries(entries)
+        is_allowed, item_counts = self.increment_items(item_entries, ttl_seconds)
+        counts_by_key = {rate_key: counts for (rate_key, _), counts in zip(item_entries, item_counts)}
+
+        counts_list = []
+        for (subject, _), located in zip(entries, locations):
+            if any(counts_by_key[rate_key] is None for rate_key, _ in located.values()):
+                counts_list.append(None)
+                continue
+            counts_list.append({
+                bucket: counts_by_key[rate_key][attribute] + legacy_counts.get(subject, {}).get(bucket, 0)
+                for bucket, (rate_key, attribute) in located.items()
+            })
+        return is_allowed, counts_list
+
+    def get_counts(self, requests):
+        """
+        Read bucket counters of several subjects in one BatchGetItem call
+
+        Args:
+            requests: Dict mapping subject to the bucket names to read
+
+        Returns:
+            Dict mapping subject to {bucket: count}, 0 for missing counters
+        """
+        layouts = ('daily', 'compact') if self.layout == 'dual' else (self.layout,)
+        locations = [
+            (subject, bucket, self.locate(subject, bucket, layout))
+            for subject, buckets in requests.items()
+            for bucket in buckets
+            for layout in layouts
+        ]
+        items = self.get_items(list({rate_key for _, _, (rate_key, _) in locations}))
+
+        counts = {subject: dict.fromkeys(buckets, 0) for subject, buckets in requests.items()}
+        for subject, bucket, (rate_key, attribute) in locations:
+            counts[subject][bucket] += int(items.get(rate_key, {}).get(attribute, 0))
+        return counts
+
+    def get_legacy_counts(self, entries):
+        """Read the daily-layout counters of the buckets in entries (dual layout)"""
+        requests = {subject: list(limits) for subject, limits in entries}
+        locations = {
+            (subject, bucket): self.locate(subject, bucket, 'daily')
+            for subject, buckets in requests.items()
+            for bucket in buckets
+        }
+        items = self.get_items(list({rate_key for rate_key, _ in locations.values()}))
+
+        return {
+            subject: {
+                bucket: int(items.get(locations[(subject, bucket)][0], {}).get(locations[(subject, bucket)][1], 0))
+                for bucket in buckets
+            }
+            for subject, buckets in requests.items()
+        }
+
+    def locate(self, subject, bucket, layout=None):
+        """
+        Return the (rate_key, attribute) pair holding a bucket counter
+
+        Args:
+            subject: IP address or network prefix
+            bucket: Bucket name ('hYYYYMMDDHH' or 'dYYYYMMDD')
+            layout: Layout to use (defaults to the backend's; dual writes compact)
+
+        Returns:
+            Tuple (rate_key, attribute)
+        """
+        if (layout or self.layout) != 'daily':
+            return subject, bucket
+        if bucket.startswith('h'):
+            return f"{subject}#{bucket[1:9]}", f"hour_{bucket[9:11]}"
+        return f"{subject}#{bucket[1:]}", 'submission_count'
+
+    def locate_entries(self, entries):
+        """
+        Group subject entries into per-item counter limits
+
+        Returns:
+            Tuple (item_entries, locations): a list of (rate_key, {attribute: limit})
+            and, per entry, a dict mapping bucket to its (rate_key, attribute)
+        """
+        item_limits = {}
+        locations = []
+        for subject, limits in entries:
+            located = {bucket: self.locate(subject, bucket) for bucket in limits}
+            for bucket, (rate_key, attribute) in located.items():
+                item_limits.setdefault(rate_key, {})[attribute] = limits[bucket]
+            locations.append(located)
+        return list(item_limits.items()), locations
+
+    def increment_key(self, rate_key, limits, ttl_seconds):
+        """Increment counters on one item, sharded when the key is hot (see increment)"""
+        if self.is_hot(rate_key, ttl_seconds):
+            return self.increment_sharded(rate_key, limits, ttl_seconds)
+        return self.increment_item(rate_key, limits, ttl_seconds)
+
+    def increment_item(self, rate_key, limits, ttl_seconds):
+        """Conditionally increment counters on the base item (see increment)"""
+        update = self.build_increment(rate_key, limits, ttl_seconds)
+
+        try:
+            response = self.table.update_item(
+                Key={'rate_key': rate_key},
+                **update,
+                ReturnValues='UPDATED_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            attributes = response.get('Attributes', {})
+            return True, {attribute: int(attributes.get(attribute, 0)) for attribute in limits}
+
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+
+            if self.shard_count > 1 and error_code in self.THROTTLING_ERROR_CODES:
+                logger.warning(f"Rate limit key {rate_key} throttled, sharding its counters")
+                self.mark_hot(rate_key, ttl_seconds)
+                return self.increment_sharded(rate_key, limits, ttl_seconds)
+
+            if error_code != 'ConditionalCheckFailedException':
+                raise
+
+            item = deserialize_item(e.response.get('Item', {}))
+            if item.get('sharded'):
+                # Another container already sharded this key
+                self.hot_keys.set(rate_key, True, ttl_seconds)
+                return self.increment_sharded(rate_key, limits, ttl_seconds)
+
+            return False, {attribute: int(item.get(attribute, 0)) for attribute in limits}
+
+    def increment_items(self, item_entries, ttl_seconds):
+        """
+        Increment counters on several items, in one transaction when possible
+
+        Args:
+            item_entries: List of (rate_key, {attribute: limit}) tuples
+            ttl_seconds: TTL in seconds
+
+        Returns:
+            Tuple (is_allowed, counts_list) with one counts dict (or None) per item
+        """
+        if len(item_entries) == 1:
+            is_allowed, counts = self.increment_key(item_entries[0][0], item_entries[0][1], ttl_seconds)
+            return is_allowed, [counts]
+
+        hot = [self.is_hot(rate_key, ttl_seconds) for rate_key, _ in item_entries]
+        if any(hot):
+            # Sharded keys cannot join a transaction; check them one by one
+            counts_list = []
+            for (rate_key, limits), is_hot in zip(item_entries, hot):
+                increment = self.increment_sharded if is_hot else self.increment_item
+                is_allowed, counts = increment(rate_key, limits, ttl_seconds)
+                counts_list.append(counts)
+                if not is_allowed:
+                    return False, counts_list + [None] * (len(item_entries) - len(counts_list))
+            return True, counts_list
+
+        transact_items = [
+            {
+                'Update': {
+                    'TableName': self.table.name,
+                    'Key': {'rate_key': rate_key},
+                    **self.build_increment(rate_key, limits, ttl_seconds),
+                    'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+                }
+            }
+            for rate_key, limits in item_entries
+        ]
+
+        try:
+            self.table.meta.client.transact_write_items(TransactItems=transact_items)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+
+            reasons = e.response.get('CancellationReasons', [])
+            if not any(reason.get('Code') == 'ConditionalCheckFailed' for reason in reasons):
+                raise
+
+            failed = [
+                (rate_key, limits, deserialize_item(reason.get('Item', {})))
+                for (rate_key, limits), reason in zip(item_entries, reasons)
+                if reason.get('Code') == 'ConditionalCheckFailed'
+            ]
+            sharded = [rate_key for rate_key, _, item in failed if item.get('sharded')]
+            if sharded:
+                # Another container already sharded these keys; nothing was
+                # committed, so check the entries one by one instead
+                for rate_key in sharded:
+                    self.hot_keys.set(rate_key, True, ttl_seconds)
+                return self.increment_items(item_entries, ttl_seconds)
+
+            failed_counts = {
+                rate_key: {attribute: int(item.get(attribute, 0)) for attribute in limits}
+                for rate_key, limits, item in failed
+            }
+            return False, [failed_counts.get(rate_key) for rate_key, _ in item_entries]
+
+        try:
+            items = self.batch_get([rate_key for rate_key, _ in item_entries], consistent=True)
+        except (ClientError, BotoCoreError) as e:
+            # The increments are committed; only the reported counts are lost
+            logger.warning(f"Could not read back rate limit counts: {str(e)}")
+            return True, [None] * len(item_entries)
+
+        return True, [
+            {attribute: int(items.get(rate_key, {}).get(attribute, 0)) for attribute in limits}
+            for rate_key, limits in item_entries
+        ]
+
+    def build_increment(self, rate_key, limits, ttl_seconds):
+        """
+        Build the conditional ADD update for a set of counters
+
+        Outside the daily layout, the update also removes the item's stale
+        buckets (see get_stale_buckets).
+
+        Args:
+            rate_key: Rate limiting key of the item
+            limits: Dict mapping counter attribute to its limit
+            ttl_seconds: TTL in seconds
+
+        Returns:
+            Dict of UpdateItem expression parameters
+        """
+        names = {f"#c{index}": attribute for index, attribute in enumerate(limits)}
+        values = {f":l{index}": limit for index, limit in enumerate(limits.values())}
+        values.update({
+            ':one': 1,
+            ':expires_at': int(datetime.now().timestamp()) + ttl_seconds
+        })
+
+        additions = ', '.join(f"{name} :one" for name in names)
+        # A missing counter only passes while its limit leaves room for one more
+        conditions = ' AND '.join(
+            f"(attribute_not_exists({name}) OR {name} < :l{index})" if limit > 0 else f"{name} < :l{index}"
+            for index, (name, limit) in enumerate(zip(names, limits.values()))
+        )
+        if self.shard_count > 1:
+            conditions += ' AND attribute_not_exists(sharded)'
+
+        update_expression = f"ADD {additions} SET expires_at = :expires_at"
+        if self.layout == 'daily':
+            values[':now'] = datetime.now().isoformat()
+            update_expression += ', last_updated = :now'
+
+        stale = []
+        if self.layout != 'daily':
+            stale = [bucket for bucket in get_stale_buckets(datetime.now(), ttl_seconds) if bucket not in limits]
+        if stale:
+            removals = {f"#r{index}": bucket for index, bucket in enumerate(stale)}
+            names.update(removals)
+            update_expression += f" REMOVE {', '.join(removals)}"
+
+        return {
+            'UpdateExpression': update_expression,
+            'ConditionExpression': conditions,
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values
+        }
+
+    def is_hot(self, rate_key, ttl_seconds):
+        """
+        Count an increment for rate_key and report whether it should be sharded
+
+        Args:
+            rate_key: Rate limiting key
+            ttl_seconds: TTL of the key's items
+
+        Returns:
+            Boolean
+        """
+        if self.shard_count <= 1:
+            return False
+        if self.hot_keys.get(rate_key):
+            return True
+
+        minute_key = f"{rate_key}#{int(time.time() // 60)}"
+        increments = (self.recent_increments.get(minute_key) or 0) + 1
+        self.recent_increments.set(minute_key, increments, 60)
+
+        if increments > self.hot_key_threshold:
+            logger.info(f"Rate limit key {rate_key} is hot ({increments}/min), sharding its counters")
+            self.mark_hot(rate_key, ttl_seconds)
+            return True
+        return False
+
+    def mark_hot(self, rate_key, ttl_seconds):
+        """
+        Shard rate_key in this container and flag its base item for the others
+
+        Args:
+            rate_key: Rate limiting key
+            ttl_seconds: TTL of the key's items
+        """
+        self.hot_keys.set(rate_key, True, ttl_seconds)
+
+        try:
+            self.table.update_item(
+                Key={'rate_key': rate_key},
+                UpdateExpression='SET sharded = :true, expires_at = :expires_at',
+                ExpressionAttributeValues={
+                    ':true': True,
+                    ':expires_at': int(datetime.now().timestamp()) + ttl_seconds
+                }
+            )
+        except ClientError as e:
+            # Other containers will find out on their own once they get throttled
+            logger.warning(f"Could not flag {rate_key} as sharded: {str(e)}")
+
+    def get_shard_keys(self, rate_key):
+        """Return the keys of rate_key's shard items"""
+        return [f"{rate_key}#shard{index}" for index in range(self.shard_count)]
+
+    def increment_sharded(self, rate_key, limits, ttl_seconds):
+        """
+        Check the summed shard counters, then increment one random shard
+
+        Args:
+            rate_key: Rate limiting key
+            limits: Dict mapping counter attribute to its limit
+            ttl_seconds: TTL in seconds
+
+        Returns:
+            Tuple (is_allowed, counts) as for increment
+        """
+        items = self.batch_get([rate_key] + self.get_shard_keys(rate_key))
+        counts = {
+            attribute: sum(int(item.get(attribute, 0)) for item in items.values())
+            for attribute in limits
+        }
+
+        if any(counts[attribute] >= limit for attribute, limit in limits.items()):
+            return False, counts
+
+        shard_key = random.choice(self.get_shard_keys(rate_key))
+        names = {f"#c{index}": attribute for index, attribute in enumerate(limits)}
+        update_expression = f"ADD {', '.join(f'{name} :one' for name in names)} SET expires_at = :expires_at"
+
+        now = datetime.now()
+        stale = [attribute for attribute in items.get(shard_key, {}) if is_stale_bucket(attribute, now)]
+        if stale:
+            removals = {f"#r{index}": bucket for index, bucket in enumerate(stale)}
+            names.update(removals)
+            update_expression += f" REMOVE {', '.join(removals)}"
+
+        self.table.update_item(
+            Key={'rate_key': shard_key},
+            UpdateExpression=update_expression,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues={
+                ':one': 1,
+                ':expires_at': int(datetime.now().timestamp()) + ttl_seconds
+            }
+        )
+        return True, {attribute: count + 1 for attribute, count in counts.items()}
+
+    def get_items(self, rate_keys):
+        """
+        Fetch several rate limit items in one BatchGetItem call
+
+        Counters of sharded items are summed across their shards.
+
+        Args:
+            rate_keys: Rate limiting keys
+
+        Returns:
+            Dict mapping rate key to item (missing items are omitted)
+        """
+        items = self.batch_get(rate_keys)
+
+        sharded_keys = [key for key, item in items.items() if item.get('sharded')]
+        if sharded_keys:
+            shard_items = self.batch_get([
+                shard_key for key in sharded_keys for shard_key in self.get_shard_keys(key)
+            ])
+            for key in sharded_keys:
+                for shard_key in self.get_shard_keys(key):
+                    for attribute, value in shard_items.get(shard_key, {}).items():
+                        if attribute not in ('rate_key', 'expires_at'):
+                            items[key][attribute] = int(items[key].get(attribute, 0)) + int(value)
+
+        return items
+
+    def batch_get(self, rate_keys, consistent=False):
+        """
+        Fetch items by key with BatchGetItem, retrying unprocessed keys
+
+        Args:
+            rate_keys: Rate limiting keys (at most 100)
+            consistent: Use strongly consistent reads
+
+        Returns:
+            Dict mapping rate key to item
+        """
+        # The table's client shares the resource's attribute (de)serialization
+        client = self.table.meta.client
+        request = {self.table.name: {'Keys': [{'rate_key': key} for key in rate_keys], 'ConsistentRead': consistent}}
+        items = {}
+
+        while request:
+            response = client.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(self.table.name, []):
+                items[item['rate_key']] = item
+            request = response.get('UnprocessedKeys')
+
+        return items
+
+    def compare_and_set(self, rate_key, attribute, expected, new_value, expires_at):
+        """
+        Set an attribute only if it still holds the expected value
+
+        Args:
+            rate_key: Rate limiting key
+            attribute: Attribute to set
+            expected: Expected current value, or None if it should not exist yet
+            new_value: Value to store
+            expires_at: TTL as epoch seconds
+
+        Returns:
+            Tuple (swapped, current_value) where current_value is the value found
+            when the swap failed
+        """
+        if expected is None:
+            condition = 'attribute_not_exists(#attr)'
+            values = {}
+        else:
+            condition = '#attr = :expected'
+            values = {':expected': expected}
+
+        values.update({':new': new_value, ':expires_at': expires_at})
+
+        try:
+            self.table.update_item(
+                Key={'rate_key': rate_key},
+                UpdateExpression='SET #attr = :new, expires_at = :expires_at',
+                ConditionExpression=condition,
+                ExpressionAttributeNames={'#attr': attribute},
+                ExpressionAttributeValues=values,
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            return True, new_value
+
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+            item = deserialize_item(e.response.get('Item', {}))
+            return False, item.get(attribute)
+
+class MemoryBackend:
+    """
+    Thread-safe in-process counters for tests, benchmarks and single-container use
+
+    Each subject is one dict of bucket counters; stale buckets are dropped
+    whenever the subject is written.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def _get_live_item(self, rate_key):
+        """Return the item for rate_key, dropping it if its TTL has passed (lock held)"""
+        entry = self._items.get(rate_key)
+        if entry is None:
+            return None
+        item, expires_at = entry
+        if expires_at <= time.time():
+            del self._items[rate_key]
+            return None
+        return item
+
+    def increment(self, subject, limits, ttl_seconds):
+        """See DynamoDBBackend.increment"""
+        is_allowed, counts_list = self.increment_many([(subject, limits)], ttl_seconds)
+        return is_allowed, counts_list[0]
+
+    def increment_many(self, entries, ttl_seconds):
+        """See DynamoDBBackend.increment_many (counts are always returned)"""
+        with self._lock:
+            items = [self._get_live_item(subject) or {} for subject, _ in entries]
+            counts_list = [
+                {bucket: item.get(bucket, 0) for bucket in limits}
+                for item, (_, limits) in zip(items, entries)
+            ]
+
+            if any(
+                counts[bucket] >= limit
+                for counts, (_, limits) in zip(counts_list, entries)
+                for bucket, limit in limits.items()
+            ):
+                return False, counts_list
+
+            now = datetime.now()
+            for item, counts, (subject, limits) in zip(items, counts_list, entries):
+                for bucket in [bucket for bucket in item if is_stale_bucket(bucket, now)]:
+                    del item[bucket]
+                for bucket in limits:
+                    item[bucket] = counts[bucket] = counts[bucket] + 1
+                self._items[subject] = (item, time.time() + ttl_seconds)
+            return True, counts_list
+
+    def get_counts(self, requests):
+        """See DynamoDBBackend.get_counts"""
+        with self._lock:
+            counts = {}
+            for subject, buckets in requests.items():
+                item = self._get_live_item(subject) or {}
+                counts[subject] = {bucket: item.get(bucket, 0) for bucket in buckets}
+            return counts
+
+    def compare_and_set(self, rate_key, attribute, expected, new_value, expires_at):
+        """See DynamoDBBackend.compare_and_set"""
+        with self._lock:
+            item = self._get_live_item(rate_key) or {}
+            current = item.get(attribute)
+            if current != expected:
+                return False, current
+
+            item[attribute] = new_value
+            self._items[rate_key] = (item, expires_at)
+            return True, new_value
+
+    def clear(self):
+        """Remove all counters"""
+        with self._lock:
+            self._items.clear()
+
+class RedisError(Exception):
+    """Error reply or protocol failure from a Redis-protocol server"""
+
+class RedisBackend:
+    """
+    Counters stored in Redis hashes (one hash per subject) over RESP
+
+    Increments use HINCRBY and EXPIRE inside MULTI/EXEC and are rolled back
+    when a limit is exceeded; compare-and-set uses WATCH. The same EXEC
+    lists the hash's fields, and stale buckets among them are deleted with
+    the subject's next increment. Any server that speaks the Redis protocol
+    works, including the stand-in in benchmarks/.
+    """
+
+    def __init__(self, url):
+        parsed = urlparse(url or 'redis://localhost:6379/0')
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = 1.0
+        self.stale_buckets = TTLCache(4096)
+        self._local = threading.local()
+
+    def increment(self, subject, limits, ttl_seconds):
+        """See DynamoDBBackend.increment"""
+        is_allowed, counts_list = self.increment_many([(subject, limits)], ttl_seconds)
+        return is_allowed, counts_list[0]
+
+    def increment_many(self, entries, ttl_seconds):
+        """See DynamoDBBackend.increment_many (counts are always returned)"""
+        commands = []
+        pruned = []
+        for subject, limits in entries:
+            stale = [bucket for bucket in self.stale_buckets.get(subject) or [] if bucket not in limits]
+            if stale:
+                commands.append(['HDEL', subject] + stale)
+            pruned.append(bool(stale))
+            commands.extend(['HINCRBY', subject, bucket, 1] for bucket in limits)
+            commands.append(['EXPIRE', subject, ttl_seconds])
+            commands.append(['HKEYS', subject])
+        replies = iter(self.transaction(commands))
+
+        now = datetime.now()
+        counts_list = []
+        for (subject, limits), has_removals in zip(entries, pruned):
+            if has_removals:
+                next(replies)  # HDEL
+            counts_list.append({bucket: next(replies) for bucket in limits})
+            next(replies)  # EXPIRE
+
+            stale = [field.decode() for field in next(replies) if is_stale_bucket(field.decode(), now)]
+            if stale:
+                self.stale_buckets.set(subject, stale, ttl_seconds)
+            else:
+                self.stale_buckets.delete(subject)
+
+        if all(
+            counts[bucket] <= limit
+            for counts, (_, limits) in zip(counts_list, entries)
+            for bucket, limit in limits.items()
+        ):
+            return True, counts_list
+
+        # Over a limit: undo this request's increments and report the prior counts,
+        # capped at the limit since concurrent requests may be mid-rollback
+        self.transaction([
+            ['HINCRBY', subject, bucket, -1]
+            for subject, limits in entries
+            for bucket in limits
+        ])
+        return False, [
+            {
+                bucket: max(0, min(count - 1, limits[bucket])) if count > limits[bucket] else count - 1
+                for bucket, count in counts.items()
+            }
+            for counts, (_, limits) in zip(counts_list, entries)
+        ]
+
+    def get_counts(self, requests):
+        """See DynamoDBBackend.get_counts"""
+        subjects = list(requests)
+        replies = self.pipeline([['HMGET', subject] + list(requests[subject]) for subject in subjects])
+        return {
+            subject: {
+                bucket: int(value) if value is not None else 0
+                for bucket, value in zip(requests[subject], values)
+            }
+            for subject, values in zip(subjects, replies)
+        }
+
+    def compare_and_set(self, rate_key, attribute, expected, new_value, expires_at):
+        """See DynamoDBBackend.compare_and_set"""
+        current = self.pipeline([['WATCH', rate_key], ['HGET', rate_key, attribute]])[1]
+        current = int(current) if current is not None else None
+
+        if current != expected:
+            self.command('UNWATCH')
+            return False, current
+
+        replies = self.transaction([
+            ['HSET', rate_key, attribute, new_value],
+            ['EXPIREAT', rate_key, int(expires_at)]
+        ])
+        if replies is None:
+            # Another writer got in between WATCH and EXEC
+            current = self.command('HGET', rate_key, attribute)
+            return False, int(current) if current is not None else None
+        return True, new_value
+
+    def command(self, *args):
+        """Send one command and return its reply"""
+        return self.pipeline([list(args)])[0]
+
+    def transaction(self, commands):
+        """Run commands inside MULTI/EXEC and return the EXEC reply (None if aborted)"""
+        replies = self.pipeline([['MULTI']] + commands + [['EXEC']])
+        return replies[-1]
+
+    def pipeline(self, commands):
+        """
+        Send several commands in one round trip
+
+        Args:
+            commands: List of argument lists
+
+        Returns:
+            List of replies in command order
+        """
+        sock, reader = self.get_connection()
+        payload = b''.join(encode_command(command) for command in commands)
+
+        try:
+            sock.sendall(payload)
+            replies = [read_reply(reader) for _ in commands]
+        except (OSError, RedisError):
+            self.close()
+            raise
+
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def get_connection(self):
+        """Return this thread's (socket, reader) pair, connecting on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = self._local.connection = (sock, sock.makefile('rb'))
+            if self.db:
+                self.command('SELECT', self.db)
+        return connection
+
+    def close(self):
+        """Close this thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            self._local.connection = None
+            sock, reader = connection
+            reader.close()
+            sock.close()
+
+def encode_command(args):
+    """Encode a command as a RESP array of bulk strings"""
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(f"${len(data)}\r\n".encode() + data + b'\r\n')
+    return b''.join(parts)
+
+def read_reply(reader):
+    """
+    Read one RESP reply
+
+    Error replies are returned (not raised) so a pipeline can be drained first.
+    """
+    line = reader.readline()
+    if not line:
+        raise RedisError('Connection closed by server')
+
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b'+':
+        return payload.decode()
+    if prefix == b'-':
+        return RedisError(payload.decode())
+    if prefix == b':':
+        return int(payload)
+    if prefix == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2]
+    if prefix == b'*':
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply: {line!r}")
+
+def get_hour_bucket(moment):
+    """Return the name of the bucket counting moment's hour"""
+    return f"h{moment.strftime('%Y%m%d%H')}"
+
+def get_day_bucket(moment):
+    """Return the name of the bucket counting moment's day"""
+    return f"d{moment.strftime('%Y%m%d')}"
+
+def is_stale_bucket(name, now):
+    """
+    Return True if name is a bucket no limiter reads any more
+
+    The current and previous hour and day are kept (the sliding window reads
+    the previous ones); anything else that is not a bucket name is ignored.
+
+    Args:
+        name: Attribute or field name
+        now: Current datetime
+    """
+    if len(name) == 11 and name.startswith('h') and name[1:].isdigit():
+        return name < get_hour_bucket(now - timedelta(hours=1))
+    if len(name) == 9 and name.startswith('d') and name[1:].isdigit():
+        return name < get_day_bucket(now - timedelta(days=1))
+    return False
+
+def get_stale_buckets(now, ttl_seconds):
+    """
+    Return the stale bucket names an item written now may still hold
+
+    An item expires ttl_seconds after its last write, so its buckets are at
+    most that old. Every hour and day bucket in that span is listed, except
+    those is_stale_bucket keeps; removing a name the item lacks is a no-op.
+
+    Args:
+        now: Current datetime
+        ttl_seconds: TTL of the item in seconds
+
+    Returns:
+        List of bucket names
+    """
+    hours = math.ceil(ttl_seconds / 3600) + 1
+    days = math.ceil(ttl_seconds / 86400) + 1
+    return (
+        [get_hour_bucket(now - timedelta(hours=offset)) for offset in range(2, hours + 1)]
+        + [get_day_bucket(now - timedelta(days=offset)) for offset in range(2, days + 1)]
+    )
+
+def deserialize_item(raw_item):
+    """Convert a low-level DynamoDB item (as returned in errors) to Python values"""
+    return {name: deserializer.deserialize(value) for name, value in raw_item.items()}
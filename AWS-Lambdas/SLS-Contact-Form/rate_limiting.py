@@ -1,23 +1,90 @@
 """
 Rate Limiting Module for Contact Form Lambda
-Uses DynamoDB for distributed rate limiting across Lambda invocations
+Uses DynamoDB (or a Redis-protocol server) for distributed rate limiting across Lambda invocations
 """
 
 import os
+import math
+import time
 import boto3
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from circuit_breaker import CircuitBreaker
+from rate_limit_algorithms import get_limiter
+from rate_limit_backends import get_backend
+from local_limiter import LocalRateLimiter
+from ip_prefixes import DEFAULT_PREFIX_RULES, PrefixAggregator
+from ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
-# Initialize DynamoDB
-dynamodb = boto3.resource('dynamodb')
-
 # Configuration
 RATE_LIMIT_TABLE = os.environ.get('RATE_LIMIT_TABLE', 'contact-form-rate-limits')
 HOURLY_LIMIT = int(os.environ.get('MAX_HOURLY_SUBMISSIONS', '5'))
 DAILY_LIMIT = int(os.environ.get('MAX_DAILY_SUBMISSIONS', '10'))
+PREFIX_HOURLY_LIMIT = int(os.environ.get('MAX_HOURLY_SUBMISSIONS_PER_PREFIX', '0'))  # 0 disables prefix limits
+PREFIX_DAILY_LIMIT = int(os.environ.get('MAX_DAILY_SUBMISSIONS_PER_PREFIX', '0'))
+RATE_LIMIT_PREFIXES = os.environ.get('RATE_LIMIT_PREFIXES', DEFAULT_PREFIX_RULES)  # network=prefix_length,...
+LOCAL_RATE_LIMIT_ENABLED = os.environ.get('LOCAL_RATE_LIMIT_ENABLED', 'false').lower() == 'true'
+LOCAL_BUCKET_CAPACITY = int(os.environ.get('LOCAL_BUCKET_CAPACITY', str(HOURLY_LIMIT)))
+LOCAL_BUCKET_REFILL_PER_HOUR = float(os.environ.get('LOCAL_BUCKET_REFILL_PER_HOUR', str(HOURLY_LIMIT)))
+LOCAL_PREFIX_BUCKET_CAPACITY = int(os.environ.get('LOCAL_PREFIX_BUCKET_CAPACITY', str(HOURLY_LIMIT * 10)))  # per /24 or /64
+LOCAL_PREFIX_BUCKET_REFILL_PER_HOUR = float(os.environ.get('LOCAL_PREFIX_BUCKET_REFILL_PER_HOUR', str(HOURLY_LIMIT * 10)))
+RATE_LIMIT_ALGORITHM = os.environ.get('RATE_LIMIT_ALGORITHM', 'fixed_window')  # fixed_window, sliding_window or gcra
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'dynamodb')  # dynamodb, memory or redis
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+RATE_LIMIT_SHARDS = int(os.environ.get('RATE_LIMIT_SHARDS', '1'))  # >1 shards hot keys (e.g. shared NAT IPs)
+RATE_LIMIT_HOT_KEY_THRESHOLD = int(os.environ.get('RATE_LIMIT_HOT_KEY_THRESHOLD', '20'))  # increments/minute
+RATE_LIMIT_LAYOUT = os.environ.get('RATE_LIMIT_LAYOUT', 'daily')  # daily, compact or dual (daily -> compact migration)
+RATE_LIMIT_BREAKER_LATENCY_MS = int(os.environ.get('RATE_LIMIT_BREAKER_LATENCY_MS', '300'))
+RATE_LIMIT_BREAKER_FAILURE_RATE = float(os.environ.get('RATE_LIMIT_BREAKER_FAILURE_RATE', '0.5'))
+RATE_LIMIT_BREAKER_COOL_DOWN_SECONDS = int(os.environ.get('RATE_LIMIT_BREAKER_COOL_DOWN_SECONDS', '30'))
+RATE_LIMIT_TIMEOUT_SECONDS = float(os.environ.get('RATE_LIMIT_TIMEOUT_SECONDS', '1'))
+BLOCKED_IP_CACHE_SIZE = int(os.environ.get('BLOCKED_IP_CACHE_SIZE', '1024'))
+
+# Initialize DynamoDB with tight timeouts so a slow table cannot stall submissions
+dynamodb = boto3.resource('dynamodb', config=Config(
+    connect_timeout=RATE_LIMIT_TIMEOUT_SECONDS,
+    read_timeout=RATE_LIMIT_TIMEOUT_SECONDS,
+    retries={'max_attempts': 2, 'mode': 'standard'}
+))
+
+# Built once so algorithm state is reused across warm invocations
+rate_limit_backend = get_backend(
+    RATE_LIMIT_BACKEND,
+    table=dynamodb.Table(RATE_LIMIT_TABLE),
+    redis_url=RATE_LIMIT_REDIS_URL,
+    shard_count=RATE_LIMIT_SHARDS,
+    hot_key_threshold=RATE_LIMIT_HOT_KEY_THRESHOLD,
+    layout=RATE_LIMIT_LAYOUT
+)
+rate_limiter = get_limiter(
+    RATE_LIMIT_ALGORITHM, rate_limit_backend, HOURLY_LIMIT, DAILY_LIMIT,
+    prefix_hourly_limit=PREFIX_HOURLY_LIMIT, prefix_daily_limit=PREFIX_DAILY_LIMIT
+)
+prefix_aggregator = PrefixAggregator(RATE_LIMIT_PREFIXES)
+
+# Per-container token buckets: an optional pre-filter that rejects obvious floods
+# before the distributed check, and the fallback while the breaker is open
+local_limiter = LocalRateLimiter(
+    LOCAL_BUCKET_CAPACITY,
+    LOCAL_BUCKET_REFILL_PER_HOUR / 3600,
+    LOCAL_PREFIX_BUCKET_CAPACITY,
+    LOCAL_PREFIX_BUCKET_REFILL_PER_HOUR / 3600
+)
+
+# Skips the distributed check while it is slow or failing
+rate_limit_breaker = CircuitBreaker(
+    'rate-limit',
+    latency_threshold_ms=RATE_LIMIT_BREAKER_LATENCY_MS,
+    failure_rate_threshold=RATE_LIMIT_BREAKER_FAILURE_RATE,
+    cool_down_seconds=RATE_LIMIT_BREAKER_COOL_DOWN_SECONDS
+)
+
+# IPs known to be over a limit, kept across warm invocations until their window resets
+blocked_ips = TTLCache(BLOCKED_IP_CACHE_SIZE)
 
 def check_rate_limit(ip_address):
     """
@@ -27,104 +94,125 @@ def check_rate_limit(ip_address):
         ip_address: Client IP address
         
     Returns:
-        Tuple (is_allowed, message, retry_after_minutes)
+        Tuple (is_allowed, message, retry_after_minutes, result) where result is
+        the RateLimitResult of the window closest to its limit, or None if unknown
     """
     if not ip_address or ip_address == 'unknown':
         logger.warning("Unknown IP address, allowing request")
-        return True, None, None
+        return True, None, None, None
+    
+    prefix = prefix_aggregator.aggregate_key(ip_address) if PREFIX_HOURLY_LIMIT > 0 else None
+    
+    # Repeat offenders (and networks over their limit) are rejected from memory without touching DynamoDB
+    blocked = blocked_ips.get(ip_address) or (prefix and blocked_ips.get(prefix))
+    if blocked:
+        message, result = blocked
+        retry_after = max(1, math.ceil((result.reset_time.timestamp() - time.time()) / 60))
+        logger.warning(f"Rate limit exceeded for {ip_address} (cached, stats={blocked_ips.stats()})")
+        return False, message, retry_after, result
+    
+    current_time = datetime.now()
+    
+    if LOCAL_RATE_LIMIT_ENABLED:
+        result = local_limiter.check(ip_address, current_time)
+        if result and not result.allowed:
+            logger.warning(f"Local rate limit exceeded for {ip_address}")
+            return reject_submission(ip_address, result, current_time)
     
+    if not rate_limit_breaker.allow_request():
+        return check_local_fallback(ip_address, current_time)
+    
+    started = time.perf_counter()
     try:
-        table = dynamodb.Table(RATE_LIMIT_TABLE)
-        current_time = datetime.now()
-        
-        # Create rate limit keys
-        hour_key = f"{ip_address}#{current_time.strftime('%Y%m%d%H')}"
-        day_key = f"{ip_address}#{current_time.strftime('%Y%m%d')}"
-        
-        # Check hourly limit
-        hourly_count = get_submission_count(table, hour_key)
-        if hourly_count >= HOURLY_LIMIT:
-            retry_after = 60  # Try again in 60 minutes
-            message = f"Too many submissions this hour ({hourly_count}/{HOURLY_LIMIT})"
-            logger.warning(f"Hourly rate limit exceeded for {ip_address}")
-            return False, message, retry_after
+        result = rate_limiter.check(ip_address, current_time, prefix)
+        rate_limit_breaker.record_success((time.perf_counter() - started) * 1000)
         
-        # Check daily limit
-        daily_count = get_submission_count(table, day_key)
-        if daily_count >= DAILY_LIMIT:
-            # Calculate minutes until midnight
-            tomorrow = current_time + timedelta(days=1)
-            midnight = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0)
-            minutes_until_midnight = int((midnight - current_time).total_seconds() / 60)
-            
-            message = f"Daily submission limit reached ({daily_count}/{DAILY_LIMIT})"
-            logger.warning(f"Daily rate limit exceeded for {ip_address}")
-            return False, message, minutes_until_midnight
+        if not result.allowed:
+            logger.warning(f"{result.window.capitalize()} rate limit exceeded for {ip_address} (prefix {prefix})")
+            if result.window.startswith('network_'):
+                block_ip(prefix, get_rate_limit_message(result), result)
+            return reject_submission(ip_address, result, current_time)
         
-        # Update counters
-        update_submission_count(table, hour_key, hourly_count + 1, 7200)  # 2 hour TTL
-        update_submission_count(table, day_key, daily_count + 1, 172800)  # 2 day TTL
-        
-        logger.info(f"Rate limit passed for {ip_address}: hour={hourly_count+1}/{HOURLY_LIMIT}, day={daily_count+1}/{DAILY_LIMIT}")
-        return True, None, None
+        logger.info(f"Rate limit passed for {ip_address}: {result.window}={result.count}/{result.limit} ({RATE_LIMIT_ALGORITHM})")
+        return True, None, None, result
         
     except ClientError as e:
+        rate_limit_breaker.record_failure()
         logger.error(f"DynamoDB error in rate limiting: {str(e)}")
-        # Fail open - allow request if rate limiting fails
-        return True, None, None
+        return check_local_fallback(ip_address, current_time)
     except Exception as e:
+        rate_limit_breaker.record_failure()
         logger.error(f"Unexpected error in rate limiting: {str(e)}")
-        return True, None, None
+        return check_local_fallback(ip_address, current_time)
 
-def get_submission_count(table, rate_key):
+def check_local_fallback(ip_address, current_time):
     """
-    Get current submission count for a rate limit key
+    Rate limit with the container-local buckets when the distributed check is unavailable
     
     Args:
-        table: DynamoDB table
-        rate_key: Rate limiting key
+        ip_address: Client IP address
+        current_time: Datetime of the check
         
     Returns:
-        Current count
+        Tuple (is_allowed, message, retry_after_minutes, result) as for check_rate_limit
     """
-    try:
-        response = table.get_item(
-            Key={'rate_key': rate_key}
-        )
+    if LOCAL_RATE_LIMIT_ENABLED:
+        # The pre-filter already took a token for this request
+        return True, None, None, None
+    
+    result = local_limiter.check(ip_address, current_time)
+    if result and not result.allowed:
+        logger.warning(f"Local fallback rate limit exceeded for {ip_address}")
+        return reject_submission(ip_address, result, current_time)
+    return True, None, None, result
+
+def reject_submission(ip_address, result, current_time):
+    """
+    Build the rejection for a rate-limited IP and remember it until reset
+    
+    Args:
+        ip_address: Client IP address
+        result: RateLimitResult of the exceeded window
+        current_time: Datetime of the check
         
-        if 'Item' in response:
-            return response['Item'].get('submission_count', 0)
-        return 0
+    Returns:
+        Tuple (False, message, retry_after_minutes, result)
+    """
+    message = get_rate_limit_message(result)
+    retry_after = max(1, math.ceil((result.reset_time - current_time).total_seconds() / 60))
+    block_ip(ip_address, message, result)
+    return False, message, retry_after, result
+
+def get_rate_limit_message(result):
+    """
+    Build the user-facing message for a rejected submission
+    
+    Args:
+        result: RateLimitResult of the exceeded window
         
-    except ClientError as e:
-        logger.error(f"Error getting submission count: {str(e)}")
-        return 0
+    Returns:
+        Message string
+    """
+    if result.window == 'hour':
+        return f"Too many submissions this hour ({result.count}/{result.limit})"
+    if result.window == 'day':
+        return f"Daily submission limit reached ({result.count}/{result.limit})"
+    if result.window == 'network_hour':
+        return "Too many submissions from your network this hour. Please try again later."
+    if result.window == 'network_day':
+        return "Daily submission limit reached for your network. Please try again tomorrow."
+    return "Too many submissions in a short time. Please wait before trying again."
 
-def update_submission_count(table, rate_key, new_count, ttl_seconds):
+def block_ip(ip_address, message, result):
     """
-    Update submission count with TTL for automatic cleanup
+    Remember that an IP (or network prefix) is over its limit until its window resets
     
     Args:
-        table: DynamoDB table
-        rate_key: Rate limiting key
-        new_count: New submission count
-        ttl_seconds: TTL in seconds
+        ip_address: Client IP address or network prefix
+        message: Rate limit message returned to the client
+        result: RateLimitResult of the exceeded window
     """
-    try:
-        expires_at = int((datetime.now() + timedelta(seconds=ttl_seconds)).timestamp())
-        
-        table.put_item(
-            Item={
-                'rate_key': rate_key,
-                'submission_count': new_count,
-                'expires_at': expires_at,
-                'last_updated': datetime.now().isoformat()
-            }
-        )
-        
-    except ClientError as e:
-        logger.error(f"Error updating submission count: {str(e)}")
-        # Don't fail the request if we can't update the counter
+    blocked_ips.set(ip_address, (message, result), result.reset_time.timestamp() - time.time())
 
 def create_rate_limit_table():
     """
@@ -0,0 +1,63 @@
+"""
+SES Template Sync for Contact Form Lambda
+Creates or updates the SES stored templates used with SES_TEMPLATES_ENABLED (run at deploy time)
+
+Usage:
+    python ses_templates.py --website-url https://yourwebsite.com [--website-url ...]
+
+Each site gets its own templates (<SES_TEMPLATE_PREFIX>-<host>-notification
+and -confirmation), built from templates/ plus the site's overrides in
+EMAIL_TEMPLATE_DIR, so they render exactly like the locally rendered emails.
+Run it again whenever the template files change.
+"""
+
+import os
+import argparse
+import logging
+import boto3
+from botocore.exceptions import ClientError
+from email_service import get_ses_template_name
+from email_templates import STORED_TEMPLATE_NAMES, get_stored_template
+
+logger = logging.getLogger(__name__)
+
+# Initialize SES
+ses = boto3.client('ses')
+
+def sync_ses_templates(website_url):
+    """
+    Create or update the stored templates of a site
+
+    Args:
+        website_url: Website URL
+
+    Returns:
+        List of template names synced
+    """
+    synced = []
+    for name in STORED_TEMPLATE_NAMES:
+        template = dict(get_stored_template(name, website_url))
+        template['TemplateName'] = get_ses_template_name(name, website_url)
+
+        try:
+            ses.create_template(Template=template)
+            logger.info(f"Created SES template {template['TemplateName']}")
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'AlreadyExists':
+                raise
+            ses.update_template(Template=template)
+            logger.info(f"Updated SES template {template['TemplateName']}")
+
+        synced.append(template['TemplateName'])
+    return synced
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--website-url', action='append',
+                        default=None, help='site to sync (repeatable; defaults to WEBSITE_URL)')
+    args = parser.parse_args()
+
+    for website_url in args.website_url or [os.environ.get('WEBSITE_URL', 'https://yourwebsite.com')]:
+        print(f"{website_url}: {', '.join(sync_ses_templates(website_url))}")
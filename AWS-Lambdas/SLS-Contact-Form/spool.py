@@ -0,0 +1,179 @@
+"""
+Spool Module for Contact Form Lambda
+Keeps submissions that could not be saved in a durable local file and replays them later
+"""
+
+import os
+import json
+import glob
+import time
+import logging
+import threading
+from metrics import put_metric
+from storage import save_many
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SPOOL_ENABLED = os.environ.get('SPOOL_ENABLED', 'true').lower() == 'true'
+SPOOL_DIR = os.environ.get('SPOOL_DIR', '/tmp/contact-form-spool')
+SPOOL_MAX_BYTES = int(os.environ.get('SPOOL_MAX_BYTES', str(10 * 1024 * 1024)))
+SPOOL_REPLAY_WORKERS = int(os.environ.get('SPOOL_REPLAY_WORKERS', '2'))
+
+SPOOL_FILE = 'spool.ndjson'
+REPLAY_SUFFIX = '.replaying'
+
+_lock = threading.Lock()
+_replay_thread = None
+
+def spool_item(item, enforce_limit=True):
+    """
+    Append a fully prepared submission item to the spool
+
+    The line is fsync'd before returning, so the submission survives the
+    container being frozen or the function crashing afterwards.
+
+    Args:
+        item: DynamoDB item as built by storage.build_form_item
+        enforce_limit: Refuse the item if the spool would exceed SPOOL_MAX_BYTES
+
+    Returns:
+        Boolean, False if the spool is disabled, full or not writable
+    """
+    if not SPOOL_ENABLED:
+        return False
+
+    line = (json.dumps(item, default=str) + '\n').encode()
+    path = os.path.join(SPOOL_DIR, SPOOL_FILE)
+
+    with _lock:
+        try:
+            os.makedirs(SPOOL_DIR, exist_ok=True)
+            if enforce_limit and get_spool_size() + len(line) > SPOOL_MAX_BYTES:
+                logger.error(f"Spool full ({SPOOL_MAX_BYTES} bytes), cannot keep form {item.get('formId')}")
+                put_metric('SpoolRejected', 1)
+                return False
+
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        except OSError as e:
+            logger.error(f"Error spooling form {item.get('formId')}: {str(e)}")
+            return False
+
+    logger.warning(f"Spooled form {item.get('formId')} for later replay")
+    put_metric('SpooledSubmissions', 1)
+    return True
+
+def get_spool_size():
+    """Return the bytes held by the spool and any interrupted replays"""
+    return sum(
+        os.path.getsize(path)
+        for path in glob.glob(os.path.join(SPOOL_DIR, f"{SPOOL_FILE}*"))
+        if os.path.isfile(path)
+    )
+
+def has_spooled_items():
+    """Return True if anything is waiting to be replayed"""
+    return bool(glob.glob(os.path.join(SPOOL_DIR, f"{SPOOL_FILE}*")))
+
+def start_replay(table_name):
+    """
+    Replay the spool in a background thread if it holds anything
+
+    Called at the start of each invocation; the thread keeps running across
+    warm invocations until the spool is drained. It is a no-op while a
+    replay is already in progress.
+
+    Args:
+        table_name: DynamoDB table name
+
+    Returns:
+        Boolean, True if a replay was started
+    """
+    global _replay_thread
+
+    if not SPOOL_ENABLED or not has_spooled_items():
+        return False
+
+    with _lock:
+        if _replay_thread is not None and _replay_thread.is_alive():
+            return False
+        _replay_thread = threading.Thread(target=replay_spool, args=(table_name,), daemon=True)
+        _replay_thread.start()
+    return True
+
+def replay_spool(table_name):
+    """
+    Write spooled submissions to DynamoDB in batches
+
+    The spool file is renamed before reading, so new submissions can keep
+    spooling meanwhile. Items are deduplicated by formId; those that still
+    fail are spooled again.
+
+    Args:
+        table_name: DynamoDB table name
+
+    Returns:
+        Tuple (replayed, failed) counts
+    """
+    started = time.perf_counter()
+
+    with _lock:
+        path = os.path.join(SPOOL_DIR, SPOOL_FILE)
+        if os.path.exists(path):
+            os.replace(path, f"{path}.{time.time_ns()}{REPLAY_SUFFIX}")
+        # Also picks up replays interrupted by a frozen or recycled container
+        replay_paths = sorted(glob.glob(os.path.join(SPOOL_DIR, f"{SPOOL_FILE}.*{REPLAY_SUFFIX}")))
+
+    items = {}
+    for replay_path in replay_paths:
+        items.update((item['formId'], item) for item in read_spool_file(replay_path))
+
+    if not items:
+        for replay_path in replay_paths:
+            os.remove(replay_path)
+        return 0, 0
+
+    outcomes = save_many(list(items.values()), table_name, max_workers=SPOOL_REPLAY_WORKERS)
+    failed = [items[outcome['formId']] for outcome in outcomes if not outcome['success']]
+
+    # Put failures back before dropping the replay files, so nothing is lost in
+    # between; they were already counted against the limit
+    for item in failed:
+        spool_item(item, enforce_limit=False)
+    for replay_path in replay_paths:
+        os.remove(replay_path)
+
+    replayed = len(items) - len(failed)
+    logger.info(f"Replayed {replayed} spooled forms ({len(failed)} failed)")
+    put_metric('SpoolReplayed', replayed)
+    put_metric('SpoolReplayFailed', len(failed))
+    put_metric('SpoolReplayDuration', (time.perf_counter() - started) * 1000, unit='Milliseconds')
+    return replayed, len(failed)
+
+def read_spool_file(path):
+    """
+    Read the items of a spool file, skipping a torn last line
+
+    Args:
+        path: Spool file path
+
+    Returns:
+        List of items
+    """
+    items = []
+    with open(path, 'rb') as spool_file:
+        for line in spool_file:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping unreadable line in {path}")
+                continue
+            if isinstance(item, dict) and item.get('formId'):
+                items.append(item)
+    return items
@@ -1,27 +1,70 @@
 """
 Storage Module for Contact Form Lambda
-Handles saving form submissions to DynamoDB
+Handles saving form submissions to DynamoDB (or a local backend for offline runs)
 """
 
 import os
+import json
+import base64
 import boto3
 import logging
-import uuid
-from datetime import datetime
-from botocore.exceptions import ClientError
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from botocore.exceptions import BotoCoreError, ClientError
+from form_ids import generate_form_id, get_form_id_time
+from storage_backends import EMAIL_INDEX, STATUS_INDEX, ConditionFailedError, StorageError, get_storage_backend
+from ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Configuration
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'dynamodb')  # dynamodb, memory or sqlite
+STORAGE_SQLITE_PATH = os.environ.get('STORAGE_SQLITE_PATH', '/tmp/contact-forms.sqlite3')
+
 # Initialize DynamoDB
 dynamodb = boto3.resource('dynamodb')
 
-def save_to_dynamodb(form_data, table_name):
+# Built once so local backends keep their data across warm invocations
+storage_backend = get_storage_backend(STORAGE_BACKEND, dynamodb=dynamodb, sqlite_path=STORAGE_SQLITE_PATH)
+
+# Read-through cache for get_form_by_id (per warm container)
+FORM_CACHE_ENABLED = os.environ.get('FORM_CACHE_ENABLED', 'false').lower() == 'true'
+FORM_CACHE_SIZE = int(os.environ.get('FORM_CACHE_SIZE', '256'))
+FORM_CACHE_TTL_SECONDS = int(os.environ.get('FORM_CACHE_TTL_SECONDS', '60'))
+
+# Maps (table_name, form_id, attributes) to the item, attributes None for the full item
+form_cache = TTLCache(FORM_CACHE_SIZE)
+# Projections that may be cached, so invalidation can try each; reads with
+# further projections are not cached, which keeps the set (and the work) bounded
+FORM_CACHE_MAX_PROJECTIONS = 16
+cached_projections = {None}
+_projections_lock = threading.Lock()
+
+# Bulk writes (save_many)
+BATCH_SIZE = 25  # BatchWriteItem maximum
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '8'))
+
+# Daily counters (submissions, per status, per formType), kept in the submissions
+# table under STATS#<YYYY-MM-DD>; like idempotency records they have no status,
+# email or formType attribute, so they stay out of the indexes and exports.
+# A submission is counted by the write that confirmed it: save_to_dynamodb after
+# its put succeeds, or the spool replay for the submissions it could not confirm.
+# Counts are approximate: a failed ADD loses a count, and a replay interrupted
+# after writing counts its batch again.
+STATS_ENABLED = os.environ.get('STATS_ENABLED', 'true').lower() == 'true'
+STATS_KEY_PREFIX = 'STATS#'
+STATS_MAX_DAYS = 366
+STATUS_UPDATE_MAX_ATTEMPTS = 3
+
+def save_to_dynamodb(form_data, table_name, form_id=None):
     """
     Save contact form submission to DynamoDB
     
     Args:
         form_data: Validated and sanitized form data
         table_name: DynamoDB table name
+        form_id: Pre-generated form ID (a new one is generated if omitted)
         
     Returns:
         Unique form ID
@@ -30,69 +73,208 @@ def save_to_dynamodb(form_data, table_name):
         Exception if save fails
     """
     try:
-        table = dynamodb.Table(table_name)
-        
-        # Generate unique form ID
-        form_id = f"CONTACT_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
-        
-        # Prepare item for DynamoDB
-        item = {
-            'formId': form_id,
-            'timestamp': datetime.now().isoformat(),
-            'name': form_data.get('name', ''),
-            'email': form_data.get('email', ''),
-            'phone': form_data.get('phone', ''),
-            'company': form_data.get('company', ''),
-            'subject': form_data.get('subject', ''),
-            'message': form_data.get('message', ''),
-            'status': 'new',
-            'formType': 'contact'
-        }
-        
-        # Add metadata if present
-        if form_data.get('metadata'):
-            item['metadata'] = form_data['metadata']
+        item = build_form_item(form_data, form_id)
+        form_id = item['formId']
         
         # Save to DynamoDB
-        table.put_item(Item=item)
+        storage_backend.put(table_name, item)
+        
+        # Counted separately with a plain ADD, so the put stays a single-item write
+        if STATS_ENABLED:
+            count_forms(table_name, [item])
         
         logger.info(f"Contact form saved with ID: {form_id}")
         return form_id
         
-    except ClientError as e:
+    except (ClientError, StorageError) as e:
         logger.error(f"DynamoDB error saving form: {str(e)}")
         raise Exception("Failed to save form submission")
     except Exception as e:
         logger.error(f"Unexpected error saving form: {str(e)}")
         raise Exception("Failed to save form submission")
 
-def get_form_by_id(form_id, table_name):
+def build_form_item(form_data, form_id=None):
+    """
+    Build the DynamoDB item for a submission
+    
+    Imported records may carry their own formId, timestamp and status.
+    
+    Args:
+        form_data: Validated and sanitized form data
+        form_id: Pre-generated form ID (defaults to form_data's or a new one)
+        
+    Returns:
+        Item dict
+    """
+    # Generate unique, time-sortable form ID
+    form_id = form_id or form_data.get('formId') or generate_form_id()
+    
+    item = {
+        'formId': form_id,
+        # Same instant as the ID; the status and email indexes sort on it
+        'timestamp': form_data.get('timestamp') or get_form_id_time(form_id).isoformat(),
+        'name': form_data.get('name', ''),
+        'email': form_data.get('email', ''),
+        'phone': form_data.get('phone', ''),
+        'company': form_data.get('company', ''),
+        'subject': form_data.get('subject', ''),
+        'message': form_data.get('message', ''),
+        'status': form_data.get('status', 'new'),
+        'formType': form_data.get('formType', 'contact'),
+        # Bumped by every status change, for optimistic locking
+        'version': 1
+    }
+    
+    # Add metadata if present
+    if form_data.get('metadata'):
+        item['metadata'] = form_data['metadata']
+    
+    return item
+
+def save_many(forms, table_name, max_workers=BATCH_MAX_WORKERS):
+    """
+    Save many submissions with BatchWriteItem
+    
+    Items are sent in chunks of 25 from a bounded thread pool; the DynamoDB
+    backend retries unprocessed items and throttled requests with jittered
+    exponential backoff. Intended for imports and backlog replays, not the
+    request path.
+    
+    Args:
+        forms: List of form data dicts (see build_form_item)
+        table_name: DynamoDB table name
+        max_workers: Maximum concurrent BatchWriteItem calls
+        
+    Returns:
+        List of outcome dicts in input order, each with 'formId', 'success'
+        and 'error' (None on success)
+    """
+    outcomes = []
+    items = []
+    for form_data in forms:
+        try:
+            item = build_form_item(form_data)
+        except ValueError as e:
+            outcomes.append({'formId': form_data.get('formId'), 'success': False, 'error': str(e)})
+            continue
+        outcomes.append({'formId': item['formId'], 'success': True, 'error': None})
+        items.append((len(outcomes) - 1, item))
+    
+    chunks = [items[start:start + BATCH_SIZE] for start in range(0, len(items), BATCH_SIZE)]
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        for failures in pool.map(lambda chunk: write_chunk(chunk, table_name), chunks):
+            for index, error in failures.items():
+                outcomes[index].update(success=False, error=error)
+    
+    failed = sum(1 for outcome in outcomes if not outcome['success'])
+    logger.info(f"Batch saved {len(outcomes) - failed}/{len(outcomes)} forms to {table_name}")
+    return outcomes
+
+def write_chunk(chunk, table_name):
+    """
+    Write up to 25 items in one batch
+    
+    Args:
+        chunk: List of (outcome_index, item) tuples
+        table_name: DynamoDB table name
+        
+    Returns:
+        Dict mapping outcome index to error message for items that failed
+    """
+    try:
+        failures = storage_backend.batch_put(table_name, [item for _, item in chunk])
+    except (ClientError, BotoCoreError, StorageError) as e:
+        logger.error(f"Batch write failed: {str(e)}")
+        return {index: str(e) for index, _ in chunk}
+    
+    if STATS_ENABLED:
+        count_forms(table_name, [item for _, item in chunk if item['formId'] not in failures])
+    
+    return {index: failures[item['formId']] for index, item in chunk if item['formId'] in failures}
+
+def count_forms(table_name, items):
+    """
+    Add saved submissions to the daily counters, with one ADD per day
+    
+    Failures are logged, not raised, as the submissions themselves are saved.
+    
+    Args:
+        table_name: DynamoDB table name
+        items: Saved submission items
+    """
+    counters = {}
+    for item in items:
+        merge_counters(counters, build_stats_counters(item))
+    
+    try:
+        storage_backend.increment(table_name, counters)
+    except (ClientError, BotoCoreError, StorageError) as e:
+        logger.error(f"Error counting {len(items)} saved forms: {str(e)}")
+
+def get_form_by_id(form_id, table_name, attributes=None):
     """
     Retrieve a form submission by ID
     
+    With FORM_CACHE_ENABLED, results are kept in an LRU cache for
+    FORM_CACHE_TTL_SECONDS, separately for each set of attributes.
+    
     Args:
         form_id: Unique form identifier
         table_name: DynamoDB table name
+        attributes: Attribute names to fetch (e.g. ['status']), or None for the whole item
         
     Returns:
         Form data dict or None if not found
     """
+    projection = tuple(sorted(attributes)) if attributes else None
+    cache_key = (table_name, form_id, projection)
+    
+    if FORM_CACHE_ENABLED:
+        cached = form_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+    
     try:
-        table = dynamodb.Table(table_name)
-        
-        response = table.get_item(
-            Key={'formId': form_id}
-        )
+        item = storage_backend.get(table_name, form_id, projection)
         
-        if 'Item' in response:
-            return response['Item']
+        if item is not None:
+            if FORM_CACHE_ENABLED and track_projection(projection):
+                form_cache.set(cache_key, item, FORM_CACHE_TTL_SECONDS)
+            return dict(item)
         return None
         
-    except ClientError as e:
+    except (ClientError, StorageError) as e:
         logger.error(f"Error retrieving form {form_id}: {str(e)}")
         return None
 
-def update_form_status(form_id, status, table_name):
+def track_projection(projection):
+    """Register a projection for invalidation; False if the set is full and it is not in it"""
+    with _projections_lock:
+        if projection not in cached_projections:
+            if len(cached_projections) >= FORM_CACHE_MAX_PROJECTIONS:
+                return False
+            cached_projections.add(projection)
+    return True
+
+def invalidate_cached_form(form_id, table_name):
+    """Drop a form from the get_form_by_id cache after it changes"""
+    # At most FORM_CACHE_MAX_PROJECTIONS projections, so trying each one is cheap
+    with _projections_lock:
+        projections = list(cached_projections)
+    for projection in projections:
+        form_cache.delete((table_name, form_id, projection))
+
+def get_form_cache_stats():
+    """
+    Return get_form_by_id cache counters for tuning FORM_CACHE_SIZE
+    
+    Returns:
+        Dict with hits, misses, hit_ratio, size and max_entries
+    """
+    return form_cache.stats()
+
+def update_form_status(form_id, status, table_name, expected_version=None):
     """
     Update the status of a form submission
     
@@ -100,32 +282,299 @@ def update_form_status(form_id, status, table_name):
         form_id: Unique form identifier
         status: New status (e.g., 'processed', 'replied', 'spam')
         table_name: DynamoDB table name
+        expected_version: Version the caller last read; the update is refused
+            if the form changed since (None to apply it to the current version)
         
     Returns:
         Boolean indicating success
     """
+    outcome = change_status(table_name, form_id, status, expected_version)
+    return outcome['success']
+
+def update_statuses(updates, table_name, max_workers=BATCH_MAX_WORKERS):
+    """
+    Apply many status changes in parallel, with optimistic locking
+    
+    Current items are read with BatchGetItem, then each change is written as
+    a conditional update on the form's version (in one transaction with its
+    counter updates) from a bounded thread pool. A change never overwrites
+    a concurrent one; it is reported as a conflict instead.
+    
+    Args:
+        updates: List of dicts with 'formId', 'status' and optionally
+            'version' (the version the caller last read)
+        table_name: DynamoDB table name
+        max_workers: Maximum concurrent updates
+        
+    Returns:
+        List of outcome dicts in input order, each with 'formId', 'success',
+        'conflict', 'version' (the new version, or the current one on
+        conflict) and 'error' (None on success)
+    """
+    if not updates:
+        return []
+    
     try:
-        table = dynamodb.Table(table_name)
-        
-        table.update_item(
-            Key={'formId': form_id},
-            UpdateExpression='SET #status = :status, #updated = :updated',
-            ExpressionAttributeNames={
-                '#status': 'status',
-                '#updated': 'lastUpdated'
-            },
-            ExpressionAttributeValues={
-                ':status': status,
-                ':updated': datetime.now().isoformat()
-            }
-        )
+        current_items = storage_backend.batch_get(table_name, [update['formId'] for update in updates])
+    except (ClientError, StorageError) as e:
+        logger.error(f"Error reading forms for bulk status update: {str(e)}")
+        return [build_status_outcome(update['formId'], error=str(e)) for update in updates]
+    
+    def apply(update):
+        current = current_items.get(update['formId'])
+        if current is None:
+            return build_status_outcome(update['formId'], error='NotFound')
+        return change_status(table_name, update['formId'], update['status'], update.get('version'), current)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(updates)))) as pool:
+        outcomes = list(pool.map(apply, updates))
+    
+    conflicts = sum(1 for outcome in outcomes if outcome['conflict'])
+    updated = sum(1 for outcome in outcomes if outcome['success'])
+    logger.info(f"Bulk updated {updated}/{len(outcomes)} form statuses ({conflicts} conflicts)")
+    return outcomes
+
+def change_status(table_name, form_id, status, expected_version=None, current=None):
+    """
+    Set a form's status and bump its version, conditional on the version read
+    
+    Without expected_version, a concurrent change is retried against the
+    re-read item; with it, the change is refused as a conflict.
+    
+    Args:
+        table_name: DynamoDB table name
+        form_id: Unique form identifier
+        status: New status
+        expected_version: Version the caller last read, or None
+        current: Item already read by the caller, or None to read it here
         
-        logger.info(f"Updated form {form_id} status to {status}")
-        return True
+    Returns:
+        Outcome dict (see update_statuses)
+    """
+    try:
+        # Drop the cached copy even if the write fails, as its outcome may be unknown
+        invalidate_cached_form(form_id, table_name)
         
-    except ClientError as e:
+        for _ in range(STATUS_UPDATE_MAX_ATTEMPTS):
+            if current is None:
+                current = storage_backend.get(table_name, form_id, ['status', 'timestamp', 'formType', 'version'])
+                if current is None:
+                    logger.warning(f"Cannot update status of missing form {form_id}")
+                    return build_status_outcome(form_id, error='NotFound')
+            
+            # Forms saved before versioning count as version 0
+            version = int(current.get('version', 0))
+            if expected_version is not None and version != int(expected_version):
+                return build_status_outcome(form_id, conflict=True, version=version)
+            
+            try:
+                storage_backend.update(
+                    table_name, form_id,
+                    {'status': status, 'lastUpdated': datetime.now().isoformat(), 'version': version + 1},
+                    # The status is checked too, for writers that do not bump the version
+                    expected={'version': version or None, 'status': current.get('status')},
+                    counters=build_status_counters(current, status) if STATS_ENABLED else None
+                )
+                # Again, in case a concurrent read cached the old item meanwhile
+                invalidate_cached_form(form_id, table_name)
+                logger.info(f"Updated form {form_id} status to {status}")
+                return build_status_outcome(form_id, success=True, version=version + 1)
+                
+            except ConditionFailedError:
+                if expected_version is not None:
+                    return build_status_outcome(form_id, conflict=True, version=get_version(table_name, form_id))
+                logger.info(f"Form {form_id} changed concurrently, retrying")
+                current = None
+        
+        logger.error(f"Gave up updating form {form_id} after {STATUS_UPDATE_MAX_ATTEMPTS} conflicts")
+        return build_status_outcome(form_id, conflict=True, version=get_version(table_name, form_id))
+        
+    except (ClientError, StorageError) as e:
         logger.error(f"Error updating form status: {str(e)}")
-        return False
+        return build_status_outcome(form_id, error=str(e))
+
+def get_version(table_name, form_id):
+    """Read a form's current version for a conflict outcome (None if the form is gone)"""
+    current = storage_backend.get(table_name, form_id, ['version'])
+    return int(current.get('version', 0)) if current is not None else None
+
+def build_status_outcome(form_id, success=False, conflict=False, version=None, error=None):
+    """Build the outcome dict of one status change"""
+    if conflict:
+        error = 'Conflict'
+    return {'formId': form_id, 'success': success, 'conflict': conflict, 'version': version, 'error': error}
+
+def query_forms(table_name, status=None, email=None, start_time=None, end_time=None,
+                limit=50, cursor=None, newest_first=True):
+    """
+    Query submissions by status or by email, optionally within a date range
+    
+    Reads go through the status or email index, so a page costs the same
+    however large the table grows.
+    
+    Args:
+        table_name: DynamoDB table name
+        status: Submission status to list (e.g. 'new')
+        email: Submitter email to list (exactly one of status and email is required)
+        start_time: Earliest submission time (datetime or ISO string), inclusive
+        end_time: Latest submission time (datetime or ISO string), inclusive
+        limit: Maximum number of items per page
+        cursor: nextCursor from the previous page
+        newest_first: Sort by timestamp descending
+        
+    Returns:
+        Dict with 'items' (list of form dicts) and 'nextCursor' (None on the last page)
+        
+    Raises:
+        ValueError for invalid arguments, Exception if the query fails
+    """
+    if (status is None) == (email is None):
+        raise ValueError("Provide exactly one of status or email")
+    
+    if status is not None:
+        index, value = 'status', status
+    else:
+        index, value = 'email', email.lower().strip()
+    
+    start = start_time.isoformat() if isinstance(start_time, datetime) else start_time
+    end = end_time.isoformat() if isinstance(end_time, datetime) else end_time
+    
+    try:
+        items, last_key = storage_backend.query(
+            table_name, index, value, start, end, limit,
+            start_key=decode_cursor(cursor) if cursor else None,
+            newest_first=newest_first
+        )
+        return {
+            'items': items,
+            'nextCursor': encode_cursor(last_key) if last_key else None
+        }
+        
+    except (ClientError, StorageError) as e:
+        logger.error(f"Error querying forms by {index}: {str(e)}")
+        raise Exception("Failed to query form submissions")
+
+def build_stats_counters(item, delta=1):
+    """
+    Build the counter updates for adding (or with delta=-1, removing) a submission
+    
+    Args:
+        item: Submission item with timestamp, status and formType
+        delta: Amount to add to each counter
+        
+    Returns:
+        Counters dict for the storage backend
+    """
+    return {
+        get_stats_key(item['timestamp']): {
+            'submissions': delta,
+            f"status:{item.get('status')}": delta,
+            f"formType:{item.get('formType')}": delta
+        }
+    }
+
+def build_status_counters(item, status):
+    """Build the counter updates moving a submission from its current status to status"""
+    if item.get('status') == status or not item.get('timestamp'):
+        return None
+    
+    return {
+        get_stats_key(item['timestamp']): {
+            f"status:{item.get('status')}": -1,
+            f"status:{status}": 1
+        }
+    }
+
+def merge_counters(counters, more):
+    """Add the counter updates in more to counters, in place"""
+    for form_id, counts in more.items():
+        target = counters.setdefault(form_id, {})
+        for name, delta in counts.items():
+            target[name] = target.get(name, 0) + delta
+    return counters
+
+def get_stats_key(timestamp):
+    """Return the formId of the counter item for the day of an ISO timestamp"""
+    return f"{STATS_KEY_PREFIX}{timestamp[:10]}"
+
+def get_stats(table_name, start_date, end_date=None):
+    """
+    Read per-day submission counts for a date range
+    
+    Reads one counter item per day, however many submissions the days hold.
+    Days count submissions by the day they arrived, with their current status.
+    
+    Args:
+        table_name: DynamoDB table name
+        start_date: First day (date, datetime or ISO string), inclusive
+        end_date: Last day (date, datetime or ISO string), inclusive; defaults to today
+        
+    Returns:
+        Dict with 'days' (oldest first, each with 'date', 'submissions',
+        'status' and 'formType' counts) and 'totals' (the same counts over the range)
+        
+    Raises:
+        ValueError for an invalid range, Exception if the read fails
+    """
+    start = to_date(start_date)
+    end = to_date(end_date) if end_date else date.today()
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    if (end - start).days >= STATS_MAX_DAYS:
+        raise ValueError(f"Date range exceeds {STATS_MAX_DAYS} days")
+    
+    days = [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+    
+    try:
+        items = storage_backend.batch_get(table_name, [f"{STATS_KEY_PREFIX}{day}" for day in days])
+    except (ClientError, StorageError) as e:
+        logger.error(f"Error reading stats for {days[0]}..{days[-1]}: {str(e)}")
+        raise Exception("Failed to read submission statistics")
+    
+    totals = {'submissions': 0, 'status': {}, 'formType': {}}
+    stats = []
+    for day in days:
+        item = items.get(f"{STATS_KEY_PREFIX}{day}", {})
+        day_stats = {'date': day, 'submissions': int(item.get('submissions', 0)), 'status': {}, 'formType': {}}
+        for name, value in item.items():
+            group, _, key = name.partition(':')
+            if key and group in ('status', 'formType') and int(value):
+                day_stats[group][key] = int(value)
+                totals[group][key] = totals[group].get(key, 0) + int(value)
+        totals['submissions'] += day_stats['submissions']
+        stats.append(day_stats)
+    
+    return {'days': stats, 'totals': totals}
+
+def to_date(value):
+    """Convert a date, datetime or ISO string to a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def encode_cursor(last_evaluated_key):
+    """Encode a DynamoDB LastEvaluatedKey as an opaque URL-safe cursor"""
+    data = json.dumps(last_evaluated_key, sort_keys=True, default=str).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Raises:
+        ValueError if the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    
+    if not isinstance(key, dict) or 'formId' not in key:
+        raise ValueError("Invalid cursor")
+    return key
 
 def create_contact_form_table(table_name):
     """
@@ -147,6 +596,36 @@ def create_contact_form_table(table_name):
                 {
                     'AttributeName': 'formId',
                     'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'status',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'email',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'timestamp',
+                    'AttributeType': 'S'
+                }
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    'IndexName': STATUS_INDEX,
+                    'KeySchema': [
+                        {'AttributeName': 'status', 'KeyType': 'HASH'},
+                        {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+                    ],
+                    'Projection': {'ProjectionType': 'ALL'}
+                },
+                {
+                    'IndexName': EMAIL_INDEX,
+                    'KeySchema': [
+                        {'AttributeName': 'email', 'KeyType': 'HASH'},
+                        {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+                    ],
+                    'Projection': {'ProjectionType': 'ALL'}
                 }
             ],
             BillingMode='PAY_PER_REQUEST',  # On-demand pricing
@@ -158,6 +637,16 @@ def create_contact_form_table(table_name):
             ]
         )
         
+        # Idempotency records expire through TTL
+        dynamodb_client.get_waiter('table_exists').wait(TableName=table_name)
+        dynamodb_client.update_time_to_live(
+            TableName=table_name,
+            TimeToLiveSpecification={
+                'Enabled': True,
+                'AttributeName': 'expiresAt'
+            }
+        )
+        
         print(f"Table {table_name} created successfully")
         return response
         
@@ -0,0 +1,622 @@
+"""
+Storage Backends for Contact Form Lambda
+DynamoDB, in-memory and SQLite stores for form submissions behind one interface
+"""
+
+import copy
+import json
+import random
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from export import to_json_value
+from rate_limit_backends import deserialize_item
+
+logger = logging.getLogger(__name__)
+
+# Every backend offers the same operations on items keyed by formId:
+#   put(table_name, item)
+#   put_if_absent(table_name, item, now) -> existing item, or None if item was written
+#   batch_put(table_name, items) -> {form_id: error} for the items that failed
+#   get(table_name, form_id, attributes=None) -> item or None
+#   batch_get(table_name, form_ids) -> {form_id: item} for the items that exist
+#   update(table_name, form_id, values, expected=None, counters=None, remove=None) -> None
+#   increment(table_name, counters)
+#   delete(table_name, form_id)
+#   query(table_name, index, value, start=None, end=None, limit=50, start_key=None,
+#         newest_first=True) -> (items, last_key)
+# counters is {form_id: {attribute: delta}}, added to counter items (created on
+# first use) atomically with the update. update sets values and deletes the
+# remove attributes, only if every expected attribute has the given value
+# (None: attribute absent), otherwise it raises ConditionFailedError. query
+# lists items whose index attribute ('status' or 'email') equals value, sorted
+# by timestamp; last_key is the start_key of the next page (None at the end).
+# Operations raise StorageError (or botocore's ClientError for DynamoDB).
+
+QUERY_INDEXES = ('status', 'email')
+
+# DynamoDB GSIs serving the queries (provisioned by storage.create_contact_form_table)
+STATUS_INDEX = 'status-timestamp-index'
+EMAIL_INDEX = 'email-timestamp-index'
+
+class StorageError(Exception):
+    """Failure of a non-DynamoDB storage backend"""
+
+class ConditionFailedError(StorageError):
+    """An update's expected attribute values did not match the stored item"""
+
+def get_storage_backend(name, dynamodb=None, sqlite_path=None):
+    """
+    Build the storage backend for the configured name
+
+    Args:
+        name: 'dynamodb', 'memory' or 'sqlite'
+        dynamodb: boto3 DynamoDB resource (dynamodb backend)
+        sqlite_path: Database file (sqlite backend)
+
+    Returns:
+        Backend instance
+    """
+    if name == 'dynamodb':
+        return DynamoDBStorage(dynamodb)
+    if name == 'memory':
+        return MemoryStorage()
+    if name == 'sqlite':
+        return SQLiteStorage(sqlite_path)
+    raise ValueError(f"Unknown storage backend: {name}")
+
+class DynamoDBStorage:
+    """
+    Submissions in DynamoDB tables, queried through the status and email GSIs
+    """
+
+    INDEX_NAMES = {
+        'status': STATUS_INDEX,
+        'email': EMAIL_INDEX
+    }
+    BATCH_MAX_ATTEMPTS = 8
+    BATCH_BACKOFF_BASE_SECONDS = 0.05
+    BATCH_BACKOFF_MAX_SECONDS = 5
+    RETRYABLE_ERROR_CODES = (
+        'ProvisionedThroughputExceededException',
+        'ThrottlingException',
+        'RequestLimitExceeded',
+        'InternalServerError'
+    )
+    # Cancellation reasons worth retrying a transaction for
+    RETRYABLE_CANCELLATION_CODES = ('None', 'TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded')
+    TRANSACT_MAX_ATTEMPTS = 4
+    BATCH_GET_SIZE = 100  # BatchGetItem maximum
+
+    def __init__(self, dynamodb):
+        self.dynamodb = dynamodb
+
+    def put(self, table_name, item):
+        """Write an item, replacing any item with the same formId"""
+        self.dynamodb.Table(table_name).put_item(Item=item)
+
+    def put_if_absent(self, table_name, item, now):
+        """
+        Write an item unless one with the same formId exists and has not expired
+
+        Args:
+            table_name: Table name
+            item: Item to write
+            now: Epoch seconds compared with the existing item's expiresAt
+
+        Returns:
+            The existing item, or None if item was written
+        """
+        try:
+            self.dynamodb.Table(table_name).put_item(
+                Item=item,
+                # Expired items can linger until TTL deletion runs, so they may be replaced
+                ConditionExpression='attribute_not_exists(formId) OR expiresAt < :now',
+                ExpressionAttributeValues={':now': now},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            return None
+
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            return deserialize_item(e.response.get('Item', {}))
+
+    def batch_put(self, table_name, items):
+        """
+        Write up to 25 items with BatchWriteItem, retrying unprocessed ones
+
+        Unprocessed items and throttled requests are retried with jittered
+        exponential backoff.
+
+        Returns:
+            Dict mapping formId to error for the items that could not be written
+        """
+        # The resource's client is thread-safe and (de)serializes Python values
+        client = self.dynamodb.meta.client
+        pending = [item['formId'] for item in items]
+        requests = [{'PutRequest': {'Item': item}} for item in items]
+
+        for attempt in range(self.BATCH_MAX_ATTEMPTS):
+            if attempt:
+                delay = min(self.BATCH_BACKOFF_MAX_SECONDS, self.BATCH_BACKOFF_BASE_SECONDS * 2 ** attempt)
+                time.sleep(random.uniform(0, delay))
+
+            try:
+                response = client.batch_write_item(RequestItems={table_name: requests})
+            except ClientError as e:
+                error_code = e.response['Error']['Code']
+                if error_code in self.RETRYABLE_ERROR_CODES:
+                    continue
+                logger.error(f"Batch write failed: {str(e)}")
+                return {form_id: error_code for form_id in pending}
+
+            requests = response.get('UnprocessedItems', {}).get(table_name, [])
+            if not requests:
+                return {}
+            pending = [request['PutRequest']['Item']['formId'] for request in requests]
+
+        logger.error(f"Gave up on {len(pending)} unprocessed items after {self.BATCH_MAX_ATTEMPTS} attempts")
+        return {form_id: 'Unprocessed' for form_id in pending}
+
+    def get(self, table_name, form_id, attributes=None):
+        """Return the item (only the given attributes, if any) or None"""
+        request = {'Key': {'formId': form_id}}
+        if attributes:
+            # Placeholders, since names like status and timestamp are reserved words
+            names = {f"#a{index}": name for index, name in enumerate(attributes)}
+            request['ProjectionExpression'] = ', '.join(names)
+            request['ExpressionAttributeNames'] = names
+
+        return self.dynamodb.Table(table_name).get_item(**request).get('Item')
+
+    def batch_get(self, table_name, form_ids):
+        """Read items with BatchGetItem, retrying unprocessed keys"""
+        client = self.dynamodb.meta.client
+        items = {}
+        form_ids = list(dict.fromkeys(form_ids))
+
+        for offset in range(0, len(form_ids), self.BATCH_GET_SIZE):
+            keys = [{'formId': form_id} for form_id in form_ids[offset:offset + self.BATCH_GET_SIZE]]
+            for attempt in range(self.BATCH_MAX_ATTEMPTS):
+                if attempt:
+                    delay = min(self.BATCH_BACKOFF_MAX_SECONDS, self.BATCH_BACKOFF_BASE_SECONDS * 2 ** attempt)
+                    time.sleep(random.uniform(0, delay))
+
+                response = client.batch_get_item(RequestItems={table_name: {'Keys': keys}})
+                items.update((item['formId'], item) for item in response.get('Responses', {}).get(table_name, []))
+                keys = response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', [])
+                if not keys:
+                    break
+            else:
+                raise StorageError(f"Gave up on {len(keys)} unprocessed keys after {self.BATCH_MAX_ATTEMPTS} attempts")
+
+        return items
+
+    def update(self, table_name, form_id, values, expected=None, counters=None, remove=None):
+        """
+        Set (and remove) attributes on an item, if it holds the expected values
+
+        With counters, the update and the counter updates share one transaction.
+
+        Raises:
+            ConditionFailedError if an expected value did not match
+        """
+        update = build_update(table_name, form_id, values, expected, remove)
+        if counters:
+            self.transact(
+                [{'Update': update}]
+                + [{'Update': build_increment(table_name, key, counts)} for key, counts in counters.items()]
+            )
+            return
+
+        try:
+            self.dynamodb.meta.client.update_item(**update)
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                raise ConditionFailedError(f"Item {form_id} did not match {expected}") from e
+            raise
+
+    def increment(self, table_name, counters):
+        """Add to counter items, one UpdateItem each (not atomic across items)"""
+        client = self.dynamodb.meta.client
+        for form_id, counts in counters.items():
+            client.update_item(**build_increment(table_name, form_id, counts))
+
+    def transact(self, requests):
+        """
+        Run TransactWriteItems, retrying conflicts and throttling
+
+        Counter items are shared by many writers, so transactions touching
+        them are occasionally cancelled by a concurrent one.
+
+        Raises:
+            ConditionFailedError if a condition check cancelled the transaction
+        """
+        client = self.dynamodb.meta.client
+        last_error = None
+
+        for attempt in range(self.TRANSACT_MAX_ATTEMPTS):
+            if attempt:
+                delay = min(self.BATCH_BACKOFF_MAX_SECONDS, self.BATCH_BACKOFF_BASE_SECONDS * 2 ** attempt)
+                time.sleep(random.uniform(0, delay))
+
+            try:
+                client.transact_write_items(TransactItems=requests)
+                return
+            except ClientError as e:
+                error_code = e.response['Error']['Code']
+                if error_code == 'TransactionCanceledException':
+                    reasons = [reason.get('Code', 'None') for reason in e.response.get('CancellationReasons', [])]
+                    if 'ConditionalCheckFailed' in reasons:
+                        raise ConditionFailedError(f"Transaction condition failed: {reasons}") from e
+                    if not all(reason in self.RETRYABLE_CANCELLATION_CODES for reason in reasons):
+                        raise
+                elif error_code not in self.RETRYABLE_ERROR_CODES + ('TransactionInProgressException',):
+                    raise
+                last_error = e
+
+        raise last_error
+
+    def delete(self, table_name, form_id):
+        """Delete an item if present"""
+        self.dynamodb.Table(table_name).delete_item(Key={'formId': form_id})
+
+    def query(self, table_name, index, value, start=None, end=None, limit=50, start_key=None, newest_first=True):
+        """Query the status or email GSI (see module comment)"""
+        condition = Key(index).eq(value)
+        if start and end:
+            condition &= Key('timestamp').between(start, end)
+        elif start:
+            condition &= Key('timestamp').gte(start)
+        elif end:
+            condition &= Key('timestamp').lte(end)
+
+        query = {
+            'IndexName': self.INDEX_NAMES[index],
+            'KeyConditionExpression': condition,
+            'ScanIndexForward': not newest_first,
+            'Limit': limit
+        }
+        if start_key:
+            query['ExclusiveStartKey'] = start_key
+
+        response = self.dynamodb.Table(table_name).query(**query)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+class MemoryStorage:
+    """
+    Thread-safe in-process tables for tests, local runs and benchmarks
+
+    Items are copied in and out, so callers never share state with the store.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def put(self, table_name, item):
+        """See DynamoDBStorage.put"""
+        with self._lock:
+            self._tables.setdefault(table_name, {})[item['formId']] = copy.deepcopy(item)
+
+    def put_if_absent(self, table_name, item, now):
+        """See DynamoDBStorage.put_if_absent"""
+        with self._lock:
+            table = self._tables.setdefault(table_name, {})
+            existing = table.get(item['formId'])
+            if existing is not None and existing.get('expiresAt', now) >= now:
+                return copy.deepcopy(existing)
+            table[item['formId']] = copy.deepcopy(item)
+            return None
+
+    def batch_put(self, table_name, items):
+        """See DynamoDBStorage.batch_put"""
+        for item in items:
+            self.put(table_name, item)
+        return {}
+
+    def get(self, table_name, form_id, attributes=None):
+        """See DynamoDBStorage.get"""
+        with self._lock:
+            item = self._tables.get(table_name, {}).get(form_id)
+            return project(copy.deepcopy(item), attributes) if item is not None else None
+
+    def batch_get(self, table_name, form_ids):
+        """See DynamoDBStorage.batch_get"""
+        with self._lock:
+            table = self._tables.get(table_name, {})
+            return {form_id: copy.deepcopy(table[form_id]) for form_id in form_ids if form_id in table}
+
+    def update(self, table_name, form_id, values, expected=None, counters=None, remove=None):
+        """See DynamoDBStorage.update (creates the item if missing, like UpdateItem)"""
+        with self._lock:
+            table = self._tables.setdefault(table_name, {})
+            current = table.get(form_id, {})
+            if expected and any(current.get(name) != value for name, value in expected.items()):
+                raise ConditionFailedError(f"Item {form_id} did not match {expected}")
+            item = table.setdefault(form_id, {'formId': form_id})
+            item.update(copy.deepcopy(values))
+            for name in remove or ():
+                item.pop(name, None)
+            self.add_counters(table_name, counters)
+
+    def increment(self, table_name, counters):
+        """See DynamoDBStorage.increment"""
+        with self._lock:
+            self.add_counters(table_name, counters)
+
+    def add_counters(self, table_name, counters):
+        """Apply counter deltas (lock held)"""
+        table = self._tables.setdefault(table_name, {})
+        for form_id, counts in (counters or {}).items():
+            item = table.setdefault(form_id, {'formId': form_id})
+            for name, delta in counts.items():
+                item[name] = item.get(name, 0) + delta
+
+    def delete(self, table_name, form_id):
+        """See DynamoDBStorage.delete"""
+        with self._lock:
+            self._tables.get(table_name, {}).pop(form_id, None)
+
+    def query(self, table_name, index, value, start=None, end=None, limit=50, start_key=None, newest_first=True):
+        """See DynamoDBStorage.query"""
+        with self._lock:
+            matches = sorted(
+                (
+                    (item.get('timestamp', ''), form_id)
+                    for form_id, item in self._tables.get(table_name, {}).items()
+                    if item.get(index) == value
+                    and (start is None or item.get('timestamp', '') >= start)
+                    and (end is None or item.get('timestamp', '') <= end)
+                ),
+                reverse=newest_first
+            )
+            if start_key:
+                position = (start_key['timestamp'], start_key['formId'])
+                matches = [
+                    match for match in matches
+                    if (match < position if newest_first else match > position)
+                ]
+
+            page = [copy.deepcopy(self._tables[table_name][form_id]) for _, form_id in matches[:limit]]
+
+        last_key = None
+        if len(matches) > limit:
+            last_key = {'formId': page[-1]['formId'], index: value, 'timestamp': page[-1].get('timestamp', '')}
+        return page, last_key
+
+class SQLiteStorage:
+    """
+    Submissions in a local SQLite file, one table per table name
+
+    Items are stored as JSON next to indexed status, email and timestamp
+    columns, so the status and email queries page through an index
+    (keyset pagination on timestamp and formId) like the DynamoDB GSIs.
+    One connection is shared under a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path or ':memory:'
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._tables = set()
+
+        with self._lock:
+            if self.path != ':memory:':
+                self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+
+    def ensure_table(self, table_name):
+        """Create the table and its indexes on first use (lock held)"""
+        if table_name in self._tables:
+            return
+        table = quote_identifier(table_name)
+        self._connection.executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                form_id TEXT PRIMARY KEY,
+                status TEXT,
+                email TEXT,
+                timestamp TEXT,
+                expires_at INTEGER,
+                item TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS {quote_identifier(table_name + '_status')}
+                ON {table} (status, timestamp, form_id);
+            CREATE INDEX IF NOT EXISTS {quote_identifier(table_name + '_email')}
+                ON {table} (email, timestamp, form_id);
+        """)
+        self._tables.add(table_name)
+
+    def execute(self, table_name, sql, parameters=()):
+        """Run one statement against a table (lock held), wrapping SQLite errors"""
+        self.ensure_table(table_name)
+        try:
+            return self._connection.execute(sql.format(table=quote_identifier(table_name)), parameters)
+        except sqlite3.Error as e:
+            raise StorageError(f"SQLite error on {table_name}: {str(e)}") from e
+
+    def write(self, table_name, item):
+        """Insert or replace an item (lock held)"""
+        self.execute(
+            table_name,
+            'INSERT OR REPLACE INTO {table} (form_id, status, email, timestamp, expires_at, item) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                item['formId'], item.get('status'), item.get('email'), item.get('timestamp'),
+                item.get('expiresAt'), json.dumps(item, default=to_json_value)
+            )
+        )
+
+    def read(self, table_name, form_id):
+        """Return an item or None (lock held)"""
+        row = self.execute(table_name, 'SELECT item FROM {table} WHERE form_id = ?', (form_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, table_name, item):
+        """See DynamoDBStorage.put"""
+        with self._lock:
+            self.write(table_name, item)
+
+    def put_if_absent(self, table_name, item, now):
+        """See DynamoDBStorage.put_if_absent"""
+        with self._lock:
+            existing = self.read(table_name, item['formId'])
+            if existing is not None and existing.get('expiresAt', now) >= now:
+                return existing
+            self.write(table_name, item)
+            return None
+
+    def batch_put(self, table_name, items):
+        """See DynamoDBStorage.batch_put (one transaction per batch)"""
+        with self._lock:
+            try:
+                with self.transaction(table_name):
+                    for item in items:
+                        self.write(table_name, item)
+            except StorageError as e:
+                return {item['formId']: str(e) for item in items}
+        return {}
+
+    def get(self, table_name, form_id, attributes=None):
+        """See DynamoDBStorage.get"""
+        with self._lock:
+            item = self.read(table_name, form_id)
+        return project(item, attributes) if item is not None else None
+
+    def batch_get(self, table_name, form_ids):
+        """See DynamoDBStorage.batch_get"""
+        with self._lock:
+            items = (self.read(table_name, form_id) for form_id in form_ids)
+            return {item['formId']: item for item in items if item is not None}
+
+    def update(self, table_name, form_id, values, expected=None, counters=None, remove=None):
+        """See DynamoDBStorage.update (creates the item if missing, like UpdateItem)"""
+        with self._lock:
+            with self.transaction(table_name):
+                current = self.read(table_name, form_id)
+                if expected and any((current or {}).get(name) != value for name, value in expected.items()):
+                    raise ConditionFailedError(f"Item {form_id} did not match {expected}")
+                item = current or {'formId': form_id}
+                item.update(values)
+                for name in remove or ():
+                    item.pop(name, None)
+                self.write(table_name, item)
+                self.add_counters(table_name, counters)
+
+    def increment(self, table_name, counters):
+        """See DynamoDBStorage.increment"""
+        with self._lock:
+            with self.transaction(table_name):
+                self.add_counters(table_name, counters)
+
+    def add_counters(self, table_name, counters):
+        """Apply counter deltas (lock held)"""
+        for form_id, counts in (counters or {}).items():
+            item = self.read(table_name, form_id) or {'formId': form_id}
+            for name, delta in counts.items():
+                item[name] = item.get(name, 0) + delta
+            self.write(table_name, item)
+
+    @contextmanager
+    def transaction(self, table_name):
+        """Group statements into one SQLite transaction (lock held)"""
+        self.execute(table_name, 'BEGIN')
+        try:
+            yield
+        except Exception:
+            self.execute(table_name, 'ROLLBACK')
+            raise
+        self.execute(table_name, 'COMMIT')
+
+    def delete(self, table_name, form_id):
+        """See DynamoDBStorage.delete"""
+        with self._lock:
+            self.execute(table_name, 'DELETE FROM {table} WHERE form_id = ?', (form_id,))
+
+    def query(self, table_name, index, value, start=None, end=None, limit=50, start_key=None, newest_first=True):
+        """See DynamoDBStorage.query"""
+        if index not in QUERY_INDEXES:
+            raise ValueError(f"Unknown query index: {index}")
+
+        conditions = [f"{index} = ?"]
+        parameters = [value]
+        if start:
+            conditions.append('timestamp >= ?')
+            parameters.append(start)
+        if end:
+            conditions.append('timestamp <= ?')
+            parameters.append(end)
+        if start_key:
+            conditions.append(f"(timestamp, form_id) {'<' if newest_first else '>'} (?, ?)")
+            parameters.extend([start_key['timestamp'], start_key['formId']])
+
+        order = 'DESC' if newest_first else 'ASC'
+        sql = (
+            f"SELECT item FROM {{table}} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY timestamp {order}, form_id {order} LIMIT ?"
+        )
+        with self._lock:
+            rows = self.execute(table_name, sql, parameters + [limit + 1]).fetchall()
+
+        items = [json.loads(row[0]) for row in rows[:limit]]
+        last_key = None
+        if len(rows) > limit:
+            last_key = {'formId': items[-1]['formId'], index: value, 'timestamp': items[-1].get('timestamp', '')}
+        return items, last_key
+
+def build_update(table_name, form_id, values, expected=None, remove=None):
+    """Build an UpdateItem request setting values and removing attributes, conditional on expected values"""
+    names = {f"#v{index}": name for index, name in enumerate(values)}
+    attribute_values = {f":v{index}": value for index, value in enumerate(values.values())}
+    clauses = []
+    if values:
+        clauses.append('SET ' + ', '.join(f"#v{index} = :v{index}" for index in range(len(values))))
+    if remove:
+        names.update((f"#r{index}", name) for index, name in enumerate(remove))
+        clauses.append('REMOVE ' + ', '.join(f"#r{index}" for index in range(len(remove))))
+    update = {
+        'TableName': table_name,
+        'Key': {'formId': form_id},
+        'UpdateExpression': ' '.join(clauses)
+    }
+
+    if expected:
+        conditions = []
+        for index, (name, value) in enumerate(expected.items()):
+            names[f"#e{index}"] = name
+            if value is None:
+                conditions.append(f"attribute_not_exists(#e{index})")
+            else:
+                attribute_values[f":e{index}"] = value
+                conditions.append(f"#e{index} = :e{index}")
+        update['ConditionExpression'] = ' AND '.join(conditions)
+
+    update['ExpressionAttributeNames'] = names
+    if attribute_values:
+        update['ExpressionAttributeValues'] = attribute_values
+    return update
+
+def build_increment(table_name, form_id, counts):
+    """Build an UpdateItem request adding to counter attributes"""
+    return {
+        'TableName': table_name,
+        'Key': {'formId': form_id},
+        'UpdateExpression': 'ADD ' + ', '.join(f"#c{index} :c{index}" for index in range(len(counts))),
+        'ExpressionAttributeNames': {f"#c{index}": name for index, name in enumerate(counts)},
+        'ExpressionAttributeValues': {f":c{index}": delta for index, delta in enumerate(counts.values())}
+    }
+
+def project(item, attributes):
+    """Return only the given attributes of item (all of them if attributes is empty)"""
+    if not attributes:
+        return item
+    return {name: item[name] for name in attributes if name in item}
+
+def quote_identifier(name):
+    """Quote a table or index name for SQLite"""
+    return '"' + name.replace('"', '""') + '"'
@@ -0,0 +1,34 @@
+"""
+Test configuration for the Contact Form Lambda
+
+Modules read their configuration and build their clients at import time, so
+the environment is set here before any of them is imported. Everything runs
+against the in-memory backends; no AWS account or network is needed.
+"""
+
+import os
+import sys
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('RATE_LIMIT_BACKEND', 'memory')
+os.environ.setdefault('EMAIL_QUEUE_BACKEND', 'local')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+import idempotency  # noqa: E402
+import notification_digest  # noqa: E402
+import storage  # noqa: E402
+from storage_backends import MemoryStorage  # noqa: E402
+
+
+@pytest.fixture
+def memory_storage(monkeypatch):
+    """Give storage and the modules sharing its backend a fresh in-memory store"""
+    backend = MemoryStorage()
+    for module in (storage, idempotency, notification_digest):
+        monkeypatch.setattr(module, 'storage_backend', backend)
+    return backend
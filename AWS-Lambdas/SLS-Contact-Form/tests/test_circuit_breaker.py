@@ -0,0 +1,65 @@
+"""
+Tests for the circuit breaker's state changes
+"""
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drive time.monotonic() from a settable value"""
+    moment = {'now': 1000.0}
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: moment['now'])
+    return moment
+
+
+def open_breaker():
+    breaker = CircuitBreaker('test', min_calls=2, cool_down_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_probe_after_cool_down_closes_the_breaker(clock):
+    breaker = open_breaker()
+    assert not breaker.allow_request()
+
+    clock['now'] += 30
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success(50)
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_slow_probe_reopens_the_breaker(clock):
+    breaker = open_breaker()
+    clock['now'] += 30
+    assert breaker.allow_request()
+
+    breaker.record_success(5000)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_lost_probe_is_replaced_after_cool_down(clock):
+    breaker = open_breaker()
+    clock['now'] += 30
+    assert breaker.allow_request()
+
+    # The probe's invocation timed out before it reported an outcome
+    clock['now'] += 29
+    assert not breaker.allow_request()
+    clock['now'] += 1
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success(50)
+    assert breaker.state == CLOSED
@@ -0,0 +1,127 @@
+"""
+Tests for the email job queue, drained through the worker with a local queue
+"""
+
+import pytest
+from botocore.exceptions import EndpointConnectionError, ParamValidationError
+
+import email_queue
+import email_worker
+from email_queue import LocalQueue, enqueue_emails
+
+SITE = ('Street Lawyer Services', 'https://example.com', 'admin@example.com')
+
+FORM = {
+    'name': 'Jane Doe',
+    'email': 'jane@example.com',
+    'subject': 'Consultation',
+    'message': 'I would like to schedule a consultation.'
+}
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    local_queue = LocalQueue(max_receives=3)
+    monkeypatch.setattr(email_queue, 'queue_client', local_queue)
+    monkeypatch.setattr(email_worker, 'SES_TEMPLATES_ENABLED', False)
+    return local_queue
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record the emails the worker sends; kinds listed in sent['failing'] raise instead"""
+    record = {'notification': [], 'confirmation': [], 'failing': set()}
+
+    def send(kind, form_data):
+        if kind in record['failing']:
+            raise Exception(f"SES rejected the {kind} email")
+        record[kind].append(form_data['email'])
+
+    monkeypatch.setattr(
+        email_queue, 'send_notification_email',
+        lambda form_data, form_id, website_name, website_url, notification_email: send('notification', form_data)
+    )
+    monkeypatch.setattr(
+        email_queue, 'send_confirmation_email',
+        lambda form_data, website_name, website_url: send('confirmation', form_data)
+    )
+    return record
+
+
+def test_queued_emails_are_sent_by_the_worker(queue, sent):
+    for index in range(6):
+        assert enqueue_emails(dict(FORM, email=f"client{index}@example.com"), f"form-{index}", *SITE) == []
+    assert len(queue.messages) == 12
+
+    assert queue.drain(email_worker.lambda_handler) == 2
+
+    expected = [f"client{index}@example.com" for index in range(6)]
+    assert sorted(sent['notification']) == expected
+    assert sorted(sent['confirmation']) == expected
+    assert queue.dead_letters == []
+
+
+def test_failed_email_is_retried_alone_then_dead_lettered(queue, sent):
+    sent['failing'].add('confirmation')
+    enqueue_emails(FORM, 'form-1', *SITE)
+
+    queue.drain(email_worker.lambda_handler)
+
+    # The notification went out once; only the confirmation was retried
+    assert sent['notification'] == ['jane@example.com']
+    assert [message['receiveCount'] for message in queue.dead_letters] == [3]
+    assert '"kind": "confirmation"' in queue.dead_letters[0]['body']
+
+
+def test_malformed_jobs_are_dropped(queue, sent):
+    queue.send_message_batch(QueueUrl='', Entries=[
+        {'Id': 'garbled', 'MessageBody': 'not json'},
+        {'Id': 'unknown', 'MessageBody': '{"kind": "sms"}'}
+    ])
+
+    queue.drain(email_worker.lambda_handler)
+
+    assert not queue.messages
+    assert queue.dead_letters == []
+
+
+class RejectingQueue(LocalQueue):
+    """Fails the confirmation entry of every batch"""
+
+    def send_message_batch(self, QueueUrl, Entries):
+        response = super().send_message_batch(QueueUrl, [entry for entry in Entries if entry['Id'] != 'confirmation'])
+        response['Failed'] = [{'Id': 'confirmation', 'Code': 'InternalError', 'SenderFault': False}]
+        return response
+
+
+def test_enqueue_returns_the_jobs_not_queued(monkeypatch):
+    monkeypatch.setattr(email_queue, 'queue_client', RejectingQueue())
+
+    failed = enqueue_emails(FORM, 'form-1', *SITE)
+
+    assert [(job['kind'], job['formId']) for job in failed] == [('confirmation', 'form-1')]
+
+
+class UnreachableQueue:
+    """Raises client-side errors like an SQS client that cannot send"""
+
+    def __init__(self, error):
+        self.error = error
+
+    def send_message_batch(self, QueueUrl, Entries):
+        raise self.error
+
+
+@pytest.mark.parametrize('error', [
+    EndpointConnectionError(endpoint_url='https://sqs.us-east-1.amazonaws.com'),
+    ParamValidationError(report='Invalid type for parameter QueueUrl, value: ')
+])
+def test_unreachable_queue_returns_every_job(monkeypatch, sent, error):
+    monkeypatch.setattr(email_queue, 'queue_client', UnreachableQueue(error))
+
+    failed = enqueue_emails(FORM, 'form-1', *SITE)
+    for job in failed:
+        email_queue.send_email_job(job)
+
+    assert [job['kind'] for job in failed] == ['notification', 'confirmation']
+    assert sent['notification'] == sent['confirmation'] == ['jane@example.com']
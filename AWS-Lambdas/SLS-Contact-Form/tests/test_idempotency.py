@@ -0,0 +1,71 @@
+"""
+Tests for duplicate submission detection over the in-memory store
+"""
+
+import idempotency
+from idempotency import claim_submission, get_idempotency_key, release_submission
+from storage_backends import MemoryStorage, StorageError
+
+TABLE = 'contact-form-submissions'
+
+FORM = {
+    'name': 'Jane Doe',
+    'email': 'jane@example.com',
+    'subject': 'Consultation',
+    'message': 'I would like to schedule a consultation.'
+}
+
+
+def test_keys_come_from_the_header_or_the_content():
+    assert get_idempotency_key({}, FORM) == get_idempotency_key(None, dict(FORM))
+    assert get_idempotency_key({}, FORM) != get_idempotency_key({}, dict(FORM, message='Something else'))
+
+    header_key = get_idempotency_key({'Idempotency-Key': 'abc'}, FORM)
+    assert header_key == get_idempotency_key({'idempotency-key': 'abc'}, dict(FORM, message='Edited'))
+    assert header_key != get_idempotency_key({'Idempotency-Key': 'abc'}, dict(FORM, email='other@example.com'))
+
+
+def test_duplicate_returns_the_original_form_id(memory_storage):
+    key = get_idempotency_key({}, FORM)
+
+    assert claim_submission(key, 'form-1', TABLE) is None
+    assert claim_submission(key, 'form-2', TABLE) == 'form-1'
+
+    record = memory_storage.get(TABLE, f"{idempotency.KEY_PREFIX}{key}")
+    assert record['resultFormId'] == 'form-1'
+    assert 'status' not in record
+
+
+def test_released_key_can_be_claimed_again(memory_storage):
+    key = get_idempotency_key({}, FORM)
+    claim_submission(key, 'form-1', TABLE)
+
+    release_submission(key, TABLE)
+
+    assert claim_submission(key, 'form-2', TABLE) is None
+    assert claim_submission(key, 'form-3', TABLE) == 'form-2'
+
+
+def test_expired_record_is_replaced(memory_storage, monkeypatch):
+    key = get_idempotency_key({}, FORM)
+    claim_submission(key, 'form-1', TABLE)
+
+    later = idempotency.time.time() + idempotency.IDEMPOTENCY_TTL_SECONDS + 1
+    monkeypatch.setattr(idempotency.time, 'time', lambda: later)
+
+    assert claim_submission(key, 'form-2', TABLE) is None
+
+
+class Unavailable(MemoryStorage):
+    """Fails every conditional write"""
+
+    def put_if_absent(self, table_name, item, now):
+        raise StorageError('database is locked')
+
+
+def test_storage_errors_let_the_submission_through(monkeypatch):
+    monkeypatch.setattr(idempotency, 'storage_backend', Unavailable())
+    key = get_idempotency_key({}, FORM)
+
+    assert claim_submission(key, 'form-1', TABLE) is None
+    assert claim_submission(key, 'form-2', TABLE) is None
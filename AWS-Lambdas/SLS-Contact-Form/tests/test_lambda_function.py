@@ -0,0 +1,73 @@
+"""
+Tests for the submission handler's duplicate and rate limit ordering
+"""
+
+import json
+
+import pytest
+
+import lambda_function
+from rate_limit_algorithms import RateLimitResult
+
+FORM = {
+    'name': 'Jane Doe',
+    'email': 'jane@example.com',
+    'subject': 'Consultation',
+    'message': 'I would like to schedule a consultation about my case.'
+}
+
+
+def make_event(form=FORM, key='retry-1'):
+    return {
+        'httpMethod': 'POST',
+        'headers': {'Idempotency-Key': key},
+        'requestContext': {'identity': {'sourceIp': '203.0.113.7'}},
+        'body': json.dumps(form)
+    }
+
+
+@pytest.fixture
+def limiter(memory_storage, monkeypatch):
+    """Count rate limit checks; set limiter['allowed'] to False to reject them"""
+    state = {'checks': 0, 'allowed': True}
+
+    def check_rate_limit(ip_address):
+        state['checks'] += 1
+        if state['allowed']:
+            return True, None, None, None
+        result = RateLimitResult(False, 'hour', 5, 5, None)
+        return False, 'Too many submissions.', 60, result
+
+    monkeypatch.setattr(lambda_function, 'check_rate_limit', check_rate_limit)
+    monkeypatch.setattr(lambda_function, 'start_replay', lambda table_name: None)
+    monkeypatch.setattr(lambda_function, 'send_emails', lambda **kwargs: None)
+    monkeypatch.setattr(lambda_function, 'IDEMPOTENCY_ENABLED', True)
+    monkeypatch.setattr(lambda_function, 'EMAIL_QUEUE_ENABLED', False)
+    monkeypatch.setattr(lambda_function, 'get_rate_limit_headers', lambda result, include_retry_after: {})
+    return state
+
+
+def call(event):
+    response = lambda_function.lambda_handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_duplicates_skip_the_rate_limiter(limiter):
+    status, body = call(make_event())
+    assert status == 200
+
+    for _ in range(3):
+        assert call(make_event()) == (200, body)
+
+    assert limiter['checks'] == 1
+
+
+def test_rejected_submission_can_be_retried(limiter):
+    limiter['allowed'] = False
+    assert call(make_event())[0] == 429
+
+    limiter['allowed'] = True
+    status, body = call(make_event())
+
+    assert status == 200 and body['success']
+    assert limiter['checks'] == 2
@@ -0,0 +1,72 @@
+"""
+Tests for the in-process token bucket pre-filter
+"""
+
+from datetime import datetime, timedelta
+
+import rate_limiting
+from ip_prefixes import PrefixAggregator
+from local_limiter import LocalRateLimiter
+
+START = datetime(2024, 3, 1, 9, 0)
+
+
+def make_limiter(**kwargs):
+    # 2 submissions per IP and 10 per /24, each refilling one token per hour
+    return LocalRateLimiter(2, 1 / 3600, 10, 1 / 3600, **kwargs)
+
+
+def test_rejection_reports_the_bucket_without_a_token():
+    limiter = make_limiter()
+    for _ in range(2):
+        assert limiter.check('203.0.113.1', START).allowed
+    for host in range(2, 9):
+        assert limiter.check(f"203.0.113.{host}", START).allowed
+
+    # Half an hour later the IP bucket holds 0.5 tokens (1/4 full) and the
+    # prefix bucket 1.5 (3/20 full): only the IP bucket lacks a token
+    now = START + timedelta(minutes=30)
+    result = limiter.check('203.0.113.1', now)
+
+    assert not result.allowed
+    assert (result.count, result.limit) == (2, 2)
+    assert result.reset_time == now + timedelta(minutes=30)
+
+
+def test_prefix_bucket_rejects_other_ips_of_the_network():
+    limiter = make_limiter()
+    for host in range(1, 11):
+        assert limiter.check(f"203.0.113.{host}", START).allowed
+
+    result = limiter.check('203.0.113.200', START)
+
+    assert not result.allowed
+    assert (result.count, result.limit) == (10, 10)
+    assert result.reset_time == START + timedelta(hours=1)
+    assert limiter.check('198.51.100.1', START).allowed
+
+
+def test_prefixes_follow_the_aggregator_rules():
+    limiter = make_limiter(prefix_aggregator=PrefixAggregator('0.0.0.0/0=16'))
+    for host in range(1, 11):
+        assert limiter.check(f"203.0.{host}.1", START).allowed
+
+    assert not limiter.check('203.0.200.1', START).allowed
+
+
+def test_zero_capacity_disables_a_bucket():
+    limiter = LocalRateLimiter(0, 0, 3, 1 / 3600)
+    for host in range(1, 4):
+        assert limiter.check(f"203.0.113.{host}", START).allowed
+
+    result = limiter.check('203.0.113.1', START)
+    assert not result.allowed
+    assert (result.count, result.limit) == (3, 3)
+
+
+def test_fallback_allows_when_every_bucket_is_disabled(monkeypatch):
+    monkeypatch.setattr(rate_limiting, 'LOCAL_RATE_LIMIT_ENABLED', False)
+    monkeypatch.setattr(rate_limiting, 'local_limiter', LocalRateLimiter(0, 0, 0, 0))
+
+    assert LocalRateLimiter(0, 0, 0, 0).check('203.0.113.1', START) is None
+    assert rate_limiting.check_local_fallback('203.0.113.1', START) == (True, None, None, None)
@@ -0,0 +1,73 @@
+"""
+Tests for the admin notification digest over the in-memory store
+"""
+
+import pytest
+
+import notification_digest
+from notification_digest import (
+    DigestFullError, add_to_digest, build_digest_entry, claim_digest, complete_digest, release_digest
+)
+
+SITE = ('Street Lawyer Services', 'https://example.com', 'admin@example.com')
+START = 1700000000
+
+
+def make_entry(index):
+    form_data = {
+        'name': f"Client {index}",
+        'email': f"client{index}@example.com",
+        'subject': 'Consultation',
+        'message': 'Please call me back.',
+        'metadata': {'submittedAt': f"2024-03-01T10:{index:02d}:00"}
+    }
+    return build_digest_entry(form_data, f"form-{index:02d}")
+
+
+@pytest.fixture(autouse=True)
+def digest_settings(memory_storage, monkeypatch):
+    monkeypatch.setattr(notification_digest, 'DIGEST_INTERVAL_MINUTES', 15)
+    monkeypatch.setattr(notification_digest, 'DIGEST_MAX_SUBMISSIONS', 5)
+    monkeypatch.setattr(notification_digest, 'DIGEST_MAX_PENDING', 8)
+
+
+def test_first_submission_is_sent_then_batched():
+    digest = add_to_digest(make_entry(0), *SITE, now=START)
+    assert [entry['formId'] for entry in digest['entries']] == ['form-00']
+    complete_digest(digest, now=START)
+
+    for index in range(1, 5):
+        assert add_to_digest(make_entry(index), *SITE, now=START + index) is None
+
+    digest = add_to_digest(make_entry(5), *SITE, now=START + 5)
+    assert [entry['formId'] for entry in digest['entries']] == [f"form-{index:02d}" for index in range(1, 6)]
+    assert digest['notificationEmail'] == 'admin@example.com'
+
+    # Claimed digests are not handed out twice
+    assert claim_digest(SITE[1], now=START + 6) is None
+
+
+def test_interval_flushes_a_partial_digest():
+    complete_digest(add_to_digest(make_entry(0), *SITE, now=START), now=START)
+    assert add_to_digest(make_entry(1), *SITE, now=START + 60) is None
+
+    assert claim_digest(SITE[1], now=START + 14 * 60) is None
+    digest = claim_digest(SITE[1], now=START + 15 * 60)
+    assert [entry['formId'] for entry in digest['entries']] == ['form-01']
+
+
+def test_digest_stops_growing_while_sending_fails(memory_storage):
+    for index in range(8):
+        digest = add_to_digest(make_entry(index), *SITE, now=START + index)
+        # The send failed; the entries stay for the next attempt
+        release_digest(digest)
+
+    with pytest.raises(DigestFullError):
+        add_to_digest(make_entry(8), *SITE, now=START + 8)
+
+    item = memory_storage.get(notification_digest.DIGEST_TABLE, notification_digest.get_digest_key(SITE[1]))
+    assert sum(1 for name in item if name.startswith('entry:')) == 8
+
+    # Once a digest goes out, notifications queue up again
+    complete_digest(claim_digest(SITE[1], now=START + 9), now=START + 9)
+    assert add_to_digest(make_entry(9), *SITE, now=START + 10) is None
@@ -0,0 +1,53 @@
+"""
+Tests for the rate limiting algorithms over the in-memory backend
+"""
+
+from datetime import datetime, timedelta
+
+from rate_limit_algorithms import FixedWindowLimiter, SlidingWindowLimiter, sliding_reset_time
+from rate_limit_backends import MemoryBackend
+
+HOUR = timedelta(hours=1)
+
+
+def test_sliding_window_reports_when_the_oldest_submission_leaves():
+    limiter = SlidingWindowLimiter(MemoryBackend(), 5, 20)
+    for minute in (10, 20, 30):
+        assert limiter.check('203.0.113.7', datetime(2024, 3, 1, 9, minute)).allowed
+
+    # The 3 submissions of 9:00-10:00 slide out one every 20 minutes from 10:00
+    now = datetime(2024, 3, 1, 10, 15)
+    result = limiter.check('203.0.113.7', now)
+
+    assert result.allowed
+    assert (result.window, result.count, result.limit) == ('hour', 4, 5)
+    assert result.reset_time == datetime(2024, 3, 1, 10, 20)
+
+
+def test_sliding_reset_time_is_never_in_the_past_with_room_left():
+    start = datetime(2024, 3, 1, 10)
+    now = start + timedelta(minutes=45)
+
+    assert sliding_reset_time(now, start, HOUR, 0, 1, 5) == start + 2 * HOUR
+    assert sliding_reset_time(now, start, HOUR, 2, 1, 5) == start + HOUR
+    assert sliding_reset_time(now, start, HOUR, 4, 3, 5) == start + timedelta(minutes=60)
+
+
+def test_sliding_reset_time_waits_for_room_when_full():
+    start = datetime(2024, 3, 1, 10)
+
+    # 4 of 5 used now plus 4 previous: room once 3/4 of the previous hour slid out
+    assert sliding_reset_time(start, start, HOUR, 4, 4, 5) == start + timedelta(minutes=60)
+    # Full current window: it must slide out as the previous one
+    assert sliding_reset_time(start, start, HOUR, 0, 5, 5) == start + timedelta(minutes=72)
+
+
+def test_fixed_window_reports_counts_with_prefix_limits():
+    limiter = FixedWindowLimiter(MemoryBackend(), 5, 10, prefix_hourly_limit=20, prefix_daily_limit=50)
+    now = datetime(2024, 3, 1, 10, 15)
+
+    result = limiter.check('203.0.113.7', now, '203.0.113.0/24')
+
+    assert result.allowed
+    assert (result.window, result.count, result.limit) == ('hour', 1, 5)
+    assert result.reset_time == datetime(2024, 3, 1, 11)
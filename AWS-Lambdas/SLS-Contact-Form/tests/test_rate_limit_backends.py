@@ -0,0 +1,179 @@
+"""
+Tests for the rate limit backends' DynamoDB item layouts
+"""
+
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+import rate_limit_backends
+from rate_limit_backends import DynamoDBBackend, get_day_bucket, get_hour_bucket
+
+TTL_SECONDS = 172800
+
+
+class FakeTable:
+    """
+    Applies the ADD and REMOVE clauses of counter updates to in-memory items
+
+    Of the conditions, only the sharded marker guard is evaluated; the tests
+    keep every count under its limit.
+    """
+
+    name = 'contact-form-rate-limits'
+
+    def __init__(self):
+        self.items = {}
+        self.meta = SimpleNamespace(client=self)
+
+    def update_item(self, **update):
+        if self.is_sharded(update):
+            raise ClientError({
+                'Error': {'Code': 'ConditionalCheckFailedException'},
+                'Item': serialize(self.items[update['Key']['rate_key']])
+            }, 'UpdateItem')
+        item = self.apply(update)
+        return {'Attributes': dict(item)}
+
+    def transact_write_items(self, TransactItems):
+        updates = [request['Update'] for request in TransactItems]
+        if any(self.is_sharded(update) for update in updates):
+            raise ClientError({
+                'Error': {'Code': 'TransactionCanceledException'},
+                'CancellationReasons': [
+                    {'Code': 'ConditionalCheckFailed', 'Item': serialize(self.items[update['Key']['rate_key']])}
+                    if self.is_sharded(update) else {'Code': 'None'}
+                    for update in updates
+                ]
+            }, 'TransactWriteItems')
+        for update in updates:
+            self.apply(update)
+        return {}
+
+    def batch_get_item(self, RequestItems):
+        keys = RequestItems[self.name]['Keys']
+        items = [dict(self.items[key['rate_key']]) for key in keys if key['rate_key'] in self.items]
+        return {'Responses': {self.name: items}}
+
+    def is_sharded(self, update):
+        item = self.items.get(update['Key']['rate_key'], {})
+        return item.get('sharded') and 'attribute_not_exists(sharded)' in update.get('ConditionExpression', '')
+
+    def apply(self, update):
+        rate_key = update['Key']['rate_key']
+        item = self.items.setdefault(rate_key, {'rate_key': rate_key})
+        names = update['ExpressionAttributeNames']
+        values = update['ExpressionAttributeValues']
+        expression = update['UpdateExpression']
+
+        for clause in re.search(r'ADD (.*?) SET', expression).group(1).split(', '):
+            name, value = clause.split()
+            item[names[name]] = item.get(names[name], 0) + values[value]
+        removal = re.search(r'REMOVE (.*)$', expression)
+        for name in removal.group(1).split(', ') if removal else ():
+            item.pop(names[name], None)
+        return item
+
+
+def serialize(item):
+    return {name: TypeSerializer().serialize(value) for name, value in item.items()}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Drive the backend's datetime.now() from a settable moment"""
+    moment = {'now': datetime(2024, 3, 1, 9, 30)}
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment['now']
+
+    monkeypatch.setattr(rate_limit_backends, 'datetime', FrozenDatetime)
+    return moment
+
+
+def get_buckets(item):
+    return sorted(name for name in item if name not in ('rate_key', 'expires_at'))
+
+
+def record_submissions(backend, clock, subjects, hours):
+    for _ in range(hours):
+        now = clock['now']
+        limits = {get_hour_bucket(now): 100, get_day_bucket(now): 1000}
+        is_allowed, _ = backend.increment_many([(subject, limits) for subject in subjects], TTL_SECONDS)
+        assert is_allowed
+        clock['now'] += timedelta(hours=1)
+
+
+@pytest.mark.parametrize('subjects', [
+    ['203.0.113.7'],
+    ['203.0.113.7', '203.0.113.0/24']  # prefix limits go through one transaction
+])
+def test_compact_items_prune_stale_buckets(clock, subjects):
+    table = FakeTable()
+    backend = DynamoDBBackend(table, layout='compact')
+
+    record_submissions(backend, clock, subjects, hours=72)
+
+    last = clock['now'] - timedelta(hours=1)
+    expected = sorted([
+        get_hour_bucket(last - timedelta(hours=1)), get_hour_bucket(last),
+        get_day_bucket(last - timedelta(days=1)), get_day_bucket(last)
+    ])
+    for subject in subjects:
+        assert get_buckets(table.items[subject]) == expected
+
+
+def test_stale_buckets_cover_the_item_lifetime():
+    now = datetime(2024, 3, 1, 9, 30)
+    stale = rate_limit_backends.get_stale_buckets(now, TTL_SECONDS)
+
+    assert all(rate_limit_backends.is_stale_bucket(bucket, now) for bucket in stale)
+    assert get_hour_bucket(now - timedelta(seconds=TTL_SECONDS)) in stale
+    assert get_day_bucket(now - timedelta(seconds=TTL_SECONDS)) in stale
+
+
+def test_transaction_reads_back_the_new_counts(clock):
+    backend = DynamoDBBackend(FakeTable(), layout='compact')
+    now = clock['now']
+    limits = {get_hour_bucket(now): 5, get_day_bucket(now): 10}
+
+    backend.increment_many([('203.0.113.7', limits), ('203.0.113.0/24', limits)], TTL_SECONDS)
+    is_allowed, counts_list = backend.increment_many(
+        [('203.0.113.8', limits), ('203.0.113.0/24', limits)], TTL_SECONDS
+    )
+
+    assert is_allowed
+    assert counts_list == [
+        {get_hour_bucket(now): 1, get_day_bucket(now): 1},
+        {get_hour_bucket(now): 2, get_day_bucket(now): 2}
+    ]
+
+
+def test_transaction_on_a_sharded_key_is_retried_per_key(clock):
+    table = FakeTable()
+    backend = DynamoDBBackend(table, shard_count=4, layout='daily')
+    now = clock['now']
+    # Another container sharded the IP's day item after its first submission
+    table.items['203.0.113.7#20240301'] = {
+        'rate_key': '203.0.113.7#20240301', 'sharded': True, 'submission_count': 1, 'hour_09': 1
+    }
+    limits = {get_hour_bucket(now): 5, get_day_bucket(now): 10}
+
+    is_allowed, counts_list = backend.increment_many(
+        [('203.0.113.7', limits), ('203.0.113.0/24', limits)], TTL_SECONDS
+    )
+
+    assert is_allowed
+    assert counts_list == [
+        {get_hour_bucket(now): 2, get_day_bucket(now): 2},
+        {get_hour_bucket(now): 1, get_day_bucket(now): 1}
+    ]
+    shards = [table.items[key] for key in backend.get_shard_keys('203.0.113.7#20240301') if key in table.items]
+    assert [(shard['submission_count'], shard['hour_09']) for shard in shards] == [(1, 1)]
+    assert table.items['203.0.113.0/24#20240301']['submission_count'] == 1
@@ -0,0 +1,170 @@
+"""
+Tests for the submission store: saving, daily counters and spool replay
+"""
+
+import pytest
+from botocore.exceptions import EndpointConnectionError, ReadTimeoutError
+
+import spool
+import storage
+from storage_backends import MemoryStorage
+
+TABLE = 'contact-form-submissions'
+
+FORM = {
+    'name': 'Jane Doe',
+    'email': 'jane@example.com',
+    'subject': 'Consultation',
+    'message': 'I would like to schedule a consultation.'
+}
+
+
+class CommitThenTimeout(MemoryStorage):
+    """Stores the first put, then fails it like a client read timeout after the write committed"""
+
+    def __init__(self):
+        super().__init__()
+        self.timeouts = 1
+
+    def put(self, table_name, item):
+        super().put(table_name, item)
+        if self.timeouts:
+            self.timeouts -= 1
+            raise ReadTimeoutError(endpoint_url='https://dynamodb.us-east-1.amazonaws.com')
+
+
+def get_total(key='submissions'):
+    return storage.get_stats(TABLE, '2020-01-01', '2020-01-01')['totals'][key]
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool, 'SPOOL_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_save_counts_submission_once(memory_storage):
+    form_id = storage.save_to_dynamodb(dict(FORM, timestamp='2020-01-01T10:00:00'), TABLE)
+
+    assert memory_storage.get(TABLE, form_id)['name'] == 'Jane Doe'
+    assert get_total() == 1
+    assert get_total('status') == {'new': 1}
+
+
+def test_replayed_submission_is_counted_once(monkeypatch, spool_dir):
+    backend = CommitThenTimeout()
+    monkeypatch.setattr(storage, 'storage_backend', backend)
+    form_data = dict(FORM, timestamp='2020-01-01T10:00:00')
+
+    # The put committed, but the caller only saw the timeout and spooled the item
+    with pytest.raises(Exception, match='Failed to save form submission'):
+        storage.save_to_dynamodb(form_data, TABLE, form_id='form-1')
+    assert spool.spool_item(storage.build_form_item(form_data, 'form-1'))
+
+    assert spool.replay_spool(TABLE) == (1, 0)
+    assert backend.get(TABLE, 'form-1')['email'] == 'jane@example.com'
+    assert get_total() == 1
+
+
+def test_save_many_counts_written_items(memory_storage):
+    forms = [dict(FORM, timestamp='2020-01-01T10:00:00', formType=form_type) for form_type in ('contact', 'quote')]
+
+    outcomes = storage.save_many(forms, TABLE)
+
+    assert all(outcome['success'] for outcome in outcomes)
+    assert get_total() == 2
+    assert get_total('formType') == {'contact': 1, 'quote': 1}
+
+
+class Unreachable(MemoryStorage):
+    """Fails batch writes like a client that cannot reach DynamoDB"""
+
+    def batch_put(self, table_name, items):
+        raise EndpointConnectionError(endpoint_url='https://dynamodb.us-east-1.amazonaws.com')
+
+
+def test_save_many_reports_connection_errors_per_item(monkeypatch):
+    monkeypatch.setattr(storage, 'storage_backend', Unreachable())
+
+    outcomes = storage.save_many(
+        [dict(FORM, formId=f"form-{index}", timestamp='2020-01-01T10:00:00') for index in range(30)], TABLE
+    )
+
+    assert [outcome['formId'] for outcome in outcomes] == [f"form-{index}" for index in range(30)]
+    assert not any(outcome['success'] for outcome in outcomes)
+    assert all('Could not connect' in outcome['error'] for outcome in outcomes)
+
+
+def test_failed_replay_keeps_items_spooled(monkeypatch, spool_dir):
+    monkeypatch.setattr(storage, 'storage_backend', Unreachable())
+    assert spool.spool_item(storage.build_form_item(dict(FORM, timestamp='2020-01-01T10:00:00'), 'form-1'))
+
+    assert spool.replay_spool(TABLE) == (0, 1)
+    assert [item['formId'] for item in spool.read_spool_file(str(spool_dir / spool.SPOOL_FILE))] == ['form-1']
+
+
+class ConcurrentStatusChange(MemoryStorage):
+    """Lets another writer change the status between the caller's read and its update"""
+
+    def update(self, table_name, form_id, values, expected=None, counters=None, remove=None):
+        if 'status' in values and not getattr(self, 'interfered', False):
+            self.interfered = True
+            super().update(table_name, form_id, {'status': 'spam', 'version': 2})
+        super().update(table_name, form_id, values, expected, counters, remove)
+
+
+def test_conflict_reports_the_current_version(monkeypatch):
+    backend = ConcurrentStatusChange()
+    monkeypatch.setattr(storage, 'storage_backend', backend)
+    form_id = storage.save_to_dynamodb(dict(FORM, timestamp='2020-01-01T10:00:00'), TABLE, form_id='form-1')
+
+    outcome = storage.change_status(TABLE, form_id, 'replied', expected_version=1)
+
+    assert outcome == {'formId': 'form-1', 'success': False, 'conflict': True, 'version': 2, 'error': 'Conflict'}
+    assert backend.get(TABLE, 'form-1')['status'] == 'spam'
+
+    retried = storage.change_status(TABLE, form_id, 'replied', expected_version=outcome['version'])
+    assert retried['success'] and retried['version'] == 3
+
+
+def test_bulk_update_flags_stale_versions(memory_storage):
+    form_ids = [
+        storage.save_to_dynamodb(dict(FORM, timestamp='2020-01-01T10:00:00'), TABLE, form_id=f"form-{index}")
+        for index in range(2)
+    ]
+    storage.update_form_status('form-1', 'spam', TABLE)
+
+    outcomes = storage.update_statuses([
+        {'formId': form_ids[0], 'status': 'replied', 'version': 1},
+        {'formId': form_ids[1], 'status': 'replied', 'version': 1},
+        {'formId': 'missing', 'status': 'replied'}
+    ], TABLE)
+
+    assert [(outcome['success'], outcome['version'], outcome['error']) for outcome in outcomes] == [
+        (True, 2, None), (False, 2, 'Conflict'), (False, None, 'NotFound')
+    ]
+    assert get_total('status') == {'replied': 1, 'spam': 1}
+
+
+@pytest.fixture
+def form_cache(monkeypatch):
+    monkeypatch.setattr(storage, 'FORM_CACHE_ENABLED', True)
+    monkeypatch.setattr(storage, 'form_cache', storage.TTLCache(64))
+    monkeypatch.setattr(storage, 'cached_projections', {None})
+    return storage.form_cache
+
+
+def test_form_cache_projections_stay_bounded(memory_storage, form_cache):
+    form_id = storage.save_to_dynamodb(dict(FORM, timestamp='2020-01-01T10:00:00'), TABLE, form_id='form-1')
+    projections = [['status', f"field{index}"] for index in range(40)]
+
+    for attributes in projections:
+        assert storage.get_form_by_id(form_id, TABLE, attributes) == {'status': 'new'}
+
+    assert len(storage.cached_projections) == storage.FORM_CACHE_MAX_PROJECTIONS
+    assert form_cache.stats()['size'] == storage.FORM_CACHE_MAX_PROJECTIONS - 1
+
+    # Cached and uncached projections alike see the change
+    assert storage.update_form_status(form_id, 'replied', TABLE)
+    for attributes in projections:
+        assert storage.get_form_by_id(form_id, TABLE, attributes) == {'status': 'replied'}
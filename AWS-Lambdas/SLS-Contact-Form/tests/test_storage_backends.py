@@ -0,0 +1,113 @@
+"""
+Tests that the in-memory and SQLite backends behave alike
+"""
+
+import threading
+
+import pytest
+
+from storage_backends import ConditionFailedError, MemoryStorage, SQLiteStorage
+
+TABLE = 'contact-form-submissions'
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryStorage()
+    return SQLiteStorage(str(tmp_path / 'submissions.db'))
+
+
+def make_item(index, status='new'):
+    return {
+        'formId': f"form-{index:02d}",
+        'status': status,
+        'email': 'jane@example.com',
+        'timestamp': f"2024-03-01T10:{index:02d}:00",
+        'version': 1
+    }
+
+
+def test_put_get_and_project(backend):
+    backend.put(TABLE, make_item(1))
+
+    assert backend.get(TABLE, 'form-01')['timestamp'] == '2024-03-01T10:01:00'
+    assert backend.get(TABLE, 'form-01', ['status', 'version']) == {'status': 'new', 'version': 1}
+    assert backend.get(TABLE, 'missing') is None
+    assert set(backend.batch_get(TABLE, ['form-01', 'missing'])) == {'form-01'}
+
+
+def test_put_if_absent_respects_expiry(backend):
+    record = {'formId': 'IDEMPOTENCY#key', 'resultFormId': 'form-01', 'expiresAt': 100}
+
+    assert backend.put_if_absent(TABLE, record, 50) is None
+    assert backend.put_if_absent(TABLE, dict(record, resultFormId='form-02'), 100)['resultFormId'] == 'form-01'
+    assert backend.put_if_absent(TABLE, dict(record, resultFormId='form-03', expiresAt=300), 101) is None
+    assert backend.get(TABLE, 'IDEMPOTENCY#key')['resultFormId'] == 'form-03'
+
+
+def test_conditional_update_sets_and_removes(backend):
+    backend.put(TABLE, dict(make_item(1), note='call back'))
+
+    backend.update(TABLE, 'form-01', {'status': 'replied', 'version': 2}, expected={'version': 1}, remove=['note'])
+    with pytest.raises(ConditionFailedError):
+        backend.update(TABLE, 'form-01', {'status': 'spam', 'version': 2}, expected={'version': 1})
+
+    item = backend.get(TABLE, 'form-01')
+    assert (item['status'], item['version']) == ('replied', 2)
+    assert 'note' not in item
+
+
+def test_update_applies_counters_with_the_change(backend):
+    backend.put(TABLE, make_item(1))
+
+    backend.update(
+        TABLE, 'form-01', {'status': 'replied'},
+        counters={'STATS#2024-03-01': {'status:new': -1, 'status:replied': 1}}
+    )
+
+    assert backend.get(TABLE, 'STATS#2024-03-01') == {
+        'formId': 'STATS#2024-03-01', 'status:new': -1, 'status:replied': 1
+    }
+
+
+def test_concurrent_increments_are_not_lost(backend):
+    def add():
+        for _ in range(50):
+            backend.increment(TABLE, {'STATS#2024-03-01': {'submissions': 1}})
+
+    threads = [threading.Thread(target=add) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.get(TABLE, 'STATS#2024-03-01')['submissions'] == 200
+
+
+@pytest.mark.parametrize('newest_first', [True, False])
+def test_query_pages_through_the_index(backend, newest_first):
+    backend.batch_put(TABLE, [make_item(index) for index in range(7)] + [make_item(7, status='spam')])
+
+    form_ids = []
+    start_key = None
+    while True:
+        items, start_key = backend.query(
+            TABLE, 'status', 'new', start='2024-03-01T10:01:00', limit=2,
+            start_key=start_key, newest_first=newest_first
+        )
+        form_ids.extend(item['formId'] for item in items)
+        if not start_key:
+            break
+
+    expected = [f"form-{index:02d}" for index in range(1, 7)]
+    assert form_ids == (expected[::-1] if newest_first else expected)
+
+
+def test_delete(backend):
+    backend.put(TABLE, make_item(1))
+
+    backend.delete(TABLE, 'form-01')
+    backend.delete(TABLE, 'form-01')
+
+    assert backend.get(TABLE, 'form-01') is None
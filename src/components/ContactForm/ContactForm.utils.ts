@@ -11,15 +11,18 @@ const API_ENDPOINT =
 
 /**
  * Submit contact form to AWS Lambda
+ * Retries that pass the same idempotencyKey return the original submission
  */
 export const submitContactForm = async (
-  data: ContactFormData
+  data: ContactFormData,
+  idempotencyKey?: string
 ): Promise<LambdaResponse> => {
   try {
     const response = await fetch(API_ENDPOINT, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
       },
       body: JSON.stringify(data),
     });